@@ -0,0 +1,76 @@
+"""Measure what auditing adds to the latency of a keyring mutation.
+
+A LocalBackend without latency takes MUTATIONS add_certificate calls three ways: without an
+audit log, with an AuditLog syncing each batch in the background, and with each record
+appended and fsynced in the request path, as a synchronous audit trail would.
+
+Usage: python benchmarks/audit_overhead.py [DIRECTORY] [MUTATIONS]
+"""
+import os
+import sys
+import tempfile
+import time
+
+from pydatalib import AuditLog, AuditRecord, CertAdmin, LocalBackend
+
+USERID = "LOADUSER"
+KEYRING = "AUDITED"
+
+
+def timed(admin: CertAdmin, mutations: int, after=None) -> float:
+    """Mean seconds per add_certificate, with after called on each certificate."""
+    certificate = os.urandom(1200)
+    start = time.perf_counter()
+    for index in range(mutations):
+        admin.add_certificate(
+            USERID, KEYRING, f"Certificate{index:05}", certificate, b""
+        )
+        if after is not None:
+            after(index, certificate)
+    return (time.perf_counter() - start) / mutations
+
+
+def main():
+    directory = sys.argv[1] if len(sys.argv) > 1 else tempfile.mkdtemp()
+    mutations = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    backend = LocalBackend()
+    backend.add_ring(USERID.encode("cp1047"), KEYRING.encode("cp1047"), [])
+
+    plain = timed(CertAdmin(backend=backend), mutations)
+
+    with AuditLog(os.path.join(directory, "audit.jsonl")) as audit_log:
+        audited = timed(CertAdmin(backend=backend, audit_log=audit_log), mutations)
+        audit_log.flush()
+        stats = audit_log.stats()
+
+    with open(os.path.join(directory, "synchronous.jsonl"), "ab") as file:
+
+        def append(index, certificate):
+            record = AuditRecord(
+                time.time(),
+                "add_certificate",
+                USERID,
+                KEYRING,
+                f"Certificate{index:05}",
+                None,
+                0,
+                0,
+                0,
+                0.0,
+                None,
+            )
+            file.write(record.to_json().encode("utf-8") + b"\n")
+            file.flush()
+            os.fsync(file.fileno())
+
+        synchronous = timed(CertAdmin(backend=backend), mutations, append)
+
+    print(
+        f"{mutations} mutations: unaudited {plain * 1e6:.1f} us, audit log "
+        + f"{audited * 1e6:.1f} us ({stats.batches} batches, {stats.fsyncs} fsyncs), "
+        + f"synchronous fsync {synchronous * 1e6:.1f} us per mutation"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Measure the fixed cost of calling into cpydatalib.
+
+Each case is a call that does next to no work once its arguments are parsed: fetching no
+entries from an open listing, skipping none, reading a field of a CertificateEntry and a
+getData call rejected for a userid over 8 characters. The timings are dominated by argument
+parsing, so they show the cost of the calling convention rather than of R_datalib.
+
+Usage: python benchmarks/call_overhead.py USERID KEYRING [CALLS]
+"""
+import sys
+import time
+
+import cpydatalib
+
+
+def per_call(function, calls: int) -> float:
+    """Nanoseconds per call of function over calls calls."""
+    start = time.perf_counter_ns()
+    for _ in range(calls):
+        function()
+    return (time.perf_counter_ns() - start) / calls
+
+
+def rejected(function):
+    def call():
+        try:
+            function()
+        except ValueError:
+            pass
+
+    return call
+
+
+def main():
+    userid, keyring = (value.encode("cp1047") for value in sys.argv[1:3])
+    calls = int(sys.argv[3]) if len(sys.argv) > 3 else 1_000_000
+    listing = cpydatalib.Listing(userid, keyring)
+    entries = listing.fetch(1)
+    listing.abort()
+    if not entries:
+        sys.exit(f"{sys.argv[2]} has no certificates")
+    entry = entries[0]
+    listing = cpydatalib.Listing(userid, keyring)
+    cases = {
+        "Listing.fetch(0)": lambda: listing.fetch(0),
+        "Listing.fetch(0, codepage=, bodies=)": lambda: listing.fetch(
+            0, codepage="cp1047", bodies=False
+        ),
+        "Listing.skip(0)": lambda: listing.skip(0),
+        "CertificateEntry.get(label)": lambda: entry.get("label"),
+        "getData(long userid)": rejected(
+            lambda: cpydatalib.getData(b"TOOLONGUSER", keyring, b"LABEL")
+        ),
+    }
+    try:
+        for name, function in cases.items():
+            print(f"{name:40} {per_call(function, calls):7.1f} ns/call")
+    finally:
+        listing.abort()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Compare build_chains() against matching every PERSONAL certificate with every CA by hand.
+
+Synthetic rings hold CAS CA certificates in chains of DEPTH below their roots, and one PERSONAL
+certificate per CA. Certificates are unsigned, which the chain builder never checks.
+
+Usage: python benchmarks/chain_building.py [CAS] [DEPTH]
+"""
+import sys
+import time
+
+import cpydatalib
+
+from pydatalib.py.certificate_details import parse_certificate
+from pydatalib.py.keyring_chains import build_chains
+
+
+def tlv(tag: int, value: bytes) -> bytes:
+    length = len(value)
+    if length < 0x80:
+        return bytes([tag, length]) + value
+    encoded = length.to_bytes((length.bit_length() + 7) // 8, "big")
+    return bytes([tag, 0x80 | len(encoded)]) + encoded + value
+
+
+def name(common_name: str) -> bytes:
+    attribute = tlv(0x06, bytes.fromhex("550403")) + tlv(0x0C, common_name.encode())
+    return tlv(0x30, tlv(0x31, tlv(0x30, attribute)))
+
+
+def certificate(
+    serial: int, subject: str, issuer: str, key_id: bytes, issuer_key_id: bytes
+):
+    extensions = tlv(
+        0x30,
+        tlv(0x06, bytes.fromhex("551d0e")) + tlv(0x04, tlv(0x04, key_id)),
+    ) + tlv(
+        0x30,
+        tlv(0x06, bytes.fromhex("551d23"))
+        + tlv(0x04, tlv(0x30, tlv(0x80, issuer_key_id))),
+    )
+    algorithm = tlv(0x30, tlv(0x06, bytes.fromhex("2a8648ce3d0201")))
+    tbs = tlv(
+        0x30,
+        tlv(0xA0, tlv(0x02, b"\x02"))
+        + tlv(0x02, serial.to_bytes(4, "big"))
+        + algorithm
+        + name(issuer)
+        + tlv(0x30, tlv(0x17, b"200101000000Z") + tlv(0x17, b"491231235959Z"))
+        + name(subject)
+        + tlv(0x30, algorithm + tlv(0x03, bytes(66)))
+        + tlv(0xA3, tlv(0x30, extensions)),
+    )
+    return tlv(0x30, tbs + algorithm + tlv(0x03, bytes(65)))
+
+
+def entry(label: str, usage: str, der: bytes):
+    return cpydatalib.CertificateEntry(
+        label.encode("cp1047"), b"", usage, "TRUST", 0, der, codepage="cp1047"
+    )
+
+
+def synthetic_ring(ca_count: int, depth: int) -> list:
+    entries = []
+    for index in range(ca_count):
+        level = index % depth
+        issuer = index - 1 if level else index
+        key_id = index.to_bytes(20, "big")
+        entries.append(
+            entry(
+                f"CA{index}",
+                "CERTAUTH",
+                certificate(
+                    index,
+                    f"CA{index}",
+                    f"CA{issuer}",
+                    key_id,
+                    issuer.to_bytes(20, "big"),
+                ),
+            )
+        )
+        entries.append(
+            entry(
+                f"Personal{index}",
+                "PERSONAL",
+                certificate(
+                    ca_count + index,
+                    f"Personal{index}",
+                    f"CA{index}",
+                    (ca_count + index).to_bytes(20, "big"),
+                    key_id,
+                ),
+            )
+        )
+    return entries
+
+
+def pairwise_chains(entries: list) -> dict:
+    """Walks up each chain by parsing and comparing every CA at every step."""
+    cas = [entry for entry in entries if entry.usage == "CERTAUTH"]
+    chains = {}
+    for personal in entries:
+        if personal.usage != "PERSONAL":
+            continue
+        links = [personal.label]
+        details = parse_certificate(personal.der)
+        while details.subject != details.issuer:
+            for ca in cas:
+                ca_details = parse_certificate(ca.der)
+                if ca_details.subject == details.issuer:
+                    links.append(ca.label)
+                    details = ca_details
+                    break
+            else:
+                break
+        chains[personal.label] = links
+    return chains
+
+
+def main():
+    ca_count = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    depth = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    entries = synthetic_ring(ca_count, depth)
+
+    start = time.perf_counter()
+    chains = build_chains(entries)
+    indexed = time.perf_counter() - start
+    assert all(chain.complete for chain in chains.values())
+
+    # The pairwise walk is quadratic, so it is timed for a sample of PERSONAL certificates
+    cas, personals = entries[::2], entries[1::2]
+    sample = personals[:200]
+    start = time.perf_counter()
+    pairwise_chains(cas + sample)
+    pairwise = (time.perf_counter() - start) * len(personals) / len(sample)
+
+    print(
+        f"{ca_count} CAs, {ca_count} PERSONAL certificates: build_chains "
+        + f"{indexed * 1e3:.0f} ms, pairwise ~{pairwise * 1e3:.0f} ms "
+        + f"({pairwise / indexed:.0f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Compare memory per listed entry for CertificateEntry against the previous dictionaries.
+
+Usage: python benchmarks/entry_memory.py [ENTRIES]
+"""
+import sys
+import tracemalloc
+
+import cpydatalib
+
+
+def dictionary_entries(count: int, bodies: list) -> list:
+    """Entries shaped like the old listKeyring() dictionaries after CertAdmin decoding."""
+    return [
+        {
+            "label": f"Certificate{index:05}".encode("cp1047").decode("cp1047"),
+            "owner": "CERTAUTH".encode("cp1047").decode("cp1047"),
+            # Py_BuildValue("s") created a new string for every entry
+            "usage": "".join(["CERT", "AUTH"]),
+            "status": "".join(["TR", "UST"]),
+            "default": 0,
+            "certificate": bodies[index],
+        }
+        for index in range(count)
+    ]
+
+
+def native_entries(count: int, bodies: list) -> list:
+    """Entries as listKeyring() now returns them, with decoding left to attribute access."""
+    return [
+        cpydatalib.CertificateEntry(
+            f"Certificate{index:05}".encode("cp1047"),
+            "CERTAUTH".encode("cp1047"),
+            "CERTAUTH",
+            "TRUST",
+            0,
+            bodies[index],
+            codepage="cp1047",
+        )
+        for index in range(count)
+    ]
+
+
+def measure(build, count: int, bodies: list) -> float:
+    tracemalloc.start()
+    entries = build(count, bodies)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del entries
+    return size / count
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    # Certificate bodies are the same size either way, so they are allocated up front
+    bodies = [bytes(1200) for _ in range(count)]
+    dictionary_size = measure(dictionary_entries, count, bodies)
+    native_size = measure(native_entries, count, bodies)
+    print(
+        f"{count} entries: dict {dictionary_size:.0f} B/entry, "
+        + f"CertificateEntry {native_size:.0f} B/entry, "
+        + f"saved {dictionary_size - native_size:.0f} B/entry "
+        + f"({(1 - native_size / dictionary_size) * 100:.0f}%)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Compare fleet statistics computed with KeyringAnalytics against a loop over dictionaries.
+
+The keyring's entries are repeated until there are ENTRIES of them, to model a fleet.
+
+Usage: python benchmarks/fleet_statistics.py USERID KEYRING [ENTRIES]
+"""
+import sys
+import time
+import timeit
+from collections import Counter
+
+from pydatalib import CertAdmin, KeyringAnalytics
+from pydatalib.py.certificate_details import parse_certificate
+
+EXPIRY_DAYS = (0, 30, 60, 90, 180, 365)
+
+
+def dictionary_rows(userid, keyring, entries):
+    rows = []
+    for entry in entries:
+        details = parse_certificate(entry.der)
+        rows.append(
+            {
+                "userid": userid,
+                "keyring": keyring,
+                "label": entry.label,
+                "owner": entry.owner,
+                "usage": entry.usage,
+                "status": entry.status,
+                "key_size": details.key_size,
+                "not_after": int(details.not_after.timestamp()),
+            }
+        )
+    return rows
+
+
+def dictionary_statistics(rows, now):
+    by_group = Counter((row["usage"], row["status"], row["owner"]) for row in rows)
+    key_sizes = Counter(row["key_size"] for row in rows)
+    expiry = Counter()
+    weak = []
+    for row in rows:
+        remaining = row["not_after"] - now
+        bucket = sum(1 for days in EXPIRY_DAYS if remaining >= days * 86400)
+        expiry[bucket] += 1
+        if remaining < 30 * 86400 and row["usage"] == "CERTAUTH":
+            weak.append((row["userid"], row["keyring"], row["label"]))
+    return by_group, key_sizes, expiry, weak
+
+
+def columnar_statistics(analytics, now):
+    return (
+        analytics.count_by("usage", "status", "owner"),
+        analytics.key_sizes(),
+        analytics.expiry_histogram(EXPIRY_DAYS, now=now),
+        analytics.select(expires_within_days=30, now=now, usage="CERTAUTH"),
+    )
+
+
+def main():
+    userid, keyring = sys.argv[1:3]
+    count = int(sys.argv[3]) if len(sys.argv) > 3 else 50000
+    listed = CertAdmin().list_keyring(userid, keyring)
+    entries = (listed * (count // len(listed) + 1))[:count]
+    now = int(time.time())
+
+    start = time.perf_counter()
+    rows = dictionary_rows(userid, keyring, entries)
+    dictionary_load = time.perf_counter() - start
+    start = time.perf_counter()
+    analytics = KeyringAnalytics.from_listing(userid, keyring, entries)
+    columnar_load = time.perf_counter() - start
+    print(
+        f"load {count} entries: dicts {dictionary_load * 1e3:.0f} ms, "
+        + f"columns {columnar_load * 1e3:.0f} ms"
+    )
+
+    dictionary_time = min(
+        timeit.repeat(lambda: dictionary_statistics(rows, now), number=1, repeat=5)
+    )
+    columnar_time = min(
+        timeit.repeat(lambda: columnar_statistics(analytics, now), number=1, repeat=5)
+    )
+    print(
+        f"group-by, histograms and threshold query: dict loop {dictionary_time * 1e3:.1f} ms, "
+        + f"KeyringAnalytics {columnar_time * 1e3:.1f} ms "
+        + f"({dictionary_time / columnar_time:.0f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
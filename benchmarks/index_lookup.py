@@ -0,0 +1,45 @@
+"""Compare finding a certificate by fingerprint through the keyring index with list-and-scan.
+
+Every certificate on the keyring is looked up once by its SHA-256 fingerprint, both ways.
+
+Usage: python benchmarks/index_lookup.py USERID KEYRING
+"""
+import hashlib
+import sys
+import time
+
+from pydatalib import CertAdmin
+
+
+def main():
+    userid, keyring = sys.argv[1:3]
+    cert_admin = CertAdmin()
+    fingerprints = [
+        hashlib.sha256(entry.der).hexdigest()
+        for entry in cert_admin.list_keyring(userid, keyring)
+    ]
+
+    start = time.perf_counter()
+    for fingerprint in fingerprints:
+        label = next(
+            entry.label
+            for entry in cert_admin.list_keyring(userid, keyring)
+            if hashlib.sha256(entry.der).hexdigest() == fingerprint
+        )
+        cert_admin.extract_certificate(userid, keyring, label)
+    scanned = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for fingerprint in fingerprints:
+        cert_admin.extract_certificate(userid, keyring, fingerprint=fingerprint)
+    indexed = time.perf_counter() - start
+
+    count = len(fingerprints)
+    print(
+        f"{count} certificates: list and scan {scanned / count * 1e3:.2f} ms/lookup, "
+        + f"index {indexed / count * 1e3:.2f} ms/lookup ({scanned / indexed:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Measure the memory an InternPool saves on a synthetic fleet of rings sharing CA certificates.
+
+Each ring holds the same CA certificates plus a personal certificate of its own. Every listing
+copies bodies out of a work buffer, which is modelled by building entries from a bytearray.
+
+Usage: python benchmarks/intern_memory.py [RINGS] [CAS_PER_RING]
+"""
+import os
+import sys
+import tracemalloc
+
+import cpydatalib
+
+from pydatalib import InternPool
+
+
+def list_fleet(rings: int, cas: list, interner=None) -> list:
+    listings = []
+    for ring in range(rings):
+        bodies = cas + [os.urandom(1200)]
+        entries = []
+        for index, body in enumerate(bodies):
+            buffer = bytearray(body)
+            der = bytes(buffer) if interner is None else interner(memoryview(buffer))
+            entries.append(
+                cpydatalib.CertificateEntry(
+                    f"Cert{ring}.{index}".encode("cp1047"),
+                    b"CERTAUTH",
+                    "CERTAUTH",
+                    "TRUST",
+                    0,
+                    der,
+                )
+            )
+        listings.append(entries)
+    return listings
+
+
+def measure(rings: int, cas: list, interner=None) -> int:
+    tracemalloc.start()
+    listings = list_fleet(rings, cas, interner)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del listings
+    return size
+
+
+def main():
+    rings = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    ca_count = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    cas = [os.urandom(1500) for _ in range(ca_count)]
+    plain = measure(rings, cas)
+    pool = InternPool()
+    interned = measure(rings, cas, pool)
+    stats = pool.stats()
+    print(
+        f"{rings} rings x {ca_count + 1} certificates: plain {plain / 1e6:.1f} MB, "
+        + f"interned {interned / 1e6:.1f} MB, saved {(plain - interned) / 1e6:.1f} MB "
+        + f"({(1 - interned / plain) * 100:.0f}%)"
+    )
+    print(
+        f"pool: {stats.lookups} lookups, hit rate {stats.hit_rate:.0%}, "
+        + f"{stats.saved_bytes / 1e6:.1f} MB of copies avoided, {stats.live} live now"
+    )
+
+
+if __name__ == "__main__":
+    main()
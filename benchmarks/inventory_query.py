@@ -0,0 +1,52 @@
+"""Compare inventory query latency against answering the same lookup from a live listing.
+
+Usage: python benchmarks/inventory_query.py USERID KEYRING DATABASE [ITERATIONS]
+"""
+import sys
+import timeit
+
+import pydatalib
+
+
+def main():
+    userid, keyring, database = sys.argv[1:4]
+    iterations = int(sys.argv[4]) if len(sys.argv) > 4 else 200
+    cert_admin = pydatalib.CertAdmin()
+    inventory = pydatalib.KeyringInventory(database, cert_admin)
+    print(f"refresh: {inventory.refresh(userid, keyring)}")
+    label = inventory.entries(userid=userid, keyring=keyring)[-1].label
+
+    def live_lookup():
+        for entry in cert_admin.list_keyring(userid=userid, keyring=keyring):
+            if entry.label == label:
+                return entry
+        return None
+
+    def live_certauth():
+        return [
+            entry
+            for entry in cert_admin.list_keyring(userid=userid, keyring=keyring)
+            if entry.usage == "CERTAUTH"
+        ]
+
+    cases = {
+        "lookup by label": (
+            live_lookup,
+            lambda: inventory.get(userid, keyring, label),
+        ),
+        "CERTAUTH entries": (
+            live_certauth,
+            lambda: inventory.entries(userid=userid, keyring=keyring, usage="CERTAUTH"),
+        ),
+    }
+    for name, (live, query) in cases.items():
+        live_time = min(timeit.repeat(live, number=iterations, repeat=3)) / iterations
+        query_time = min(timeit.repeat(query, number=iterations, repeat=3)) / iterations
+        print(
+            f"{name}: live listing {live_time * 1e3:.3f} ms, "
+            + f"inventory {query_time * 1e3:.3f} ms ({live_time / query_time:.0f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
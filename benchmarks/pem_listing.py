@@ -0,0 +1,109 @@
+"""Compare base 64 listing throughput of the native PEM encoder with the Python one it replaced.
+
+A LocalBackend holds a keyring of CERTIFICATES entries of SIZE bytes. Each listing reads the
+certificate of every entry, which encodes it on first access: through the string building
+CertAdmin did before, through cpydatalib.pemEncode as list_keyring(base_64_encoding=True) now
+does, and for the whole listing at once with CertAdmin.pem_bundle(). Decoding the bundle with
+cpydatalib.pemDecode is timed against ssl.PEM_cert_to_DER_cert, and both encoders on their own.
+Where cpydatalib is not built, the pure-Python helpers of LocalBackend are timed instead.
+
+Usage: python benchmarks/pem_listing.py [CERTIFICATES] [SIZE]
+"""
+import base64
+import os
+import ssl
+import sys
+import time
+
+from pydatalib import CertAdmin, LocalBackend
+
+try:
+    import cpydatalib as pem_module
+except ModuleNotFoundError:
+    pem_module = LocalBackend
+
+USERID = "LOADUSER"
+KEYRING = "PEM"
+LISTINGS = 50
+
+
+def python_pem(data: bytes) -> str:
+    """PEM encoding as CertAdmin built it before, without line wrapping."""
+    result_str = "-----BEGIN CERTIFICATE-----\n"
+    result_str = result_str + base64.b64encode(data).decode("utf-8")
+    result_str = result_str + "\n-----END CERTIFICATE-----\n"
+    return result_str
+
+
+def rate(listing, certificates: int) -> float:
+    """Certificates per second over LISTINGS calls of listing."""
+    start = time.perf_counter()
+    for _ in range(LISTINGS):
+        listing()
+    return LISTINGS * certificates / (time.perf_counter() - start)
+
+
+def main():
+    certificates = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 1200
+    userid = USERID.encode("cp1047")
+    keyring = KEYRING.encode("cp1047")
+    backend = LocalBackend()
+    backend.pemEncode = pem_module.pemEncode
+    backend.pemBundle = pem_module.pemBundle
+    backend.add_ring(
+        userid,
+        keyring,
+        [
+            (f"Certificate{index:05}".encode("cp1047"), os.urandom(size))
+            for index in range(certificates)
+        ],
+    )
+    admin = CertAdmin(backend=backend)
+
+    def encoded(entries):
+        for entry in entries:
+            entry.certificate
+
+    python = rate(
+        lambda: encoded(
+            backend.listKeyring(userid, keyring, codepage="cp1047", encoder=python_pem)
+        ),
+        certificates,
+    )
+    native = rate(
+        lambda: encoded(admin.list_keyring(USERID, KEYRING, base_64_encoding=True)),
+        certificates,
+    )
+    bundled = rate(lambda: admin.pem_bundle(USERID, KEYRING), certificates)
+
+    ders = [entry.der for entry in admin.list_keyring(USERID, KEYRING)]
+    python_only = rate(lambda: [python_pem(der) for der in ders], certificates)
+    native_only = rate(
+        lambda: [pem_module.pemEncode(der) for der in ders], certificates
+    )
+
+    bundle = admin.pem_bundle(USERID, KEYRING).decode("ascii")
+    blocks = [
+        block + "-----END CERTIFICATE-----\n"
+        for block in bundle.split("-----END CERTIFICATE-----\n")[:-1]
+    ]
+    python_decode = rate(
+        lambda: [ssl.PEM_cert_to_DER_cert(block) for block in blocks], certificates
+    )
+    native_decode = rate(lambda: pem_module.pemDecode(bundle), certificates)
+
+    print(
+        f"{certificates} certificates of {size} bytes, PEM helpers of "
+        + f"{pem_module.__name__}, certificates/s:\n"
+        + f"  encode: Python {python:10.0f}  pemEncode {native:10.0f} "
+        + f"({native / python:.1f}x)  pem_bundle {bundled:10.0f} ({bundled / python:.1f}x)\n"
+        + f"  encoding alone: Python {python_only:10.0f}  pemEncode {native_only:10.0f} "
+        + f"({native_only / python_only:.1f}x)\n"
+        + f"  decode: Python {python_decode:10.0f}  pemDecode {native_decode:10.0f} "
+        + f"({native_decode / python_decode:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
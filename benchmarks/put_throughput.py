@@ -0,0 +1,53 @@
+"""Measure dataPut throughput for a DER certificate, single threaded and from several threads.
+
+The keyring should be a scratch ring: labels PUTBENCH0, PUTBENCH1, ... are added and removed.
+
+Usage: python benchmarks/put_throughput.py USERID KEYRING CERTIFICATE.der [COUNT] [THREADS]
+"""
+import sys
+import threading
+import time
+
+import cpydatalib
+
+
+def put_labels(userid, keyring, labels, certificate):
+    for label in labels:
+        result = cpydatalib.dataPut(userid, keyring, label, certificate, b"")
+        if result != 0:
+            raise RuntimeError(f"dataPut failed: {result}")
+
+
+def main():
+    userid, keyring = (arg.encode("cp1047") for arg in sys.argv[1:3])
+    with open(sys.argv[3], "rb") as file:
+        certificate = file.read()
+    count = int(sys.argv[4]) if len(sys.argv) > 4 else 1000
+    thread_count = int(sys.argv[5]) if len(sys.argv) > 5 else 4
+    labels = [f"PUTBENCH{index}".encode("cp1047") for index in range(count)]
+
+    for threads in (1, thread_count):
+        chunks = [labels[index::threads] for index in range(threads)]
+        workers = [
+            threading.Thread(
+                target=put_labels,
+                args=(userid, keyring, chunk, memoryview(certificate)),
+            )
+            for chunk in chunks
+        ]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+        print(
+            f"{threads} thread(s): {count / elapsed:.0f} puts/s, "
+            + f"{count * len(certificate) / elapsed / 1e6:.1f} MB/s"
+        )
+        for label in labels:
+            cpydatalib.dataRemove(userid=userid, keyring=keyring, label=label)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Compare a burst of identical concurrent reads with and without coalescing.
+
+THREADS threads extract the same certificate from a LocalBackend whose calls take LATENCY
+seconds, ROUNDS times in lockstep, as during a rollout. With coalesce_reads the threads of a
+round share one native call.
+
+Usage: python benchmarks/read_coalescing.py [THREADS] [LATENCY]
+"""
+import os
+import sys
+import threading
+import time
+
+from pydatalib import CertAdmin, LocalBackend
+
+USERID = "LOADUSER"
+KEYRING = "ROLLOUT"
+ROUNDS = 20
+
+
+def burst(admin: CertAdmin, threads: int) -> float:
+    """Seconds for threads to extract the certificate ROUNDS times each in lockstep."""
+    barrier = threading.Barrier(threads)
+
+    def work():
+        for _ in range(ROUNDS):
+            barrier.wait()
+            admin.extract_certificate(USERID, KEYRING, "Certificate")
+
+    workers = [threading.Thread(target=work) for _ in range(threads)]
+    start = time.perf_counter()
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def main():
+    threads = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    latency = float(sys.argv[2]) if len(sys.argv) > 2 else 0.005
+    backend = LocalBackend(latency=latency)
+    backend.add_ring(
+        USERID.encode("cp1047"),
+        KEYRING.encode("cp1047"),
+        [("Certificate".encode("cp1047"), os.urandom(1200))],
+    )
+    for coalesce in (False, True):
+        admin = CertAdmin(backend=backend, coalesce_reads=coalesce)
+        calls = backend.calls
+        seconds = burst(admin, threads)
+        print(
+            f"coalesce_reads={coalesce!s:5} {threads} threads x {ROUNDS} rounds: "
+            + f"{seconds:.2f} s, {backend.calls - calls} native calls"
+        )
+
+
+if __name__ == "__main__":
+    main()
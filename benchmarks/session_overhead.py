@@ -0,0 +1,37 @@
+"""Measure per-call overhead of module-level cpydatalib calls against a reused Session.
+
+Usage: python benchmarks/session_overhead.py USERID KEYRING LABEL [ITERATIONS]
+"""
+import sys
+import timeit
+
+import cpydatalib
+
+
+def main():
+    userid, keyring, label = (arg.encode("cp1047") for arg in sys.argv[1:4])
+    iterations = int(sys.argv[4]) if len(sys.argv) > 4 else 1000
+    session = cpydatalib.Session(userid, keyring)
+
+    cases = {
+        "getData": (
+            lambda: cpydatalib.getData(userid=userid, keyring=keyring, label=label),
+            lambda: session.getData(label=label),
+        ),
+        "listKeyring": (
+            lambda: cpydatalib.listKeyring(userid=userid, keyring=keyring),
+            session.listKeyring,
+        ),
+    }
+    for name, (module_call, session_call) in cases.items():
+        module_time = min(timeit.repeat(module_call, number=iterations, repeat=3))
+        session_time = min(timeit.repeat(session_call, number=iterations, repeat=3))
+        print(
+            f"{name}: module {module_time / iterations * 1e6:.1f} us/call, "
+            + f"session {session_time / iterations * 1e6:.1f} us/call, "
+            + f"saved {(module_time - session_time) / iterations * 1e6:.1f} us/call"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Compare worker processes listing a keyring themselves against reading the shared cache.
+
+WORKERS processes are forked from a parent that publishes the keyring once. Each worker lists
+the keyring LISTINGS times, first through a LocalBackend that takes LATENCY seconds per call
+and then from the SharedKeyringCache.
+
+Usage: python benchmarks/shared_cache.py [WORKERS] [CERTIFICATES] [LATENCY]
+"""
+import os
+import sys
+import time
+
+from pydatalib import CertAdmin, LocalBackend, SharedKeyringCache
+
+USERID = "LOADUSER"
+KEYRING = "SHARED"
+LISTINGS = 50
+
+
+def timed(workers: int, list_keyring) -> float:
+    """Seconds until every forked worker has listed the keyring LISTINGS times."""
+    start = time.perf_counter()
+    children = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            for _ in range(LISTINGS):
+                for entry in list_keyring():
+                    entry["certificate"]
+            os._exit(0)
+        children.append(pid)
+    for pid in children:
+        os.waitpid(pid, 0)
+    return time.perf_counter() - start
+
+
+def main():
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    certificates = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    latency = float(sys.argv[3]) if len(sys.argv) > 3 else 0.002
+    backend = LocalBackend(latency=latency)
+    backend.add_ring(
+        USERID.encode("cp1047"),
+        KEYRING.encode("cp1047"),
+        [
+            (f"Certificate{index:05}".encode("cp1047"), os.urandom(1200))
+            for index in range(certificates)
+        ],
+    )
+    live = CertAdmin(backend=backend)
+    with SharedKeyringCache(create=True, backend=backend) as cache:
+        shared = CertAdmin(backend=backend, shared_cache=cache)
+        shared.publish_shared([(USERID, KEYRING)])
+        try:
+            listed = timed(workers, lambda: live.list_keyring(USERID, KEYRING))
+            read = timed(workers, lambda: shared.list_keyring(USERID, KEYRING))
+        finally:
+            cache.unlink()
+
+    count = workers * LISTINGS
+    print(
+        f"{workers} workers, {certificates} certificates: listed {listed / count * 1e3:.2f} "
+        + f"ms/listing, shared cache {read / count * 1e3:.2f} ms/listing "
+        + f"({listed / read:.1f}x)"
+    )
+
+
+if __name__ == "__main__":
+    main()
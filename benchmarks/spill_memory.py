@@ -0,0 +1,37 @@
+"""Compare peak memory of listing a keyring in full against listing within a memory budget.
+
+Usage: python benchmarks/spill_memory.py USERID KEYRING [BUDGET]
+"""
+import sys
+import time
+import tracemalloc
+
+from pydatalib import CertAdmin
+
+
+def measure(admin, userid, keyring, **kwargs):
+    tracemalloc.start()
+    start = time.perf_counter()
+    entries = admin.list_keyring(userid, keyring, base_64_encoding=True, **kwargs)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return len(entries), peak, elapsed
+
+
+def main():
+    userid, keyring = sys.argv[1:3]
+    budget = int(sys.argv[3]) if len(sys.argv) > 3 else 1 << 20
+    admin = CertAdmin()
+    for name, kwargs in (
+        ("in memory", {}),
+        (f"budget {budget} B", {"memory_budget": budget}),
+    ):
+        count, peak, elapsed = measure(admin, userid, keyring, **kwargs)
+        print(
+            f"{name}: {count} entries, peak {peak / 1e6:.1f} MB, {elapsed * 1000:.0f} ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""Measure how cpydatalib calls scale with threads, with and without a GIL.
+
+Four workloads run on 1, 2, 4, ... threads against a keyring that already holds certificates:
+- fetch: every thread lists the keyring through its own cpydatalib.Listing and reads the label
+  of each CertificateEntry, so entries are created and decoded concurrently
+- shared entries: every thread reads the label, digest and certificate of the same entries,
+  each read taking the entry's critical section on a free-threaded build
+- pemBundle: every thread encodes the certificates of the keyring into one PEM bundle
+- busy flag: every thread calls fetch(0) on one shared Listing, so each call claims and
+  releases its busy flag; calls refused because another thread held it are counted
+On a free-threaded build (python3.13t and later) the first three should grow with the threads
+up to the cores; with a GIL they stay flat. Off z/OS, build cpydatalib against an IRRSDL64
+stub and fill the keyring with dataPut first.
+
+Usage: python benchmarks/thread_scaling.py USERID KEYRING [ROUNDS] [MAX_THREADS]
+"""
+import os
+import sys
+import threading
+import time
+
+import cpydatalib
+import ebcdic  # noqa: F401 registers the cp1047 codec
+
+
+def run(threads: int, rounds: int, work) -> float:
+    """Seconds for threads threads to each call work rounds times."""
+    barrier = threading.Barrier(threads + 1)
+
+    def loop():
+        barrier.wait()
+        for _ in range(rounds):
+            work()
+
+    workers = [threading.Thread(target=loop) for _ in range(threads)]
+    for worker in workers:
+        worker.start()
+    barrier.wait()
+    start = time.perf_counter()
+    for worker in workers:
+        worker.join()
+    return time.perf_counter() - start
+
+
+def main():
+    userid, keyring = (value.encode("cp1047") for value in sys.argv[1:3])
+    rounds = int(sys.argv[3]) if len(sys.argv) > 3 else 200
+    max_threads = int(sys.argv[4]) if len(sys.argv) > 4 else os.cpu_count()
+    entries = cpydatalib.Listing(userid, keyring).fetch(sys.maxsize, codepage="cp1047")
+    if isinstance(entries, dict) or not entries:
+        sys.exit(f"{sys.argv[2]} has no certificates: {entries}")
+    ders = [entry.der for entry in entries]
+    shared = cpydatalib.Listing(userid, keyring)
+    refused = [0]
+    refused_lock = threading.Lock()
+
+    def fetch():
+        listing = cpydatalib.Listing(userid, keyring)
+        for entry in listing.fetch(sys.maxsize, codepage="cp1047"):
+            entry.label
+
+    def read_shared():
+        for entry in entries:
+            entry.label, entry.digest, entry.certificate
+
+    def bundle():
+        cpydatalib.pemBundle(ders)
+
+    def claim():
+        for _ in range(len(entries)):
+            try:
+                shared.fetch(0)
+            except RuntimeError:
+                with refused_lock:
+                    refused[0] += 1
+
+    workloads = {
+        "fetch": fetch,
+        "shared entries": read_shared,
+        "pemBundle": bundle,
+        "busy flag": claim,
+    }
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    print(
+        f"GIL {'enabled' if gil else 'disabled'}, {os.cpu_count()} CPUs, "
+        + f"{len(entries)} certificates"
+    )
+    for name, work in workloads.items():
+        single = None
+        threads = 1
+        while threads <= max_threads:
+            refused[0] = 0
+            rate = threads * rounds / run(threads, rounds, work)
+            single = single or rate
+            line = f"{name:15} {threads:3} threads: {rate:10.1f} rounds/s, "
+            line += f"{rate / single:.2f}x one thread"
+            if work is claim:
+                line += f", {refused[0]} calls refused as busy"
+            print(line)
+            threads *= 2
+    shared.abort()
+
+
+if __name__ == "__main__":
+    main()
@@ -23,6 +23,9 @@ def build(setup_kwargs: dict):
                     "cpydatalib",
                     sources=[
                         "pydatalib/c/keyring_py.c",
+                        "pydatalib/c/keyring_entry.c",
+                        "pydatalib/c/keyring_args.c",
+                        "pydatalib/c/keyring_pem.c",
                         "pydatalib/c/keyring_get.c",
                         "pydatalib/c/keyring_service.c",
                     ],
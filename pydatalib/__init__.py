@@ -1,2 +1,47 @@
 """Make certificate admin class available from package root."""
-from .py.cert_admin import CertAdmin
+
+from .py.audit_log import (
+    FSYNC_BATCH,
+    FSYNC_INTERVAL,
+    FSYNC_NEVER,
+    AuditLog,
+    AuditOptions,
+    AuditOutcome,
+    AuditRecord,
+    AuditStats,
+)
+from .py.cert_admin import CertAdmin, CertAdminOptions
+from .py.datalib_logger import (
+    disable_queue_logging,
+    enable_debug_logging,
+    enable_queue_logging,
+)
+from .py.intern_pool import InternPool, InternStats
+from .py.keyring_analytics import KeyringAnalytics
+from .py.keyring_chains import CertificateChain, ChainLink
+from .py.keyring_inventory import InventoryEntry, KeyringInventory, RefreshSummary
+from .py.keyring_operations import (
+    CertificateAttributes,
+    CloneReport,
+    Operation,
+    OperationResult,
+)
+from .py.keyring_pager import KeyringPage, KeyringPager
+from .py.keyring_prefetch import KeyringPrefetcher, PrefetchStatus, PrefetchTarget
+from .py.keyring_shared import SharedKeyringCache, SharedSnapshot
+from .py.keyring_spill import SpilledCertificate
+from .py.keyring_watcher import KeyringEvent, KeyringWatch, KeyringWatcher
+from .py.load_test import IntervalStats, LoadReport, run_load_test
+from .py.local_backend import LocalBackend
+from .py.mutation_scheduler import MutationScheduler, SchedulerStats
+from .py.rate_governor import (
+    BULK,
+    INTERACTIVE,
+    NORMAL,
+    GovernorStats,
+    RateGovernor,
+    call_priority,
+    get_default_governor,
+    set_default_governor,
+)
+from .py.single_flight import FlightStats, SingleFlight
@@ -0,0 +1,154 @@
+/*
+* This program and the accompanying materials are made available under the terms of the *
+* Eclipse Public License v2.0 which accompanies this distribution, and is available at *
+* https://www.eclipse.org/legal/epl-v20.html                                      *
+*                                                                                 *
+* SPDX-License-Identifier: EPL-2.0                                                *
+*                                                                                 *
+*/
+
+#include <limits.h>
+#include <string.h>
+
+#include "keyring_args.h"
+
+// Collect the arguments of a vectorcall into values, borrowed and in the order of spec->names,
+// leaving NULL for parameters that were not given. Returns 0 with a TypeError set for too many
+// positional arguments, unknown or repeated keywords and missing required arguments.
+int collect_arguments(const Argument_spec *spec, PyObject *const *args, Py_ssize_t nargs,
+                      PyObject *kwnames, PyObject **values) {
+  Py_ssize_t nkwargs = kwnames == NULL ? 0 : PyTuple_GET_SIZE(kwnames);
+  Py_ssize_t i;
+  int count, index;
+
+  for (count = 0; spec->names[count] != NULL; count++) {
+    values[count] = NULL;
+  }
+  if (nargs > spec->positional) {
+    PyErr_Format(PyExc_TypeError, "%s() takes at most %d positional arguments (%zd given)",
+                 spec->function, spec->positional, nargs);
+    return 0;
+  }
+  for (i = 0; i < nargs; i++) {
+    values[i] = args[i];
+  }
+  for (i = 0; i < nkwargs; i++) {
+    PyObject *name = PyTuple_GET_ITEM(kwnames, i);
+
+    for (index = 0; index < count; index++) {
+      if (PyUnicode_CompareWithASCIIString(name, spec->names[index]) == 0) {
+        break;
+      }
+    }
+    if (index == count) {
+      PyErr_Format(PyExc_TypeError, "%s() got an unexpected keyword argument '%U'",
+                   spec->function, name);
+      return 0;
+    }
+    if (values[index] != NULL) {
+      PyErr_Format(PyExc_TypeError, "%s() got multiple values for argument '%s'",
+                   spec->function, spec->names[index]);
+      return 0;
+    }
+    values[index] = args[nargs + i];
+  }
+  for (index = 0; index < spec->required; index++) {
+    if (values[index] == NULL) {
+      PyErr_Format(PyExc_TypeError, "%s() missing required argument '%s'",
+                   spec->function, spec->names[index]);
+      return 0;
+    }
+  }
+  return 1;
+}
+
+// Borrow the contents of a bytes argument of at most max_len bytes. Without len the argument is
+// used as a C string and may not contain NUL bytes.
+int bytes_argument(const Argument_spec *spec, int index, PyObject *value, Py_ssize_t max_len,
+                   const char **data, Py_ssize_t *len) {
+  Py_ssize_t size;
+
+  if (!PyBytes_Check(value)) {
+    PyErr_Format(PyExc_TypeError, "%s() argument '%s' must be bytes, not %.50s",
+                 spec->function, spec->names[index], Py_TYPE(value)->tp_name);
+    return 0;
+  }
+  size = PyBytes_GET_SIZE(value);
+  if (size > max_len) {
+    PyErr_Format(PyExc_ValueError, "%s() argument '%s' is limited to %zd bytes",
+                 spec->function, spec->names[index], max_len);
+    return 0;
+  }
+  *data = PyBytes_AS_STRING(value);
+  if (len != NULL) {
+    *len = size;
+  }
+  else if ((Py_ssize_t)strlen(*data) != size) {
+    PyErr_Format(PyExc_ValueError, "%s() argument '%s' must not contain null bytes",
+                 spec->function, spec->names[index]);
+    return 0;
+  }
+  return 1;
+}
+
+// Copy a bytes argument of at most max_len bytes into a C string buffer of max_len + 1 bytes
+int copy_argument(const Argument_spec *spec, int index, PyObject *value, Py_ssize_t max_len,
+                  char *buffer) {
+  const char *data;
+
+  if (!bytes_argument(spec, index, value, max_len, &data, NULL)) {
+    return 0;
+  }
+  memset(buffer, 0x00, max_len + 1);
+  memcpy(buffer, data, PyBytes_GET_SIZE(value));
+  return 1;
+}
+
+int int_argument(const Argument_spec *spec, int index, PyObject *value, int *result) {
+  long number = PyLong_AsLong(value);
+
+  if (number == -1 && PyErr_Occurred()) {
+    return 0;
+  }
+  if (number < INT_MIN || number > INT_MAX) {
+    PyErr_Format(PyExc_OverflowError, "%s() argument '%s' does not fit in a C int",
+                 spec->function, spec->names[index]);
+    return 0;
+  }
+  *result = (int)number;
+  return 1;
+}
+
+int byte_argument(const Argument_spec *spec, int index, PyObject *value, unsigned char *result) {
+  long number = PyLong_AsLong(value);
+
+  if (number == -1 && PyErr_Occurred()) {
+    return 0;
+  }
+  if (number < 0 || number > UCHAR_MAX) {
+    PyErr_Format(PyExc_OverflowError, "%s() argument '%s' must be within 0 and 255",
+                 spec->function, spec->names[index]);
+    return 0;
+  }
+  *result = (unsigned char)number;
+  return 1;
+}
+
+int ssize_argument(const Argument_spec *spec, int index, PyObject *value, Py_ssize_t *result) {
+  *result = PyNumber_AsSsize_t(value, PyExc_OverflowError);
+  return !(*result == -1 && PyErr_Occurred());
+}
+
+int flag_argument(PyObject *value, int *result) {
+  *result = PyObject_IsTrue(value);
+  return *result >= 0;
+}
+
+int buffer_argument(const Argument_spec *spec, int index, PyObject *value, Py_buffer *view) {
+  if (PyUnicode_Check(value)) {
+    PyErr_Format(PyExc_TypeError, "%s() argument '%s' must be a bytes-like object, not str",
+                 spec->function, spec->names[index]);
+    return 0;
+  }
+  return PyObject_GetBuffer(value, view, PyBUF_SIMPLE) == 0;
+}
@@ -0,0 +1,582 @@
+/*
+* This program and the accompanying materials are made available under the terms of the *
+* Eclipse Public License v2.0 which accompanies this distribution, and is available at *
+* https://www.eclipse.org/legal/epl-v20.html                                      *
+*                                                                                 *
+* SPDX-License-Identifier: EPL-2.0                                                *
+*                                                                                 *
+*/
+
+#include <stdint.h>
+#include <string.h>
+
+#include "keyring_entry.h"
+
+static const char *usage_names[USAGE_COUNT] = {"PERSONAL", "CERTAUTH", "OTHER"};
+static const char *status_names[STATUS_COUNT] = {"TRUST", "HIGHTRUST", "NOTRUST", "UNKNOWN"};
+static const char *field_names[] = {"label", "owner", "usage", "status", "default", "certificate", NULL};
+
+#define FNV_OFFSET_BASIS 0xcbf29ce484222325ULL
+#define FNV_PRIME 0x100000001b3ULL
+
+// Compact, immutable certificate entry. Label, owner and certificate are kept exactly as
+// R_datalib returned them and only decoded or encoded when the attribute is read.
+typedef struct {
+  PyObject_HEAD
+  PyObject *label;            // label bytes in the caller's codepage
+  PyObject *owner;            // owner bytes in the caller's codepage, trailing blanks removed
+  PyObject *usage;            // interned usage name
+  PyObject *status;           // interned status name
+  PyObject *certificate;      // DER certificate bytes, or None when listed without bodies
+  PyObject *private_key;      // private key bytes when listed with private keys, or None
+  PyObject *record_id;        // RACF record ID bytes as R_datalib returned them, or None
+  PyObject *codepage;         // codepage used to decode label and owner, or NULL for bytes
+  PyObject *encoder;          // callable applied to certificate on access, or NULL for DER
+  PyObject *label_text;       // decoded label, filled in on first access
+  PyObject *owner_text;       // decoded owner, filled in on first access
+  PyObject *certificate_text; // encoder result, filled in on first access
+  uint64_t digest;            // FNV-1a of certificate, usage, status and default flag
+  int is_default;
+} CertificateEntryObject;
+
+static uint64_t fnv1a(uint64_t hash, const char *data, Py_ssize_t length) {
+  Py_ssize_t i;
+
+  for (i = 0; i < length; i++) {
+    hash ^= (unsigned char)data[i];
+    hash *= FNV_PRIME;
+  }
+  return hash;
+}
+
+// Digest identifying an entry's content, so changes can be detected without certificate bodies
+static uint64_t entryDigest(const char *certificate, Py_ssize_t certificate_len,
+                            const char *usage, const char *status, int is_default) {
+  uint64_t hash = fnv1a(FNV_OFFSET_BASIS, certificate, certificate_len);
+  char flag = is_default ? 1 : 0;
+
+  hash = fnv1a(hash, usage, strlen(usage) + 1);
+  hash = fnv1a(hash, status, strlen(status) + 1);
+  return fnv1a(hash, &flag, 1);
+}
+
+static int lengthWithoutTralingSpaces(char *str, int maxlen) {
+  char *end = str + maxlen - 1;
+  while (end >= str && *end == 0x40) end--;
+  return end - str + 1;
+}
+
+static int usageIndex(int certificate_usage) {
+  switch (certificate_usage) {
+    case 0x00000008:
+      return USAGE_PERSONAL;
+    case 0x00000002:
+      return USAGE_CERTAUTH;
+    default:
+      return USAGE_OTHER;
+  }
+}
+
+static int statusIndex(int certificate_status) {
+  switch (certificate_status) {
+    case 0x80000000:
+      return STATUS_TRUST;
+    case 0x40000000:
+      return STATUS_HIGHTRUST;
+    case 0x20000000:
+      return STATUS_NOTRUST;
+    default:
+      return STATUS_UNKNOWN;
+  }
+}
+
+static CertificateEntryObject* allocEntry(PyTypeObject *type, PyObject *codepage, PyObject *encoder) {
+  CertificateEntryObject *entry = PyObject_GC_New(CertificateEntryObject, type);
+  if (entry == NULL) {
+    return NULL;
+  }
+  entry->label = entry->owner = entry->usage = entry->status = entry->certificate = NULL;
+  entry->private_key = entry->record_id = NULL;
+  entry->label_text = entry->owner_text = entry->certificate_text = NULL;
+  entry->codepage = (codepage == Py_None) ? NULL : codepage;
+  entry->encoder = (encoder == Py_None) ? NULL : encoder;
+  Py_XINCREF(entry->codepage);
+  Py_XINCREF(entry->encoder);
+  entry->digest = 0;
+  entry->is_default = 0;
+  return entry;
+}
+
+// Certificate bytes for a DER held in a work buffer. An interner is called with a memoryview of
+// the buffer, released once it returns, and may hand back a bytes object it already holds
+// instead of a new copy.
+PyObject* intern_certificate(PyObject *interner, const char *der, Py_ssize_t der_len) {
+  PyObject *view, *certificate, *released;
+  PyObject *type, *value, *traceback;
+
+  if (interner == NULL) {
+    return PyBytes_FromStringAndSize(der, der_len);
+  }
+  view = PyMemoryView_FromMemory((char *)der, der_len, PyBUF_READ);
+  if (view == NULL) {
+    return NULL;
+  }
+  certificate = PyObject_CallOneArg(interner, view);
+  // The buffer is reused for the next entry, so the view must not outlive this call
+  PyErr_Fetch(&type, &value, &traceback);
+  released = PyObject_CallMethod(view, "release", NULL);
+  Py_DECREF(view);
+  if (released == NULL) {
+    Py_XDECREF(type);
+    Py_XDECREF(value);
+    Py_XDECREF(traceback);
+    Py_XDECREF(certificate);
+    return NULL;
+  }
+  Py_DECREF(released);
+  PyErr_Restore(type, value, traceback);
+  if (certificate != NULL && !PyBytes_Check(certificate)) {
+    PyErr_SetString(PyExc_TypeError, "interner must return bytes");
+    Py_CLEAR(certificate);
+  }
+  return certificate;
+}
+
+// Build a certificate entry from the current contents of a DataGetFirst/DataGetNext parmlist.
+// Without bodies the certificate is only folded into the digest and not copied into Python.
+// With an interner the certificate is looked up through it before a copy is made.
+// The private key is only copied when asked for.
+PyObject* new_certificate_entry(cpydatalib_state *state, R_datalib_data_get *getParm,
+                                PyObject *codepage, PyObject *encoder, PyObject *interner,
+                                int bodies, int private_key) {
+  int usage = usageIndex(getParm->certificate_usage);
+  int status = statusIndex(getParm->certificate_status);
+  CertificateEntryObject *entry = allocEntry(state->entry_type, codepage, encoder);
+  if (entry == NULL) {
+    return NULL;
+  }
+
+  entry->label = PyBytes_FromStringAndSize(getParm->label_ptr, getParm->label_len);
+  entry->owner = PyBytes_FromStringAndSize(getParm->cert_userid,
+                   lengthWithoutTralingSpaces(getParm->cert_userid, MAX_USERID_LEN));
+  if (bodies) {
+    entry->certificate = intern_certificate(interner == Py_None ? NULL : interner,
+                                            getParm->certificate_ptr, getParm->certificate_len);
+  }
+  else {
+    entry->certificate = Py_NewRef(Py_None);
+  }
+  if (private_key && getParm->private_key_len > 0) {
+    entry->private_key = PyBytes_FromStringAndSize(getParm->private_key_ptr, getParm->private_key_len);
+  }
+  else {
+    entry->private_key = Py_NewRef(Py_None);
+  }
+  entry->record_id = PyBytes_FromStringAndSize(getParm->record_ID_ptr, getParm->record_ID_length);
+  entry->usage = Py_NewRef(state->usage_values[usage]);
+  entry->status = Py_NewRef(state->status_values[status]);
+  entry->is_default = getParm->Default;
+  entry->digest = entryDigest(getParm->certificate_ptr, getParm->certificate_len,
+                              usage_names[usage], status_names[status], getParm->Default);
+  PyObject_GC_Track(entry);
+
+  if (entry->label == NULL || entry->owner == NULL || entry->certificate == NULL ||
+      entry->private_key == NULL || entry->record_id == NULL) {
+    Py_DECREF(entry);
+    return NULL;
+  }
+  return (PyObject *)entry;
+}
+
+static PyObject* CertificateEntry_new(PyTypeObject *type, PyObject *args, PyObject *kwargs) {
+  PyObject *label, *owner, *usage, *status, *certificate;
+  PyObject *codepage = Py_None, *encoder = Py_None, *private_key = Py_None;
+  PyObject *record_id = Py_None, *digest = Py_None;
+  int is_default;
+  CertificateEntryObject *entry;
+
+  static char *kwlist[] = {"label", "owner", "usage", "status", "default", "certificate",
+                           "codepage", "encoder", "private_key", "record_id", "digest", NULL};
+
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "SSUUiO|OO$OOO", kwlist, &label, &owner,
+                                   &usage, &status, &is_default, &certificate,
+                                   &codepage, &encoder, &private_key, &record_id, &digest)) {
+    return NULL;
+  }
+  if (certificate != Py_None && !PyBytes_Check(certificate)) {
+    PyErr_SetString(PyExc_TypeError, "certificate must be bytes or None");
+    return NULL;
+  }
+  if ((private_key != Py_None && !PyBytes_Check(private_key)) ||
+      (record_id != Py_None && !PyBytes_Check(record_id))) {
+    PyErr_SetString(PyExc_TypeError, "private_key and record_id must be bytes or None");
+    return NULL;
+  }
+  if (codepage != Py_None && !PyUnicode_Check(codepage)) {
+    PyErr_SetString(PyExc_TypeError, "codepage must be a str or None");
+    return NULL;
+  }
+  if (encoder != Py_None && !PyCallable_Check(encoder)) {
+    PyErr_SetString(PyExc_TypeError, "encoder must be callable or None");
+    return NULL;
+  }
+
+  entry = allocEntry(type, codepage, encoder);
+  if (entry == NULL) {
+    return NULL;
+  }
+  entry->label = Py_NewRef(label);
+  entry->owner = Py_NewRef(owner);
+  entry->certificate = Py_NewRef(certificate);
+  entry->private_key = Py_NewRef(private_key);
+  entry->record_id = Py_NewRef(record_id);
+  entry->usage = Py_NewRef(usage);
+  PyUnicode_InternInPlace(&entry->usage);
+  entry->status = Py_NewRef(status);
+  PyUnicode_InternInPlace(&entry->status);
+  entry->is_default = is_default;
+  if (digest != Py_None) {
+    // Digest of an entry whose certificate is held elsewhere, such as in shared memory
+    entry->digest = PyLong_AsUnsignedLongLong(digest);
+  }
+  else {
+    entry->digest = entryDigest(
+      certificate == Py_None ? "" : PyBytes_AS_STRING(certificate),
+      certificate == Py_None ? 0 : PyBytes_GET_SIZE(certificate),
+      PyUnicode_AsUTF8(entry->usage), PyUnicode_AsUTF8(entry->status), is_default);
+  }
+  PyObject_GC_Track(entry);
+  if (PyErr_Occurred()) {
+    Py_DECREF(entry);
+    return NULL;
+  }
+  return (PyObject *)entry;
+}
+
+static int CertificateEntry_traverse(CertificateEntryObject *self, visitproc visit, void *arg) {
+  Py_VISIT(Py_TYPE(self));
+  Py_VISIT(self->label);
+  Py_VISIT(self->owner);
+  Py_VISIT(self->certificate);
+  Py_VISIT(self->private_key);
+  Py_VISIT(self->record_id);
+  Py_VISIT(self->encoder);
+  Py_VISIT(self->certificate_text);
+  return 0;
+}
+
+static int CertificateEntry_clear(CertificateEntryObject *self) {
+  Py_CLEAR(self->label);
+  Py_CLEAR(self->owner);
+  Py_CLEAR(self->usage);
+  Py_CLEAR(self->status);
+  Py_CLEAR(self->certificate);
+  Py_CLEAR(self->private_key);
+  Py_CLEAR(self->record_id);
+  Py_CLEAR(self->codepage);
+  Py_CLEAR(self->encoder);
+  Py_CLEAR(self->label_text);
+  Py_CLEAR(self->owner_text);
+  Py_CLEAR(self->certificate_text);
+  return 0;
+}
+
+static void CertificateEntry_dealloc(CertificateEntryObject *self) {
+  PyTypeObject *type = Py_TYPE(self);
+
+  PyObject_GC_UnTrack(self);
+  CertificateEntry_clear(self);
+  PyObject_GC_Del(self);
+  Py_DECREF(type);
+}
+
+static PyObject* entryFieldNames(CertificateEntryObject *self) {
+  cpydatalib_state *state = PyType_GetModuleState(Py_TYPE(self));
+
+  return state->field_name_tuple;
+}
+
+// Decode a label or owner on first access when the entry carries a codepage
+static PyObject* decodedText(CertificateEntryObject *self, PyObject *raw, PyObject **cache) {
+  const char *codepage;
+  PyObject *text = NULL;
+
+  if (self->codepage == NULL) {
+    return Py_NewRef(raw);
+  }
+  BEGIN_OBJECT_LOCK(self)
+  if (*cache == NULL) {
+    codepage = PyUnicode_AsUTF8(self->codepage);
+    if (codepage != NULL) {
+      *cache = PyUnicode_Decode(PyBytes_AS_STRING(raw), PyBytes_GET_SIZE(raw), codepage, "strict");
+    }
+  }
+  text = Py_XNewRef(*cache);
+  END_OBJECT_LOCK
+  return text;
+}
+
+static PyObject* CertificateEntry_get_label(CertificateEntryObject *self, void *closure) {
+  return decodedText(self, self->label, &self->label_text);
+}
+
+static PyObject* CertificateEntry_get_owner(CertificateEntryObject *self, void *closure) {
+  return decodedText(self, self->owner, &self->owner_text);
+}
+
+static PyObject* CertificateEntry_get_usage(CertificateEntryObject *self, void *closure) {
+  return Py_NewRef(self->usage);
+}
+
+static PyObject* CertificateEntry_get_status(CertificateEntryObject *self, void *closure) {
+  return Py_NewRef(self->status);
+}
+
+static PyObject* CertificateEntry_get_default(CertificateEntryObject *self, void *closure) {
+  return PyLong_FromLong(self->is_default);
+}
+
+static PyObject* CertificateEntry_get_certificate(CertificateEntryObject *self, void *closure) {
+  PyObject *text;
+
+  if (self->encoder == NULL || !PyBytes_Check(self->certificate)) {
+    return Py_NewRef(self->certificate);
+  }
+  BEGIN_OBJECT_LOCK(self)
+  if (self->certificate_text == NULL) {
+    self->certificate_text = PyObject_CallOneArg(self->encoder, self->certificate);
+  }
+  text = Py_XNewRef(self->certificate_text);
+  END_OBJECT_LOCK
+  return text;
+}
+
+static PyObject* CertificateEntry_get_der(CertificateEntryObject *self, void *closure) {
+  return Py_NewRef(self->certificate);
+}
+
+static PyObject* CertificateEntry_get_private_key(CertificateEntryObject *self, void *closure) {
+  return Py_NewRef(self->private_key);
+}
+
+static PyObject* CertificateEntry_get_record_id(CertificateEntryObject *self, void *closure) {
+  return Py_NewRef(self->record_id);
+}
+
+static PyObject* CertificateEntry_get_digest(CertificateEntryObject *self, void *closure) {
+  return PyLong_FromUnsignedLongLong(self->digest);
+}
+
+// Mapping access so entries can be read like the dictionaries listKeyring() used to return
+static PyObject* CertificateEntry_subscript(CertificateEntryObject *self, PyObject *key) {
+  int found;
+
+  if (!PyUnicode_Check(key)) {
+    PyErr_SetObject(PyExc_KeyError, key);
+    return NULL;
+  }
+  found = PySequence_Contains(entryFieldNames(self), key);
+  if (found <= 0) {
+    if (found == 0) {
+      PyErr_SetObject(PyExc_KeyError, key);
+    }
+    return NULL;
+  }
+  return PyObject_GetAttr((PyObject *)self, key);
+}
+
+static Py_ssize_t CertificateEntry_length(CertificateEntryObject *self) {
+  return PyTuple_GET_SIZE(entryFieldNames(self));
+}
+
+static PyObject* CertificateEntry_iter(CertificateEntryObject *self) {
+  return PyObject_GetIter(entryFieldNames(self));
+}
+
+static PyObject* CertificateEntry_keys(CertificateEntryObject *self, PyObject *Py_UNUSED(ignored)) {
+  return Py_NewRef(entryFieldNames(self));
+}
+
+static PyObject* CertificateEntry_get(CertificateEntryObject *self, PyObject *const *args,
+                                      Py_ssize_t nargs) {
+  PyObject *default_value = nargs == 2 ? args[1] : Py_None, *value;
+
+  if (nargs < 1 || nargs > 2) {
+    PyErr_Format(PyExc_TypeError, "get() takes 1 or 2 arguments (%zd given)", nargs);
+    return NULL;
+  }
+  value = CertificateEntry_subscript(self, args[0]);
+  if (value == NULL && PyErr_ExceptionMatches(PyExc_KeyError)) {
+    PyErr_Clear();
+    return Py_NewRef(default_value);
+  }
+  return value;
+}
+
+// Copy of an entry carrying another certificate object, such as a body spilled to disk
+static PyObject* CertificateEntry_with_certificate(CertificateEntryObject *self, PyObject *certificate) {
+  CertificateEntryObject *entry = allocEntry(Py_TYPE(self), self->codepage ? self->codepage : Py_None,
+                                             self->encoder ? self->encoder : Py_None);
+  if (entry == NULL) {
+    return NULL;
+  }
+  entry->label = Py_NewRef(self->label);
+  entry->owner = Py_NewRef(self->owner);
+  entry->usage = Py_NewRef(self->usage);
+  entry->status = Py_NewRef(self->status);
+  entry->certificate = Py_NewRef(certificate);
+  entry->private_key = Py_NewRef(self->private_key);
+  entry->record_id = Py_NewRef(self->record_id);
+  BEGIN_OBJECT_LOCK(self)
+  entry->label_text = Py_XNewRef(self->label_text);
+  entry->owner_text = Py_XNewRef(self->owner_text);
+  END_OBJECT_LOCK
+  entry->digest = self->digest;
+  entry->is_default = self->is_default;
+  PyObject_GC_Track(entry);
+  return (PyObject *)entry;
+}
+
+static PyObject* CertificateEntry_repr(CertificateEntryObject *self) {
+  PyObject *label, *owner, *repr;
+
+  label = CertificateEntry_get_label(self, NULL);
+  owner = CertificateEntry_get_owner(self, NULL);
+  if (label == NULL || owner == NULL) {
+    Py_XDECREF(label);
+    Py_XDECREF(owner);
+    return NULL;
+  }
+  repr = PyUnicode_FromFormat("CertificateEntry(label=%R, owner=%R, usage=%R, status=%R, default=%d)",
+                              label, owner, self->usage, self->status, self->is_default);
+  Py_DECREF(label);
+  Py_DECREF(owner);
+  return repr;
+}
+
+//CertificateEntry docstrings
+static char certificateEntryDocs[] =
+   "CertificateEntry(label, owner, usage, status, default, certificate, codepage=None, "
+   "encoder=None, *, private_key=None, record_id=None, digest=None): Immutable keyring entry "
+   "returned by listKeyring(). Fields can be read as attributes or by key like the "
+   "dictionaries listKeyring() used to return. certificate may be None for entries listed "
+   "without bodies, and digest then gives the digest the entry had when listed with one. "
+   "When a codepage is given, label and owner are decoded on first access; when an encoder is "
+   "given, certificate returns encoder(der) computed on first access.\n";
+
+static PyMethodDef CertificateEntry_methods[] = {
+   {"keys", (PyCFunction)CertificateEntry_keys, METH_NOARGS,
+      "keys(): Names of the fields available by key."},
+   {"get", (PyCFunction)CertificateEntry_get, METH_FASTCALL,
+      "get(key, default=None): Field value by key, or default for an unknown key."},
+   {"with_certificate", (PyCFunction)CertificateEntry_with_certificate, METH_O,
+      "with_certificate(certificate): Copy of the entry whose certificate and der are the given "
+      "object, such as a lazily loaded body. The digest of the original certificate is kept "
+      "and the encoder is only applied to bytes."},
+  {NULL}
+};
+
+static PyGetSetDef CertificateEntry_getset[] = {
+   {"label", (getter)CertificateEntry_get_label, NULL, "Certificate label.", NULL},
+   {"owner", (getter)CertificateEntry_get_owner, NULL, "Certificate owner.", NULL},
+   {"usage", (getter)CertificateEntry_get_usage, NULL, "PERSONAL, CERTAUTH or OTHER.", NULL},
+   {"status", (getter)CertificateEntry_get_status, NULL,
+      "TRUST, HIGHTRUST, NOTRUST or UNKNOWN.", NULL},
+   {"default", (getter)CertificateEntry_get_default, NULL,
+      "Non-zero when this is the default certificate of the keyring.", NULL},
+   {"certificate", (getter)CertificateEntry_get_certificate, NULL,
+      "DER certificate, or its encoded form when the entry has an encoder.", NULL},
+   {"der", (getter)CertificateEntry_get_der, NULL,
+      "DER certificate, None when listed without bodies, or the object an entry was copied "
+      "with by with_certificate().", NULL},
+   {"private_key", (getter)CertificateEntry_get_private_key, NULL,
+      "Private key, when listed with private keys and the certificate has one, else None.", NULL},
+   {"record_id", (getter)CertificateEntry_get_record_id, NULL,
+      "RACF record ID of the certificate as bytes, or None when not known.", NULL},
+   {"digest", (getter)CertificateEntry_get_digest, NULL,
+      "64-bit FNV-1a digest of certificate, usage, status and default flag. Available "
+      "even when listed without bodies, for cheap change detection.", NULL},
+  {NULL}
+};
+
+static PyType_Slot CertificateEntry_slots[] = {
+  {Py_tp_doc, certificateEntryDocs},
+  {Py_tp_new, CertificateEntry_new},
+  {Py_tp_dealloc, CertificateEntry_dealloc},
+  {Py_tp_traverse, CertificateEntry_traverse},
+  {Py_tp_clear, CertificateEntry_clear},
+  {Py_tp_repr, CertificateEntry_repr},
+  {Py_tp_iter, CertificateEntry_iter},
+  {Py_mp_length, CertificateEntry_length},
+  {Py_mp_subscript, CertificateEntry_subscript},
+  {Py_tp_methods, CertificateEntry_methods},
+  {Py_tp_getset, CertificateEntry_getset},
+  {0, NULL}
+};
+
+static PyType_Spec CertificateEntry_spec = {
+  .name = "cpydatalib.CertificateEntry",
+  .basicsize = sizeof(CertificateEntryObject),
+  .itemsize = 0,
+  .flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_HAVE_GC | Py_TPFLAGS_IMMUTABLETYPE,
+  .slots = CertificateEntry_slots,
+};
+
+// Create the CertificateEntry type of a module and intern the values shared by its entries
+int init_certificate_entry_state(PyObject *module, cpydatalib_state *state) {
+  PyObject *name;
+  int i;
+
+  for (i = 0; i < USAGE_COUNT; i++) {
+    if ((state->usage_values[i] = PyUnicode_InternFromString(usage_names[i])) == NULL) {
+      return -1;
+    }
+  }
+  for (i = 0; i < STATUS_COUNT; i++) {
+    if ((state->status_values[i] = PyUnicode_InternFromString(status_names[i])) == NULL) {
+      return -1;
+    }
+  }
+  state->field_name_tuple = PyTuple_New(6);
+  if (state->field_name_tuple == NULL) {
+    return -1;
+  }
+  for (i = 0; field_names[i] != NULL; i++) {
+    if ((name = PyUnicode_InternFromString(field_names[i])) == NULL) {
+      return -1;
+    }
+    PyTuple_SET_ITEM(state->field_name_tuple, i, name);
+  }
+  state->entry_type = (PyTypeObject *)PyType_FromModuleAndSpec(module, &CertificateEntry_spec, NULL);
+  if (state->entry_type == NULL) {
+    return -1;
+  }
+  return PyModule_AddType(module, state->entry_type);
+}
+
+int traverse_certificate_entry_state(cpydatalib_state *state, visitproc visit, void *arg) {
+  int i;
+
+  for (i = 0; i < USAGE_COUNT; i++) {
+    Py_VISIT(state->usage_values[i]);
+  }
+  for (i = 0; i < STATUS_COUNT; i++) {
+    Py_VISIT(state->status_values[i]);
+  }
+  Py_VISIT(state->field_name_tuple);
+  Py_VISIT(state->entry_type);
+  return 0;
+}
+
+void clear_certificate_entry_state(cpydatalib_state *state) {
+  int i;
+
+  for (i = 0; i < USAGE_COUNT; i++) {
+    Py_CLEAR(state->usage_values[i]);
+  }
+  for (i = 0; i < STATUS_COUNT; i++) {
+    Py_CLEAR(state->status_values[i]);
+  }
+  Py_CLEAR(state->field_name_tuple);
+  Py_CLEAR(state->entry_type);
+}
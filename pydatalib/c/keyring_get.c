@@ -12,7 +12,15 @@
 
 #include "keyring_get.h"
 
-void get_data(char *userid, char *keyring, char *label , Data_get_buffers *buffers, Return_codes *rc) {
+void get_data(char *userid, char *keyring, int match, char *label , Data_get_buffers *buffers, Return_codes *rc) {
+    R_datalib_parm_list_64 rdatalib_parms;
+
+    prepare_R_datalib_parameters(&rdatalib_parms, userid, keyring);
+    get_data_with_parameters(&rdatalib_parms, match, label, buffers, rc);
+}
+
+// Same as get_data(), but reuses a parameter list already prepared for the userid and keyring
+void get_data_with_parameters(R_datalib_parm_list_64 *rdatalib_parms, int match, char *label, Data_get_buffers *buffers, Return_codes *rc) {
     R_datalib_data_get get_parm;
     memset(&get_parm, 0x00, sizeof(R_datalib_data_get));
     R_datalib_result_handle handle;
@@ -20,12 +28,15 @@ void get_data(char *userid, char *keyring, char *label , Data_get_buffers *buffe
 
     R_datalib_function function = {"", GETCERT_CODE, 0x80000000, 0, &get_parm};
 
-    // Configure result handle. Request a certificate with a specific label
+    // Configure result handle. Request a certificate with a specific label, or the
+    // keyring's default certificate, for which no attribute data is passed
 
     handle.number_predicates = 1; 
-    handle.attribute_id = 1; // Attribute data to match on is label
-    handle.attribute_length = strlen(label);
-    handle.attribute_ptr = label;
+    handle.attribute_id = match;
+    if (match == MATCH_LABEL) {
+        handle.attribute_length = strlen(label);
+        handle.attribute_ptr = label;
+    }
 
     get_parm.handle = &handle;
     get_parm.certificate_len = MAX_CERTIFICATE_LEN;
@@ -40,20 +51,19 @@ void get_data(char *userid, char *keyring, char *label , Data_get_buffers *buffe
     get_parm.record_ID_length = MAX_RECORD_ID_LEN;
     get_parm.record_ID_ptr = buffers->record_id;
 
-    R_datalib_parm_list_64 rdatalib_parms;
-   
-    set_up_R_datalib_parameters(&rdatalib_parms, &function, userid, keyring);
-    invoke_R_datalib(&rdatalib_parms);
+    load_R_datalib_function(rdatalib_parms, &function);
+    invoke_R_datalib(rdatalib_parms);
 
     buffers->certificate_length = get_parm.certificate_len;
     buffers->label_length = get_parm.label_len;
     buffers-> private_key_length = get_parm.private_key_len;
     buffers->subject_DN_length = get_parm.subjects_DN_length;
+    buffers->record_id_length = get_parm.record_ID_length;
 
-    rc->function_code  = rdatalib_parms.function_code;
-    rc->SAF_return_code = rdatalib_parms.return_code;
-    rc->RACF_return_code = rdatalib_parms.RACF_return_code;
-    rc->RACF_reason_code = rdatalib_parms.RACF_reason_code;
+    rc->function_code  = rdatalib_parms->function_code;
+    rc->SAF_return_code = rdatalib_parms->return_code;
+    rc->RACF_return_code = rdatalib_parms->RACF_return_code;
+    rc->RACF_reason_code = rdatalib_parms->RACF_reason_code;
 
     // run Data abort to free up resources 
     R_datalib_data_abort data_abort;
@@ -64,8 +74,8 @@ void get_data(char *userid, char *keyring, char *label , Data_get_buffers *buffe
     abort_function.parm_list_version = 0;
     abort_function.parmlist = &data_abort;
 
-    set_up_R_datalib_parameters(&rdatalib_parms, &abort_function, userid, keyring);
-    invoke_R_datalib(&rdatalib_parms);
+    load_R_datalib_function(rdatalib_parms, &abort_function);
+    invoke_R_datalib(rdatalib_parms);
 
     return;
 }
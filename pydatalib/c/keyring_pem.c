@@ -0,0 +1,411 @@
+/*
+* This program and the accompanying materials are made available under the terms of the *
+* Eclipse Public License v2.0 which accompanies this distribution, and is available at *
+* https://www.eclipse.org/legal/epl-v20.html                                      *
+*                                                                                 *
+* SPDX-License-Identifier: EPL-2.0                                                *
+*                                                                                 *
+*/
+
+#include <string.h>
+
+#include "keyring_args.h"
+#include "keyring_pem.h"
+
+// PEM text is ASCII whatever the compiler's character set, so every character written or
+// matched below is given by its ASCII code rather than as a character literal.
+#define ASCII_NEWLINE 0x0A
+#define ASCII_HYPHEN 0x2D
+
+#define B64_INVALID -1
+#define B64_SPACE -2
+#define B64_PAD -3
+
+static const unsigned char base64Alphabet[64] = {
+  0x41, 0x42, 0x43, 0x44, 0x45, 0x46, 0x47, 0x48, 0x49, 0x4a, 0x4b, 0x4c, 0x4d, 0x4e, 0x4f,
+  0x50, 0x51, 0x52, 0x53, 0x54, 0x55, 0x56, 0x57, 0x58, 0x59, 0x5a, 0x61, 0x62, 0x63, 0x64,
+  0x65, 0x66, 0x67, 0x68, 0x69, 0x6a, 0x6b, 0x6c, 0x6d, 0x6e, 0x6f, 0x70, 0x71, 0x72, 0x73,
+  0x74, 0x75, 0x76, 0x77, 0x78, 0x79, 0x7a, 0x30, 0x31, 0x32, 0x33, 0x34, 0x35, 0x36, 0x37,
+  0x38, 0x39, 0x2b, 0x2f
+};
+
+// Sextet of each ASCII byte, or B64_SPACE for space, tab, CR and LF, B64_PAD for '='
+static const signed char base64Values[256] = {
+  -1, -1, -1, -1, -1, -1, -1, -1, -1, -2, -2, -1, -1, -2, -1, -1,
+  -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+  -2, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, 62, -1, -1, -1, 63,
+  52, 53, 54, 55, 56, 57, 58, 59, 60, 61, -1, -1, -1, -3, -1, -1,
+  -1,  0,  1,  2,  3,  4,  5,  6,  7,  8,  9, 10, 11, 12, 13, 14,
+  15, 16, 17, 18, 19, 20, 21, 22, 23, 24, 25, -1, -1, -1, -1, -1,
+  -1, 26, 27, 28, 29, 30, 31, 32, 33, 34, 35, 36, 37, 38, 39, 40,
+  41, 42, 43, 44, 45, 46, 47, 48, 49, 50, 51, -1, -1, -1, -1, -1,
+  -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+  -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+  -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+  -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+  -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+  -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+  -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+  -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1, -1,
+};
+
+// "-----", "BEGIN " and "END " in ASCII
+static const unsigned char pemDashes[5] = {0x2d, 0x2d, 0x2d, 0x2d, 0x2d};
+static const unsigned char pemBegin[6] = {0x42, 0x45, 0x47, 0x49, 0x4e, 0x20};
+static const unsigned char pemEnd[4] = {0x45, 0x4e, 0x44, 0x20};
+
+static const char *defaultLabel = "\x43\x45\x52\x54\x49\x46\x49\x43\x41\x54\x45"; // CERTIFICATE
+
+// Length of the PEM block for der_len bytes, or -1 when that would not fit a Py_ssize_t
+static Py_ssize_t pemLength(Py_ssize_t der_len, Py_ssize_t label_len) {
+  Py_ssize_t text_len, markers = 2 * (sizeof(pemDashes) * 2 + label_len + 1) +
+                                 sizeof(pemBegin) + sizeof(pemEnd);
+
+  if (der_len > (PY_SSIZE_T_MAX - markers) / 3 * 2) {
+    return -1;
+  }
+  text_len = (der_len + 2) / 3 * 4;
+  return markers + text_len + (text_len + PEM_LINE_LEN - 1) / PEM_LINE_LEN;
+}
+
+static unsigned char* writeMarker(unsigned char *out, const unsigned char *word, size_t word_len,
+                                  const char *label, Py_ssize_t label_len) {
+  memcpy(out, pemDashes, sizeof(pemDashes));
+  out += sizeof(pemDashes);
+  memcpy(out, word, word_len);
+  out += word_len;
+  memcpy(out, label, label_len);
+  out += label_len;
+  memcpy(out, pemDashes, sizeof(pemDashes));
+  out += sizeof(pemDashes);
+  *out++ = ASCII_NEWLINE;
+  return out;
+}
+
+// Write a PEM block with lines of PEM_LINE_LEN characters, returning the end of the output
+static unsigned char* writePem(unsigned char *out, const unsigned char *der, Py_ssize_t der_len,
+                               const char *label, Py_ssize_t label_len) {
+  const unsigned char *end = der + der_len;
+  unsigned int bits;
+  int column = 0;
+
+  out = writeMarker(out, pemBegin, sizeof(pemBegin), label, label_len);
+  for (; end - der >= 3; der += 3) {
+    bits = (der[0] << 16) | (der[1] << 8) | der[2];
+    out[0] = base64Alphabet[bits >> 18];
+    out[1] = base64Alphabet[(bits >> 12) & 0x3f];
+    out[2] = base64Alphabet[(bits >> 6) & 0x3f];
+    out[3] = base64Alphabet[bits & 0x3f];
+    out += 4;
+    column += 4;
+    if (column == PEM_LINE_LEN) {
+      *out++ = ASCII_NEWLINE;
+      column = 0;
+    }
+  }
+  if (end > der) {
+    bits = der[0] << 16;
+    if (end - der == 2) {
+      bits |= der[1] << 8;
+    }
+    out[0] = base64Alphabet[bits >> 18];
+    out[1] = base64Alphabet[(bits >> 12) & 0x3f];
+    out[2] = end - der == 2 ? base64Alphabet[(bits >> 6) & 0x3f] : 0x3d;
+    out[3] = 0x3d;
+    out += 4;
+    column += 4;
+  }
+  if (column > 0) {
+    *out++ = ASCII_NEWLINE;
+  }
+  return writeMarker(out, pemEnd, sizeof(pemEnd), label, label_len);
+}
+
+// Accept an RFC 7468 label: printable ASCII without hyphens, at most PEM_MAX_LABEL_LEN long
+static int labelArgument(const Argument_spec *spec, PyObject *value, const char **label,
+                         Py_ssize_t *label_len) {
+  Py_ssize_t i;
+
+  if (value == NULL) {
+    *label = defaultLabel;
+    *label_len = strlen(defaultLabel);
+    return 1;
+  }
+  if (!PyUnicode_Check(value)) {
+    PyErr_Format(PyExc_TypeError, "%s() argument 'label' must be str, not %.50s", spec->function,
+                 Py_TYPE(value)->tp_name);
+    return 0;
+  }
+  *label = PyUnicode_AsUTF8AndSize(value, label_len);
+  if (*label == NULL) {
+    return 0;
+  }
+  if (*label_len == 0 || *label_len > PEM_MAX_LABEL_LEN) {
+    PyErr_Format(PyExc_ValueError, "%s() label must be 1 to %d characters", spec->function,
+                 PEM_MAX_LABEL_LEN);
+    return 0;
+  }
+  for (i = 0; i < *label_len; i++) {
+    unsigned char c = (unsigned char)(*label)[i];
+    if (c < 0x20 || c > 0x7e || c == ASCII_HYPHEN) {
+      PyErr_Format(PyExc_ValueError, "%s() label must be printable ASCII without hyphens",
+                   spec->function);
+      return 0;
+    }
+  }
+  return 1;
+}
+
+static const char * const pemEncodeNames[] = {"data", "label", NULL};
+static const Argument_spec pemEncodeSpec = {"pemEncode", pemEncodeNames, 1, 2};
+
+PyObject* pemEncode(PyObject *self, PyObject *const *args, Py_ssize_t nargs, PyObject *kwnames) {
+  PyObject *values[2], *text;
+  Py_buffer der;
+  const char *label;
+  Py_ssize_t label_len, length;
+
+  if (!collect_arguments(&pemEncodeSpec, args, nargs, kwnames, values) ||
+      !labelArgument(&pemEncodeSpec, values[1], &label, &label_len) ||
+      !buffer_argument(&pemEncodeSpec, 0, values[0], &der)) {
+    return NULL;
+  }
+  length = pemLength(der.len, label_len);
+  text = length < 0 ? PyErr_NoMemory() : PyUnicode_New(length, 127);
+  if (text != NULL) {
+    writePem(PyUnicode_1BYTE_DATA(text), der.buf, der.len, label, label_len);
+  }
+  PyBuffer_Release(&der);
+  return text;
+}
+
+// Buffer of a bundle item: a bytes-like object, or the der of a CertificateEntry
+static int itemBuffer(PyObject *item, Py_buffer *view) {
+  PyObject *der;
+  int status;
+
+  if (PyObject_CheckBuffer(item) && !PyUnicode_Check(item)) {
+    return PyObject_GetBuffer(item, view, PyBUF_SIMPLE) == 0;
+  }
+  der = PyObject_GetAttrString(item, "der");
+  if (der == NULL) {
+    PyErr_Format(PyExc_TypeError, "pemBundle() items must be bytes-like or have a der, not %.50s",
+                 Py_TYPE(item)->tp_name);
+    return 0;
+  }
+  status = PyObject_GetBuffer(der, view, PyBUF_SIMPLE) == 0;
+  Py_DECREF(der);
+  return status;
+}
+
+static const char * const pemBundleNames[] = {"items", "label", NULL};
+static const Argument_spec pemBundleSpec = {"pemBundle", pemBundleNames, 1, 2};
+
+PyObject* pemBundle(PyObject *self, PyObject *const *args, Py_ssize_t nargs, PyObject *kwnames) {
+  PyObject *values[2], *items, *bundle = NULL;
+  Py_buffer *views;
+  const char *label;
+  Py_ssize_t label_len, count, acquired = 0, total = 0, length, i;
+  unsigned char *out;
+
+  if (!collect_arguments(&pemBundleSpec, args, nargs, kwnames, values) ||
+      !labelArgument(&pemBundleSpec, values[1], &label, &label_len)) {
+    return NULL;
+  }
+  items = PySequence_Fast(values[0], "pemBundle() items must be iterable");
+  if (items == NULL) {
+    return NULL;
+  }
+  count = PySequence_Fast_GET_SIZE(items);
+  views = PyMem_New(Py_buffer, count > 0 ? count : 1);
+  if (views == NULL) {
+    Py_DECREF(items);
+    return PyErr_NoMemory();
+  }
+  for (; acquired < count; acquired++) {
+    if (!itemBuffer(PySequence_Fast_GET_ITEM(items, acquired), &views[acquired])) {
+      goto done;
+    }
+    length = pemLength(views[acquired].len, label_len);
+    if (length < 0 || total > PY_SSIZE_T_MAX - length) {
+      PyErr_NoMemory();
+      acquired++;
+      goto done;
+    }
+    total += length;
+  }
+
+  // Every block is written into the one preallocated bytes object, without the GIL
+  bundle = PyBytes_FromStringAndSize(NULL, total);
+  if (bundle != NULL) {
+    out = (unsigned char*)PyBytes_AS_STRING(bundle);
+    Py_BEGIN_ALLOW_THREADS
+    for (i = 0; i < count; i++) {
+      out = writePem(out, views[i].buf, views[i].len, label, label_len);
+    }
+    Py_END_ALLOW_THREADS
+  }
+
+done:
+  for (i = 0; i < acquired; i++) {
+    PyBuffer_Release(&views[i]);
+  }
+  PyMem_Free(views);
+  Py_DECREF(items);
+  return bundle;
+}
+
+// Find needle in haystack[0..len), returning its offset or -1
+static Py_ssize_t findBytes(const unsigned char *haystack, Py_ssize_t len,
+                            const unsigned char *needle, Py_ssize_t needle_len) {
+  const unsigned char *found = haystack, *last = haystack + len - needle_len;
+
+  if (len < needle_len) {
+    return -1;
+  }
+  while (found <= last && (found = memchr(found, needle[0], last - found + 1)) != NULL) {
+    if (memcmp(found, needle, needle_len) == 0) {
+      return found - haystack;
+    }
+    found++;
+  }
+  return -1;
+}
+
+// Decode the base 64 text between a BEGIN and END line into a new bytes object
+static PyObject* decodeBody(const unsigned char *text, Py_ssize_t len) {
+  Py_ssize_t sextets = 0, padding = 0, i;
+  unsigned int bits = 0;
+  int value, pending = 0;
+  unsigned char *out;
+  PyObject *der;
+
+  for (i = 0; i < len; i++) {
+    value = base64Values[text[i]];
+    if (value == B64_SPACE) {
+      continue;
+    }
+    if (value == B64_INVALID || (value >= 0 && padding > 0) || (value == B64_PAD && ++padding > 2)) {
+      PyErr_SetString(PyExc_ValueError, "PEM block holds invalid base 64 text");
+      return NULL;
+    }
+    if (value >= 0) {
+      sextets++;
+    }
+  }
+  if ((sextets + padding) % 4 != 0 || sextets % 4 == 1) {
+    PyErr_SetString(PyExc_ValueError, "PEM block holds truncated base 64 text");
+    return NULL;
+  }
+
+  der = PyBytes_FromStringAndSize(NULL, sextets / 4 * 3 + (sextets % 4 ? sextets % 4 - 1 : 0));
+  if (der == NULL) {
+    return NULL;
+  }
+  out = (unsigned char*)PyBytes_AS_STRING(der);
+  for (i = 0; i < len; i++) {
+    value = base64Values[text[i]];
+    if (value < 0) {
+      continue;
+    }
+    bits = (bits << 6) | value;
+    if (++pending == 4) {
+      *out++ = bits >> 16;
+      *out++ = bits >> 8;
+      *out++ = bits;
+      bits = 0;
+      pending = 0;
+    }
+  }
+  if (pending == 3) {
+    *out++ = bits >> 10;
+    *out++ = bits >> 2;
+  } else if (pending == 2) {
+    *out++ = bits >> 4;
+  }
+  return der;
+}
+
+static const char * const pemDecodeNames[] = {"data", NULL};
+static const Argument_spec pemDecodeSpec = {"pemDecode", pemDecodeNames, 1, 1};
+
+PyObject* pemDecode(PyObject *self, PyObject *const *args, Py_ssize_t nargs, PyObject *kwnames) {
+  PyObject *values[1], *blocks, *block;
+  Py_buffer view;
+  const unsigned char *text, *label;
+  Py_ssize_t len, label_len, begin, end;
+  int buffered = 0;
+
+  if (!collect_arguments(&pemDecodeSpec, args, nargs, kwnames, values)) {
+    return NULL;
+  }
+  if (PyUnicode_Check(values[0])) {
+    if (!PyUnicode_IS_ASCII(values[0])) {
+      PyErr_SetString(PyExc_ValueError, "pemDecode() text must be ASCII");
+      return NULL;
+    }
+    text = PyUnicode_1BYTE_DATA(values[0]);
+    len = PyUnicode_GET_LENGTH(values[0]);
+  } else if (PyObject_GetBuffer(values[0], &view, PyBUF_SIMPLE) == 0) {
+    buffered = 1;
+    text = view.buf;
+    len = view.len;
+  } else {
+    return NULL;
+  }
+
+  blocks = PyList_New(0);
+  while (blocks != NULL) {
+    // -----BEGIN label-----
+    begin = findBytes(text, len, pemDashes, sizeof(pemDashes));
+    if (begin < 0 || len - begin < (Py_ssize_t)(sizeof(pemDashes) + sizeof(pemBegin)) ||
+        memcmp(text + begin + sizeof(pemDashes), pemBegin, sizeof(pemBegin)) != 0) {
+      if (begin >= 0) {
+        text += begin + sizeof(pemDashes);
+        len -= begin + sizeof(pemDashes);
+        continue;
+      }
+      break;
+    }
+    label = text + begin + sizeof(pemDashes) + sizeof(pemBegin);
+    len -= label - text;
+    text = label;
+    label_len = findBytes(text, len, pemDashes, sizeof(pemDashes));
+    if (label_len < 0 || memchr(label, ASCII_NEWLINE, label_len) != NULL) {
+      PyErr_SetString(PyExc_ValueError, "PEM BEGIN line is not terminated");
+      Py_CLEAR(blocks);
+      break;
+    }
+    text += label_len + sizeof(pemDashes);
+    len -= label_len + sizeof(pemDashes);
+
+    // base 64 text up to -----END label-----
+    end = findBytes(text, len, pemDashes, sizeof(pemDashes));
+    if (end < 0 || len - end < (Py_ssize_t)(2 * sizeof(pemDashes) + sizeof(pemEnd)) + label_len ||
+        memcmp(text + end + sizeof(pemDashes), pemEnd, sizeof(pemEnd)) != 0 ||
+        memcmp(text + end + sizeof(pemDashes) + sizeof(pemEnd), label, label_len) != 0 ||
+        memcmp(text + end + sizeof(pemDashes) + sizeof(pemEnd) + label_len, pemDashes,
+               sizeof(pemDashes)) != 0) {
+      PyErr_SetString(PyExc_ValueError, "PEM block has no matching END line");
+      Py_CLEAR(blocks);
+      break;
+    }
+    block = decodeBody(text, end);
+    if (block != NULL) {
+      block = Py_BuildValue("(s#N)", label, label_len, block);
+    }
+    if (block == NULL || PyList_Append(blocks, block) < 0) {
+      Py_XDECREF(block);
+      Py_CLEAR(blocks);
+      break;
+    }
+    Py_DECREF(block);
+    end += 2 * sizeof(pemDashes) + sizeof(pemEnd) + label_len;
+    text += end;
+    len -= end;
+  }
+  if (buffered) {
+    PyBuffer_Release(&view);
+  }
+  return blocks;
+}
@@ -8,11 +8,15 @@
 */
 
 #include <assert.h>
+#include <limits.h>
 #include <stdlib.h>
 #include <string.h>
 #include <strings.h>
 #include <unistd.h>
 
+#include "keyring_args.h"
+#include "keyring_pem.h"
+#include "keyring_entry.h"
 #include "keyring_get.h"
 
 #define MSG_BUF_LEN 256
@@ -23,6 +27,9 @@
 #define _STRINGIFY(s) #s
 #define STRINGIFY(s) _STRINGIFY(s)
 
+// Value of an optional object argument, or None when it was not given
+#define OR_NONE(value) ((value) != NULL ? (value) : Py_None)
+
 // Function to pass return codes back to caller as pyobject for error handling
 static PyObject* throwRdatalibException(int function, int safRC, int racfRC, int racfRSN ) {
   return Py_BuildValue(
@@ -44,39 +51,107 @@ static PyObject* check_return_code(R_datalib_parm_list_64* p) {
     }
 }
 
+// Validate the optional codepage, encoder and interner applied to listed certificate entries
+static int checkEntryOptions(PyObject *codepage, PyObject *encoder, PyObject *interner) {
+    if (codepage != Py_None && !PyUnicode_Check(codepage)) {
+        PyErr_SetString(PyExc_TypeError, "codepage must be a str or None");
+        return 0;
+    }
+    if (encoder != Py_None && !PyCallable_Check(encoder)) {
+        PyErr_SetString(PyExc_TypeError, "encoder must be callable or None");
+        return 0;
+    }
+    if (interner != Py_None && !PyCallable_Check(interner)) {
+        PyErr_SetString(PyExc_TypeError, "interner must be callable or None");
+        return 0;
+    }
+    return 1;
+}
+
+// Helpers shared by the module functions and the Session methods
+static PyObject* listKeyringWithParameters(cpydatalib_state*, R_datalib_parm_list_64*, Data_get_buffers*,
+                                           PyObject*, PyObject*, PyObject*, int);
+static PyObject* dataRemoveWithParameters(R_datalib_parm_list_64*, char*, char*);
+static PyObject* touchKeyringWithParameters(R_datalib_parm_list_64*, char);
+static PyObject* dataPutWithParameters(R_datalib_parm_list_64*, const char*, const char*, Py_ssize_t,
+                                       Py_buffer*, Py_buffer*, int, int);
+
+// Build the getData() result from buffers filled in by get_data(), passing the certificate
+// through interner when one is given. The label and record ID of the matched certificate are
+// included, as a certificate matched as the default is not known by its label beforehand.
+static PyObject* buildDataResult(Data_get_buffers *buffers, Return_codes *ret_codes,
+                                 PyObject *interner) {
+  PyObject *certificate;
+
+  if (ret_codes->SAF_return_code != 0) {
+    return throwRdatalibException(ret_codes->function_code, ret_codes->SAF_return_code,
+                           ret_codes->RACF_return_code, ret_codes->RACF_reason_code);
+  }
+
+  certificate = intern_certificate(interner == Py_None ? NULL : interner,
+                                   buffers->certificate, buffers->certificate_length);
+  if (certificate == NULL) {
+    return NULL;
+  }
+  return Py_BuildValue(
+    "{s:N,s:y#,s:y#,s:y#}",
+    "certificate", certificate,
+    "privateKey", buffers->private_key, buffers->private_key_length,
+    "label", buffers->label, buffers->label_length,
+    "recordId", buffers->record_id, buffers->record_id_length
+  );
+}
+
+// Select the DataGetFirst predicate for a label or the default certificate, copying the label
+static int selectMatch(const char *label_in, int match_default, char *label) {
+  if (match_default) {
+    if (label_in != NULL) {
+      PyErr_SetString(PyExc_TypeError, "label cannot be given with default=True");
+      return -1;
+    }
+    return MATCH_DEFAULT;
+  }
+  if (label_in == NULL) {
+    PyErr_SetString(PyExc_TypeError, "label is required unless default=True");
+    return -1;
+  }
+  strncpy(label, label_in, MAX_LABEL_LEN);
+  return MATCH_LABEL;
+}
+
 // Entry point to the getData() function
-static PyObject* getData(PyObject* self, PyObject* args, PyObject *kwargs) {
-  const char * userid_in, * keyring_in, * label_in;
-  char userid[MAX_USERID_LEN + 1] = "";
-  char keyring[MAX_KEYRING_LEN + 1] = "";
+static const char * const getDataNames[] = {"userid", "keyring", "label", "interner", "default", NULL};
+static const Argument_spec getDataSpec = {"getData", getDataNames, 2, 3};
+
+static PyObject* getData(PyObject* self, PyObject *const *args, Py_ssize_t nargs, PyObject *kwnames) {
+  PyObject *values[5];
+  const char *label_in = NULL;
+  char userid[MAX_USERID_LEN + 1];
+  char keyring[MAX_KEYRING_LEN + 1];
   char label[MAX_LABEL_LEN + 1] = "";
-  PyObject *buffer_cert, *buffer_key;
+  int match_default = 0, match;
 
-  static char *kwlist[] = {"userid", "keyring", "label", NULL};
-
-  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|yyy", kwlist, &userid_in, &keyring_in, &label_in)) {
+  if (!collect_arguments(&getDataSpec, args, nargs, kwnames, values) ||
+      !copy_argument(&getDataSpec, 0, values[0], MAX_USERID_LEN, userid) ||
+      !copy_argument(&getDataSpec, 1, values[1], MAX_KEYRING_LEN, keyring) ||
+      (values[2] != NULL && !bytes_argument(&getDataSpec, 2, values[2], MAX_LABEL_LEN, &label_in, NULL)) ||
+      (values[4] != NULL && !flag_argument(values[4], &match_default))) {
+      return NULL;
+  }
+  if (!checkEntryOptions(Py_None, Py_None, OR_NONE(values[3]))) {
+      return NULL;
+  }
+  match = selectMatch(label_in, match_default, label);
+  if (match < 0) {
       return NULL;
   }
-
-  strncpy(&userid, userid_in, MAX_USERID_LEN);
-  strncpy(&keyring, keyring_in, MAX_KEYRING_LEN);
-  strncpy(&label, label_in, MAX_LABEL_LEN);
 
   Data_get_buffers buffers;
   memset(&buffers, 0x00, sizeof(Data_get_buffers));
   Return_codes ret_codes;
 
-  get_data(userid, keyring, label, &buffers, &ret_codes);
-  if (ret_codes.SAF_return_code != 0) {
-    return throwRdatalibException(ret_codes.function_code, ret_codes.SAF_return_code,
-                           ret_codes.RACF_return_code, ret_codes.RACF_reason_code);
-  }
-
-  return Py_BuildValue(
-    "{s:y#,s:y#}",
-    "certificate", buffers.certificate, buffers.certificate_length,
-    "privateKey", buffers.private_key, buffers.private_key_length
-  );
+  get_data(userid, keyring, match, label, &buffers, &ret_codes);
+  return buildDataResult(&buffers, &ret_codes, OR_NONE(values[3]));
 }
 
 void resetGetParm(R_datalib_data_get *getParm) {
@@ -88,73 +163,10 @@ void resetGetParm(R_datalib_data_get *getParm) {
   getParm->cert_userid_len = 0x08;
 }
 
-int lengthWithoutTralingSpaces(char *str, int maxlen) {
-  char *end = str + maxlen - 1;
-  while (end >= str && *end == 0x40) end--;
-  return end - str + 1;
-}
-
-// Build a python dictionary with cert information from current certificate
-PyObject *getCertItem(R_datalib_data_get *getParm) {
-  char *usage, *status;
-  int certUserLen;
-
-  certUserLen = lengthWithoutTralingSpaces(getParm->cert_userid, 8);
-
-  switch (getParm->certificate_usage) {
-    case 0x00000008:
-      usage = "PERSONAL";
-      break;
-    case 0x00000002:
-      usage = "CERTAUTH";
-      break;
-    default:
-      usage = "OTHER";
-  }
-
-  switch (getParm->certificate_status) {
-    case 0x80000000:
-      status = "TRUST";
-      break;
-    case 0x40000000:
-      status = "HIGHTRUST";
-      break;
-    case 0x20000000:
-      status = "NOTRUST";
-      break;
-    default:
-      status = "UNKNOWN";
-  }
-
-  return Py_BuildValue(
-    "{s:y#,s:y#,s:s,s:s,s:i,s:y#}",
-    "label", getParm->label_ptr, getParm->label_len,
-    "owner", getParm->cert_userid, certUserLen, "usage", usage,
-    "status", status, "default", getParm->Default,
-    "certificate", getParm->certificate_ptr, getParm->certificate_len
-  );
-
-}
-
-// Entry point to the listKeyring() function
-static PyObject* listKeyring(PyObject* self, PyObject* args, PyObject *kwargs) {
-  const char *userid_in, *keyring_in;
-  char userid[MAX_USERID_LEN + 1] = "";
-  char keyring[MAX_KEYRING_LEN + 1] = "";
-
-  static char *kwlist[] = {"userid", "keyring", NULL};
-
-  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|yy", kwlist, &userid_in, &keyring_in)) {
-      return NULL;
-  }
-
-  strncpy(&userid, userid_in, MAX_USERID_LEN);
-  strncpy(&keyring, keyring_in, MAX_KEYRING_LEN);
-
-  int origMode;
-  int rc = 0;
-  Data_get_buffers buffers;
-  R_datalib_parm_list_64 parms;
+// Walk the keyring with a prepared parameter list and build a list of certificate entries
+static PyObject* listKeyringWithParameters(cpydatalib_state *state, R_datalib_parm_list_64 *parms,
+                                           Data_get_buffers *buffers, PyObject *codepage,
+                                           PyObject *encoder, PyObject *interner, int bodies) {
   R_datalib_data_get getParm;
   R_datalib_result_handle handle;
   R_datalib_data_abort dataAbort;
@@ -163,204 +175,1102 @@ static PyObject* listKeyring(PyObject* self, PyObject* args, PyObject *kwargs) {
   R_datalib_function getNextFunc = {"", GETNEXT_CODE, 0x80000000, 1, &getParm};
   R_datalib_function abortFunc = {"", DATA_ABORT_CODE, 0x00000000, 0, &dataAbort};
 
-  memset(&buffers, 0x00, sizeof(Data_get_buffers));
   memset(&getParm, 0x00, sizeof(R_datalib_data_get));
   memset(&handle, 0x00, sizeof(R_datalib_result_handle));
 
   getParm.handle = &handle;
-  getParm.certificate_ptr = buffers.certificate;
-  getParm.private_key_ptr = buffers.private_key;
-  getParm.label_ptr = buffers.label;
-  getParm.subjects_DN_ptr = buffers.subject_DN;
-  getParm.record_ID_ptr = buffers.record_id;
+  getParm.certificate_ptr = buffers->certificate;
+  getParm.private_key_ptr = buffers->private_key;
+  getParm.label_ptr = buffers->label;
+  getParm.subjects_DN_ptr = buffers->subject_DN;
+  getParm.record_ID_ptr = buffers->record_id;
   // X'80000000' = TRUST; X'40000000' = HIGHTRUST; X'20000000' = NOTRUST; X'00000000' = ANY
   getParm.certificate_status = 0x00000000;
 
-  PyObject *cert_array;
+  PyObject *cert_array, *cert_item;
   cert_array = PyList_New(1);
+  if (cert_array == NULL) {
+    return NULL;
+  }
 
   resetGetParm(&getParm);
-  set_up_R_datalib_parameters(&parms, &getFirstFunc, userid, keyring);
-  invoke_R_datalib(&parms);
+  load_R_datalib_function(parms, &getFirstFunc);
+  invoke_R_datalib(parms);
 
-  if (parms.return_code != 0) {
-    return throwRdatalibException(parms.function_code, parms.return_code, parms.RACF_return_code, parms.RACF_reason_code);
+  if (parms->return_code != 0) {
+    Py_DECREF(cert_array);
+    return throwRdatalibException(parms->function_code, parms->return_code, parms->RACF_return_code, parms->RACF_reason_code);
   }
 
-  PyList_SetItem(cert_array, 0, getCertItem(&getParm));
+  cert_item = new_certificate_entry(state, &getParm, codepage, encoder, interner, bodies, 0);
+  if (cert_item == NULL) {
+    Py_CLEAR(cert_array);
+  }
+  else {
+    PyList_SetItem(cert_array, 0, cert_item);
+  }
 
-  int i = 1;
-  while (1) {
+  while (cert_array != NULL) {
 
     resetGetParm(&getParm);
-    set_up_R_datalib_parameters(&parms, &getNextFunc, userid, keyring);
-    invoke_R_datalib(&parms);
+    load_R_datalib_function(parms, &getNextFunc);
+    invoke_R_datalib(parms);
 
-    if (parms.return_code == 8 && parms.RACF_return_code == 8 && parms.RACF_reason_code == 44) { // No more cert found;
+    if (parms->return_code == 8 && parms->RACF_return_code == 8 && parms->RACF_reason_code == 44) { // No more cert found;
       break;
     }
-    else if (parms.return_code != 0) {
-      return throwRdatalibException(parms.function_code, parms.return_code, parms.RACF_return_code, parms.RACF_reason_code);
+    else if (parms->return_code != 0) {
+      Py_DECREF(cert_array);
+      return throwRdatalibException(parms->function_code, parms->return_code, parms->RACF_return_code, parms->RACF_reason_code);
     }
     else {
-      PyList_Append(cert_array, getCertItem(&getParm));
+      cert_item = new_certificate_entry(state, &getParm, codepage, encoder, interner, bodies, 0);
+      if (cert_item == NULL) {
+        Py_CLEAR(cert_array);
+        break;
+      }
+      PyList_Append(cert_array, cert_item);
+      Py_DECREF(cert_item);
     }
   }
 
   dataAbort.handle = &handle;
-  set_up_R_datalib_parameters(&parms, &abortFunc, userid, keyring);
-  invoke_R_datalib(&parms);
+  load_R_datalib_function(parms, &abortFunc);
+  invoke_R_datalib(parms);
 
   return cert_array;
 }
 
-// Entry point to the dataRemove() function
-static PyObject* dataRemove(PyObject* self, PyObject* args, PyObject *kwargs) {
-    const char * userid_in, * keyring_in, * label_in;
-    char userid[MAX_USERID_LEN + 1] = "";
-    char keyring[MAX_KEYRING_LEN + 1] = "";
-    char label[MAX_LABEL_LEN + 1] = "";
-    PyObject *buffer_cert, *buffer_key;
+// Entry point to the listKeyring() function
+static const char * const listKeyringNames[] = {"userid", "keyring", "codepage", "encoder", "bodies",
+                                                "interner", NULL};
+static const Argument_spec listKeyringSpec = {"listKeyring", listKeyringNames, 2, 2};
+
+static PyObject* listKeyring(PyObject* self, PyObject *const *args, Py_ssize_t nargs, PyObject *kwnames) {
+  PyObject *values[6];
+  char userid[MAX_USERID_LEN + 1];
+  char keyring[MAX_KEYRING_LEN + 1];
+  int bodies = 1;
+
+  if (!collect_arguments(&listKeyringSpec, args, nargs, kwnames, values) ||
+      !copy_argument(&listKeyringSpec, 0, values[0], MAX_USERID_LEN, userid) ||
+      !copy_argument(&listKeyringSpec, 1, values[1], MAX_KEYRING_LEN, keyring) ||
+      (values[4] != NULL && !flag_argument(values[4], &bodies))) {
+      return NULL;
+  }
+  if (!checkEntryOptions(OR_NONE(values[2]), OR_NONE(values[3]), OR_NONE(values[5]))) {
+      return NULL;
+  }
 
-    static char *kwlist[] = {"userid", "keyring", "label", NULL};
+  Data_get_buffers buffers;
+  R_datalib_parm_list_64 parms;
+
+  memset(&buffers, 0x00, sizeof(Data_get_buffers));
+  prepare_R_datalib_parameters(&parms, userid, keyring);
+
+  return listKeyringWithParameters(PyModule_GetState(self), &parms, &buffers, OR_NONE(values[2]),
+                                   OR_NONE(values[3]), OR_NONE(values[5]), bodies);
+}
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|yyy", kwlist, &userid_in, &keyring_in, &label_in)) {
+// Entry point to the dataRemove() function
+static const char * const dataRemoveNames[] = {"userid", "keyring", "label", NULL};
+static const Argument_spec dataRemoveSpec = {"dataRemove", dataRemoveNames, 3, 3};
+
+static PyObject* dataRemove(PyObject* self, PyObject *const *args, Py_ssize_t nargs, PyObject *kwnames) {
+    PyObject *values[3];
+    char userid[MAX_USERID_LEN + 1];
+    char keyring[MAX_KEYRING_LEN + 1];
+    char label[MAX_LABEL_LEN + 1];
+
+    if (!collect_arguments(&dataRemoveSpec, args, nargs, kwnames, values) ||
+        !copy_argument(&dataRemoveSpec, 0, values[0], MAX_USERID_LEN, userid) ||
+        !copy_argument(&dataRemoveSpec, 1, values[1], MAX_KEYRING_LEN, keyring) ||
+        !copy_argument(&dataRemoveSpec, 2, values[2], MAX_LABEL_LEN, label)) {
         return NULL;
     }
 
-    strncpy(&userid, userid_in, MAX_USERID_LEN);
-    strncpy(&keyring, keyring_in, MAX_KEYRING_LEN);
-    strncpy(&label, label_in, MAX_LABEL_LEN);
-
-    R_datalib_function func;
     R_datalib_parm_list_64 rdatalib_parms;
 
-    R_datalib_data_remove rem_parm;
-    memset(&rem_parm, 0x00, sizeof(R_datalib_data_remove));
+    prepare_R_datalib_parameters(&rdatalib_parms, userid, keyring);
+    return dataRemoveWithParameters(&rdatalib_parms, userid, label);
+}
 
-    R_datalib_function dataRemoveFunc = {"DATAREMOVE", DATAREMOVE_CODE, 0x00000000, 0, &rem_parm};
+// Remove a certificate from the keyring of a prepared parameter list
+static PyObject* dataRemoveWithParameters(R_datalib_parm_list_64 *rdatalib_parms, char *userid, char *label) {
+    data_remove(rdatalib_parms, userid, label, strlen(label));
+    return check_return_code(rdatalib_parms);
+}
 
+// Entry point to the touchKeyring() function
+static const char * const touchKeyringNames[] = {"userid", "keyring", "function_code", NULL};
+static const Argument_spec touchKeyringSpec = {"touchKeyring", touchKeyringNames, 3, 3};
+
+static PyObject* touchKeyring(PyObject* self, PyObject *const *args, Py_ssize_t nargs, PyObject *kwnames) {
+    PyObject *values[3];
+    unsigned char function_code;
+    char userid[MAX_USERID_LEN + 1];
+    char keyring[MAX_KEYRING_LEN + 1];
+
+    if (!collect_arguments(&touchKeyringSpec, args, nargs, kwnames, values) ||
+        !copy_argument(&touchKeyringSpec, 0, values[0], MAX_USERID_LEN, userid) ||
+        !copy_argument(&touchKeyringSpec, 1, values[1], MAX_KEYRING_LEN, keyring) ||
+        !byte_argument(&touchKeyringSpec, 2, values[2], &function_code)) {
+        return NULL;
+    }
 
-    rem_parm.label_len = strlen(label);
-    rem_parm.label_addr = label;
-    rem_parm.CERT_userid_len = strlen(userid);
-    memset(rem_parm.CERT_userid, ' ', MAX_USERID_LEN); // fill the CERT_userid field with blanks
-    memcpy(rem_parm.CERT_userid, userid, rem_parm.CERT_userid_len);
+    R_datalib_parm_list_64 rdatalib_parms;
 
-    set_up_R_datalib_parameters(&rdatalib_parms, &dataRemoveFunc, userid, keyring);
-    invoke_R_datalib(&rdatalib_parms);
-    return check_return_code(&rdatalib_parms);
+    prepare_R_datalib_parameters(&rdatalib_parms, userid, keyring);
+    return touchKeyringWithParameters(&rdatalib_parms, function_code);
 }
 
-// Entry point to the touchKeyring() function
-static PyObject* touchKeyring(PyObject* self, PyObject* args, PyObject *kwargs) {
-    const char * userid_in, * keyring_in;
-    const uint8_t function_code;
-    char userid[MAX_USERID_LEN + 1] = "";
-    char keyring[MAX_KEYRING_LEN + 1] = "";
-    PyObject *buffer_cert, *buffer_key;
+// Run a NEWRING, REFRESH or DELRING function against the keyring of a prepared parameter list.
+// Any other function code raises ValueError without calling R_datalib.
+static PyObject* touchKeyringWithParameters(R_datalib_parm_list_64 *rdatalib_parms, char function_code) {
+    if (!touch_keyring(rdatalib_parms, function_code)) {
+        PyErr_Format(PyExc_ValueError,
+                     "touchKeyring() function_code must be 7 (NEWRING), 10 (DELRING) or 11 (REFRESH), "
+                     "not %d", (unsigned char)function_code);
+        return NULL;
+    }
+    return check_return_code(rdatalib_parms);
+}
 
-    static char *kwlist[] = {"userid", "keyring", "function_code", NULL};
+// Check the label, certificate, private_key, usage, default and owner arguments that dataPut()
+// and Session.dataPut() share, starting at values[first]. The certificate and private key
+// buffers are acquired last so nothing needs releasing when a check fails.
+static int dataPutArguments(const Argument_spec *spec, PyObject **values, int first,
+                            const char **label, Py_ssize_t *label_len, Py_buffer *certificate,
+                            Py_buffer *private_key, int *usage, int *is_default, const char **owner) {
+    values += first;
+    if (!bytes_argument(spec, first, values[0], MAX_LABEL_LEN, label, label_len) ||
+        (values[3] != NULL && !int_argument(spec, first + 3, values[3], usage)) ||
+        (values[4] != NULL && !flag_argument(values[4], is_default)) ||
+        (values[5] != NULL && !bytes_argument(spec, first + 5, values[5], MAX_USERID_LEN, owner, NULL))) {
+        return 0;
+    }
+    if (!buffer_argument(spec, first + 1, values[1], certificate)) {
+        return 0;
+    }
+    if (!buffer_argument(spec, first + 2, values[2], private_key)) {
+        PyBuffer_Release(certificate);
+        return 0;
+    }
+    return 1;
+}
 
-    if (!PyArg_ParseTupleAndKeywords(args, kwargs, "|yyb", kwlist, &userid_in, &keyring_in, &function_code)) {
+// Entry point to the dataPut() function
+static const char * const dataPutNames[] = {"userid", "keyring", "label", "certificate", "private_key",
+                                            "usage", "default", "owner", NULL};
+static const Argument_spec dataPutSpec = {"dataPut", dataPutNames, 5, 5};
+
+static PyObject* dataPut(PyObject* self, PyObject *const *args, Py_ssize_t nargs, PyObject *kwnames) {
+    PyObject *values[8];
+    const char *label, *owner = NULL;
+    Py_ssize_t label_len;
+    char userid[MAX_USERID_LEN + 1];
+    char keyring[MAX_KEYRING_LEN + 1];
+    Py_buffer certificate, private_key;
+    int usage = 0, is_default = 0;
+    PyObject *result;
+
+    if (!collect_arguments(&dataPutSpec, args, nargs, kwnames, values) ||
+        !copy_argument(&dataPutSpec, 0, values[0], MAX_USERID_LEN, userid) ||
+        !copy_argument(&dataPutSpec, 1, values[1], MAX_KEYRING_LEN, keyring) ||
+        !dataPutArguments(&dataPutSpec, values, 2, &label, &label_len, &certificate, &private_key,
+                          &usage, &is_default, &owner)) {
         return NULL;
     }
 
-    strncpy(&userid, userid_in, MAX_USERID_LEN);
-    strncpy(&keyring, keyring_in, MAX_KEYRING_LEN);
-
-    R_datalib_function *func;
     R_datalib_parm_list_64 rdatalib_parms;
 
-    R_datalib_function newRingFunc = {"NEWRING", NEWRING_CODE, 0x00000000, 0, NULL};
-    R_datalib_function refreshFunc = {"REFRESH", REFRESH_CODE, 0x00000000, 0, NULL};
-    R_datalib_function delRingFunc = {"DELRING", DELRING_CODE, 0x00000000, 0, NULL};
+    prepare_R_datalib_parameters(&rdatalib_parms, userid, keyring);
+    result = dataPutWithParameters(&rdatalib_parms, owner ? owner : userid, label, label_len,
+                                   &certificate, &private_key, usage, is_default);
+    PyBuffer_Release(&certificate);
+    PyBuffer_Release(&private_key);
+    return result;
+}
+
+// Add a certificate to the keyring of a prepared parameter list. The certificate and key are
+// passed to R_datalib where they are, with their lengths, and the GIL is released for the call.
+static PyObject* dataPutWithParameters(R_datalib_parm_list_64 *rdatalib_parms, const char *owner,
+                                       const char *label, Py_ssize_t label_len,
+                                       Py_buffer *certificate, Py_buffer *private_key,
+                                       int usage, int is_default) {
+    if (certificate->len > INT_MAX || private_key->len > INT_MAX) {
+        PyErr_SetString(PyExc_OverflowError, "certificate and private key must be shorter than 2 GB");
+        return NULL;
+    }
 
-    switch(function_code){
-        case NEWRING_CODE:
-            func = &newRingFunc;
+    Py_BEGIN_ALLOW_THREADS
+    data_put(rdatalib_parms, owner, label, (int)label_len, certificate->buf, (int)certificate->len,
+             private_key->buf, (int)private_key->len, usage, is_default);
+    Py_END_ALLOW_THREADS
+    return check_return_code(rdatalib_parms);
+}
+
+// One operation of an execute() batch, parsed while holding the GIL
+typedef struct {
+    char function_code;
+    char userid[MAX_USERID_LEN + 1];
+    char keyring[MAX_KEYRING_LEN + 1];
+    char label[MAX_LABEL_LEN + 1];
+    int label_len;
+    Py_buffer certificate;
+    Py_buffer private_key;
+    int usage;
+    int is_default;
+} Batch_operation;
+
+// Parse op, a (function_code, userid, keyring[, label[, certificate[, private_key[, usage[,
+// default]]]]]) tuple. Returns 0 with an exception set when it is not a valid operation.
+static int parseBatchOperation(PyObject *op, Py_ssize_t index, Batch_operation *parsed) {
+    unsigned char function_code;
+    const char *userid, *keyring, *label = NULL;
+    Py_ssize_t label_len = 0;
+
+    if (!PyTuple_Check(op)) {
+        PyErr_Format(PyExc_TypeError, "operation %zd must be a tuple", index);
+        return 0;
+    }
+    if (!PyArg_ParseTuple(op, "byy|y#y*y*ip", &function_code, &userid, &keyring, &label, &label_len,
+                          &parsed->certificate, &parsed->private_key, &parsed->usage, &parsed->is_default)) {
+        return 0;
+    }
+    parsed->function_code = function_code;
+    if (strlen(userid) > MAX_USERID_LEN || strlen(keyring) > MAX_KEYRING_LEN || label_len > MAX_LABEL_LEN) {
+        PyErr_Format(PyExc_ValueError,
+          "operation %zd: userid is limited to " STRINGIFY(MAX_USERID_LEN) " bytes, keyring to "
+          STRINGIFY(MAX_KEYRING_LEN) " bytes and label to " STRINGIFY(MAX_LABEL_LEN) " bytes", index);
+        return 0;
+    }
+    switch (function_code) {
+        case DATAPUT_CODE:
+            if (parsed->certificate.obj == NULL) {
+                PyErr_Format(PyExc_ValueError, "operation %zd: DATAPUT needs a label and a certificate", index);
+                return 0;
+            }
+            if (parsed->certificate.len > INT_MAX || parsed->private_key.len > INT_MAX) {
+                PyErr_Format(PyExc_OverflowError, "operation %zd: certificate and private key must be shorter than 2 GB", index);
+                return 0;
+            }
             break;
-        case REFRESH_CODE:
-            func = &refreshFunc;
+        case DATAREMOVE_CODE:
+            if (label == NULL) {
+                PyErr_Format(PyExc_ValueError, "operation %zd: DATAREMOVE needs a label", index);
+                return 0;
+            }
             break;
+        case NEWRING_CODE:
+        case REFRESH_CODE:
         case DELRING_CODE:
-            func = &delRingFunc;
             break;
         default:
-            printf("Error: invalid function code for touchKeyring");
-            return throwRdatalibException(function_code,12,12,12);
+            PyErr_Format(PyExc_ValueError, "operation %zd: unsupported function code %d", index, function_code);
+            return 0;
+    }
+    strncpy(parsed->userid, userid, MAX_USERID_LEN);
+    strncpy(parsed->keyring, keyring, MAX_KEYRING_LEN);
+    if (label != NULL) {
+        memcpy(parsed->label, label, label_len);
+        parsed->label_len = (int)label_len;
     }
-    set_up_R_datalib_parameters(&rdatalib_parms, func, userid, keyring);
-    invoke_R_datalib(&rdatalib_parms);
-    return check_return_code(&rdatalib_parms);
+    return 1;
 }
 
-// Entry point to the dataPut() function
-static PyObject* dataPut(PyObject* self, PyObject* args, PyObject *kwargs) {
-    const char * userid_in, * keyring_in, * label_in, * cert_buff_in, * priv_key_in;
-    Py_ssize_t cert_buff_size, priv_key_size;
-    char userid[MAX_USERID_LEN + 1] = "";
-    char keyring[MAX_KEYRING_LEN + 1] = "";
-    char label[MAX_LABEL_LEN + 1] = "";
-    char cert_buff[MAX_CERTIFICATE_LEN + 1] = "";
-    char priv_key[MAX_PRIVATE_KEY_LEN + 1] = "";
-
-    static char *kwlist[] = {"userid", "keyring", "label", "certificate", "private_key", NULL};
-
-    printf("about to parse args!\n");
-    if (!PyArg_ParseTupleAndKeywords(
-        args, kwargs, "|yyyy#y#", kwlist,
-        &userid_in, &keyring_in, &label_in,
-        &cert_buff_in, &cert_buff_size,
-        &priv_key_in, &priv_key_size
-      )) {
-        return NULL;
+static void releaseBatchOperations(Batch_operation *ops, Py_ssize_t count) {
+    for (Py_ssize_t index = 0; index < count; index++) {
+        PyBuffer_Release(&ops[index].certificate);
+        PyBuffer_Release(&ops[index].private_key);
     }
+    PyMem_Free(ops);
+}
 
-    printf('pasred args\n');
-    strncpy(&userid, userid_in, MAX_USERID_LEN);
-    printf('copied userid\n');
-    strncpy(&keyring, keyring_in, MAX_KEYRING_LEN);
-    printf('copied keyring\n');
-    strncpy(&label, label_in, MAX_LABEL_LEN);
-    printf('copied label\n');
-    strncpy(&cert_buff, cert_buff_in, MAX_CERTIFICATE_LEN);
-    printf('copied certificate data\n');
-    strncpy(&priv_key, priv_key_in, MAX_PRIVATE_KEY_LEN);
-    printf('copied private key\n');
+// A zeroed array('i') of length ints, which keeps return and reason codes above 255 intact
+static PyObject* new_code_array(Py_ssize_t length) {
+    PyObject *array_module, *zeros, *codes;
 
+    array_module = PyImport_ImportModule("array");
+    if (array_module == NULL) {
+        return NULL;
+    }
+    zeros = PyBytes_FromStringAndSize(NULL, length * (Py_ssize_t)sizeof(int));
+    if (zeros == NULL) {
+        Py_DECREF(array_module);
+        return NULL;
+    }
+    memset(PyBytes_AS_STRING(zeros), 0x00, length * sizeof(int));
+    codes = PyObject_CallMethod(array_module, "array", "sO", "i", zeros);
+    Py_DECREF(zeros);
+    Py_DECREF(array_module);
+    return codes;
+}
+
+// Entry point to the execute() function
+static const char * const executeNames[] = {"operations", "stop_on_error", NULL};
+static const Argument_spec executeSpec = {"execute", executeNames, 1, 1};
+
+static PyObject* execute(PyObject* self, PyObject *const *args, Py_ssize_t nargs, PyObject *kwnames) {
+    PyObject *values[2], *sequence, *codes;
+    Batch_operation *ops, *op;
+    Py_ssize_t count, index, parsed = 0;
+    Py_buffer view;
+    int *vector;
+    int stop_on_error = 1;
     R_datalib_parm_list_64 rdatalib_parms;
 
-    R_datalib_data_put put_parm;
-    memset(&put_parm, 0x00, sizeof(R_datalib_data_put));
+    if (!collect_arguments(&executeSpec, args, nargs, kwnames, values) ||
+        (values[1] != NULL && !flag_argument(values[1], &stop_on_error))) {
+        return NULL;
+    }
+    sequence = PySequence_Fast(values[0], "operations must be a sequence");
+    if (sequence == NULL) {
+        return NULL;
+    }
+    count = PySequence_Fast_GET_SIZE(sequence);
+    ops = PyMem_Calloc(count ? count : 1, sizeof(Batch_operation));
+    if (ops == NULL) {
+        Py_DECREF(sequence);
+        return PyErr_NoMemory();
+    }
+    for (; parsed < count; parsed++) {
+        if (!parseBatchOperation(PySequence_Fast_GET_ITEM(sequence, parsed), parsed, &ops[parsed])) {
+            releaseBatchOperations(ops, parsed + 1);
+            Py_DECREF(sequence);
+            return NULL;
+        }
+    }
+    codes = new_code_array(count * 4);
+    if (codes == NULL || PyObject_GetBuffer(codes, &view, PyBUF_WRITABLE) < 0) {
+        Py_XDECREF(codes);
+        releaseBatchOperations(ops, count);
+        Py_DECREF(sequence);
+        return NULL;
+    }
+    vector = (int *)view.buf;
+
+    Py_BEGIN_ALLOW_THREADS
+    for (index = 0; index < count; index++) {
+        op = &ops[index];
+        if (index == 0 || strcmp(op->userid, ops[index - 1].userid) != 0 ||
+            strcmp(op->keyring, ops[index - 1].keyring) != 0) {
+            prepare_R_datalib_parameters(&rdatalib_parms, op->userid, op->keyring);
+        }
+        switch (op->function_code) {
+            case DATAPUT_CODE:
+                data_put(&rdatalib_parms, op->userid, op->label, op->label_len,
+                         op->certificate.buf, (int)op->certificate.len,
+                         op->private_key.buf, (int)op->private_key.len, op->usage, op->is_default);
+                break;
+            case DATAREMOVE_CODE:
+                data_remove(&rdatalib_parms, op->userid, op->label, op->label_len);
+                break;
+            default:
+                touch_keyring(&rdatalib_parms, op->function_code);
+        }
+        vector[index * 4] = op->function_code;
+        vector[index * 4 + 1] = rdatalib_parms.return_code;
+        vector[index * 4 + 2] = rdatalib_parms.RACF_return_code;
+        vector[index * 4 + 3] = rdatalib_parms.RACF_reason_code;
+        if (stop_on_error && rdatalib_parms.return_code != 0) {
+            break;
+        }
+    }
+    Py_END_ALLOW_THREADS
+
+    PyBuffer_Release(&view);
+    releaseBatchOperations(ops, count);
+    Py_DECREF(sequence);
+    return codes;
+}
+
+// Session object: a parameter list prepared once for a userid and keyring, plus reusable buffers.
+// Calls that release the GIL still use the shared parameter list, so each call holds the lock.
+typedef struct {
+  PyObject_HEAD
+  char userid[MAX_USERID_LEN + 1];
+  char keyring[MAX_KEYRING_LEN + 1];
+  R_datalib_parm_list_64 parms;
+  Data_get_buffers *buffers;
+  PyThread_type_lock lock;
+} SessionObject;
+
+// Take the session lock, waiting for it without the GIL so the holder can finish its call
+static void Session_acquire(SessionObject *self) {
+  if (!PyThread_acquire_lock(self->lock, NOWAIT_LOCK)) {
+    Py_BEGIN_ALLOW_THREADS
+    PyThread_acquire_lock(self->lock, WAIT_LOCK);
+    Py_END_ALLOW_THREADS
+  }
+}
+
+// The lock and buffers are allocated before the session can be shared, so init never races for them
+static PyObject* Session_new(PyTypeObject *type, PyObject *args, PyObject *kwargs) {
+  SessionObject *self = (SessionObject *)type->tp_alloc(type, 0);
+
+  if (self == NULL) {
+    return NULL;
+  }
+  self->lock = PyThread_allocate_lock();
+  self->buffers = PyMem_Calloc(1, sizeof(Data_get_buffers));
+  if (self->lock == NULL || self->buffers == NULL) {
+    Py_DECREF(self);
+    return PyErr_NoMemory();
+  }
+  return (PyObject *)self;
+}
+
+static int Session_init(SessionObject *self, PyObject *args, PyObject *kwargs) {
+  const char *userid_in, *keyring_in;
+
+  static char *kwlist[] = {"userid", "keyring", NULL};
+
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "yy", kwlist, &userid_in, &keyring_in)) {
+    return -1;
+  }
+  if (strlen(userid_in) > MAX_USERID_LEN || strlen(keyring_in) > MAX_KEYRING_LEN) {
+    PyErr_SetString(PyExc_ValueError,
+      "userid is limited to " STRINGIFY(MAX_USERID_LEN) " bytes and keyring to "
+      STRINGIFY(MAX_KEYRING_LEN) " bytes");
+    return -1;
+  }
+
+  Session_acquire(self);
+  memset(self->userid, 0x00, sizeof(self->userid));
+  memset(self->keyring, 0x00, sizeof(self->keyring));
+  strncpy(self->userid, userid_in, MAX_USERID_LEN);
+  strncpy(self->keyring, keyring_in, MAX_KEYRING_LEN);
+  prepare_R_datalib_parameters(&self->parms, self->userid, self->keyring);
+  PyThread_release_lock(self->lock);
+  return 0;
+}
+
+static void Session_dealloc(SessionObject *self) {
+  PyTypeObject *type = Py_TYPE(self);
+
+  if (self->lock != NULL) {
+    PyThread_free_lock(self->lock);
+  }
+  PyMem_Free(self->buffers);
+  type->tp_free((PyObject *)self);
+  Py_DECREF(type);
+}
+
+static const char * const sessionGetDataNames[] = {"label", "interner", "default", NULL};
+static const Argument_spec sessionGetDataSpec = {"getData", sessionGetDataNames, 0, 1};
+
+static PyObject* Session_getData(SessionObject *self, PyObject *const *args, Py_ssize_t nargs,
+                                 PyObject *kwnames) {
+  PyObject *values[3];
+  const char *label_in = NULL;
+  char label[MAX_LABEL_LEN + 1] = "";
+  Return_codes ret_codes;
+  PyObject *result;
+  int match_default = 0, match;
+
+  if (!collect_arguments(&sessionGetDataSpec, args, nargs, kwnames, values) ||
+      (values[0] != NULL &&
+       !bytes_argument(&sessionGetDataSpec, 0, values[0], MAX_LABEL_LEN, &label_in, NULL)) ||
+      (values[2] != NULL && !flag_argument(values[2], &match_default))) {
+    return NULL;
+  }
+  if (!checkEntryOptions(Py_None, Py_None, OR_NONE(values[1]))) {
+    return NULL;
+  }
+  match = selectMatch(label_in, match_default, label);
+  if (match < 0) {
+    return NULL;
+  }
+
+  Session_acquire(self);
+  get_data_with_parameters(&self->parms, match, label, self->buffers, &ret_codes);
+  result = buildDataResult(self->buffers, &ret_codes, OR_NONE(values[1]));
+  PyThread_release_lock(self->lock);
+  return result;
+}
+
+static const char * const sessionListKeyringNames[] = {"codepage", "encoder", "bodies", "interner", NULL};
+static const Argument_spec sessionListKeyringSpec = {"listKeyring", sessionListKeyringNames, 0, 0};
+
+static PyObject* Session_listKeyring(SessionObject *self, PyObject *const *args, Py_ssize_t nargs,
+                                     PyObject *kwnames) {
+  PyObject *values[4];
+  PyObject *result;
+  int bodies = 1;
+
+  if (!collect_arguments(&sessionListKeyringSpec, args, nargs, kwnames, values) ||
+      (values[2] != NULL && !flag_argument(values[2], &bodies))) {
+    return NULL;
+  }
+  if (!checkEntryOptions(OR_NONE(values[0]), OR_NONE(values[1]), OR_NONE(values[3]))) {
+    return NULL;
+  }
+  Session_acquire(self);
+  result = listKeyringWithParameters(PyType_GetModuleState(Py_TYPE(self)), &self->parms,
+                                     self->buffers, OR_NONE(values[0]), OR_NONE(values[1]),
+                                     OR_NONE(values[3]), bodies);
+  PyThread_release_lock(self->lock);
+  return result;
+}
+
+static const char * const sessionDataPutNames[] = {"label", "certificate", "private_key", "usage",
+                                                   "default", "owner", NULL};
+static const Argument_spec sessionDataPutSpec = {"dataPut", sessionDataPutNames, 3, 3};
+
+static PyObject* Session_dataPut(SessionObject *self, PyObject *const *args, Py_ssize_t nargs,
+                                 PyObject *kwnames) {
+  PyObject *values[6];
+  const char *label, *owner = NULL;
+  Py_ssize_t label_len;
+  Py_buffer certificate, private_key;
+  int usage = 0, is_default = 0;
+  PyObject *result;
+
+  if (!collect_arguments(&sessionDataPutSpec, args, nargs, kwnames, values) ||
+      !dataPutArguments(&sessionDataPutSpec, values, 0, &label, &label_len, &certificate,
+                        &private_key, &usage, &is_default, &owner)) {
+    return NULL;
+  }
+
+  Session_acquire(self);
+  result = dataPutWithParameters(&self->parms, owner ? owner : self->userid, label, label_len,
+                                 &certificate, &private_key, usage, is_default);
+  PyThread_release_lock(self->lock);
+  PyBuffer_Release(&certificate);
+  PyBuffer_Release(&private_key);
+  return result;
+}
+
+static const char * const sessionDataRemoveNames[] = {"label", NULL};
+static const Argument_spec sessionDataRemoveSpec = {"dataRemove", sessionDataRemoveNames, 1, 1};
+
+static PyObject* Session_dataRemove(SessionObject *self, PyObject *const *args, Py_ssize_t nargs,
+                                    PyObject *kwnames) {
+  PyObject *values[1];
+  char label[MAX_LABEL_LEN + 1];
+  PyObject *result;
+
+  if (!collect_arguments(&sessionDataRemoveSpec, args, nargs, kwnames, values) ||
+      !copy_argument(&sessionDataRemoveSpec, 0, values[0], MAX_LABEL_LEN, label)) {
+    return NULL;
+  }
+
+  Session_acquire(self);
+  result = dataRemoveWithParameters(&self->parms, self->userid, label);
+  PyThread_release_lock(self->lock);
+  return result;
+}
+
+static const char * const sessionTouchKeyringNames[] = {"function_code", NULL};
+static const Argument_spec sessionTouchKeyringSpec = {"touchKeyring", sessionTouchKeyringNames, 1, 1};
+
+static PyObject* Session_touchKeyring(SessionObject *self, PyObject *const *args, Py_ssize_t nargs,
+                                      PyObject *kwnames) {
+  PyObject *values[1];
+  unsigned char function_code;
+  PyObject *result;
+
+  if (!collect_arguments(&sessionTouchKeyringSpec, args, nargs, kwnames, values) ||
+      !byte_argument(&sessionTouchKeyringSpec, 0, values[0], &function_code)) {
+    return NULL;
+  }
+  Session_acquire(self);
+  result = touchKeyringWithParameters(&self->parms, function_code);
+  PyThread_release_lock(self->lock);
+  return result;
+}
+
+static PyObject* Session_refresh(SessionObject *self, PyObject *Py_UNUSED(ignored)) {
+  PyObject *result;
+
+  Session_acquire(self);
+  result = touchKeyringWithParameters(&self->parms, REFRESH_CODE);
+  PyThread_release_lock(self->lock);
+  return result;
+}
+
+static PyObject* Session_get_userid(SessionObject *self, void *closure) {
+  return PyBytes_FromString(self->userid);
+}
+
+static PyObject* Session_get_keyring(SessionObject *self, void *closure) {
+  return PyBytes_FromString(self->keyring);
+}
+
+//Session docstrings
+static char sessionDocs[] =
+   "Session(userid, keyring): Parameter list and work buffers prepared once for a single "
+   "keyring and reused by every call made through the session. Methods return the same "
+   "values as the module functions of the same name.\n";
+
+static char sessionGetDataDocs[] =
+   "getData(label, *, interner=None, default=False): Same as cpydatalib.getData() for "
+   "the session keyring.\n";
+
+static char sessionListKeyringDocs[] =
+   "listKeyring(*, codepage=None, encoder=None, bodies=True, interner=None): Same as "
+   "cpydatalib.listKeyring() for the session keyring.\n";
+
+static char sessionDataPutDocs[] =
+   "dataPut(label, certificate, private_key, *, usage=0, default=False, owner=None): Same "
+   "as cpydatalib.dataPut() for the session keyring.\n";
+
+static char sessionDataRemoveDocs[] =
+   "dataRemove(label): Same as cpydatalib.dataRemove() for the session keyring.\n";
+
+static char sessionTouchKeyringDocs[] =
+   "touchKeyring(function_code): Same as cpydatalib.touchKeyring() for the session "
+   "keyring.\n";
+
+static char sessionRefreshDocs[] =
+   "refresh(): Refreshes the session keyring. Equivalent to touchKeyring(0x0B).\n";
+
+// Session method definition
+static PyMethodDef Session_methods[] = {
+   {"getData", (PyCFunction)Session_getData,
+      METH_FASTCALL | METH_KEYWORDS, sessionGetDataDocs},
+   {"listKeyring", (PyCFunction)Session_listKeyring,
+      METH_FASTCALL | METH_KEYWORDS, sessionListKeyringDocs},
+   {"dataPut", (PyCFunction)Session_dataPut,
+      METH_FASTCALL | METH_KEYWORDS, sessionDataPutDocs},
+   {"dataRemove", (PyCFunction)Session_dataRemove,
+      METH_FASTCALL | METH_KEYWORDS, sessionDataRemoveDocs},
+   {"touchKeyring", (PyCFunction)Session_touchKeyring,
+      METH_FASTCALL | METH_KEYWORDS, sessionTouchKeyringDocs},
+   {"refresh", (PyCFunction)Session_refresh,
+      METH_NOARGS, sessionRefreshDocs},
+  {NULL}
+};
+
+static PyGetSetDef Session_getset[] = {
+   {"userid", (getter)Session_get_userid, NULL, "Userid the session was prepared for.", NULL},
+   {"keyring", (getter)Session_get_keyring, NULL, "Keyring the session was prepared for.", NULL},
+  {NULL}
+};
+
+static PyType_Slot Session_slots[] = {
+  {Py_tp_doc, sessionDocs},
+  {Py_tp_new, Session_new},
+  {Py_tp_init, Session_init},
+  {Py_tp_dealloc, Session_dealloc},
+  {Py_tp_methods, Session_methods},
+  {Py_tp_getset, Session_getset},
+  {0, NULL}
+};
+
+static PyType_Spec Session_spec = {
+  .name = "cpydatalib.Session",
+  .basicsize = sizeof(SessionObject),
+  .itemsize = 0,
+  .flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_IMMUTABLETYPE,
+  .slots = Session_slots,
+};
+
+// Listing object: a GETFIRST/GETNEXT result handle kept open between calls so that a keyring
+// can be read a page at a time
+#define LISTING_NEW 0
+#define LISTING_OPEN 1
+#define LISTING_DONE 2
+
+typedef struct {
+  PyObject_HEAD
+  char userid[MAX_USERID_LEN + 1];
+  char keyring[MAX_KEYRING_LEN + 1];
+  R_datalib_parm_list_64 parms;
+  R_datalib_data_get getParm;
+  R_datalib_result_handle handle;
+  Data_get_buffers *buffers;
+  Return_codes error;
+  Py_ssize_t position;
+  int state;
+  int busy;
+} ListingObject;
+
+static PyObject* Listing_new(PyTypeObject *type, PyObject *args, PyObject *kwargs) {
+  ListingObject *self = (ListingObject *)type->tp_alloc(type, 0);
+
+  if (self == NULL) {
+    return NULL;
+  }
+  self->buffers = PyMem_Calloc(1, sizeof(Data_get_buffers));
+  if (self->buffers == NULL) {
+    Py_DECREF(self);
+    return PyErr_NoMemory();
+  }
+  return (PyObject *)self;
+}
+
+// The GIL is released while R_datalib reads an entry, so only one thread may use a listing at a
+// time. Without a GIL the busy flag itself is checked and set under the listing's lock.
+static int Listing_claim(ListingObject *self, int reopen) {
+  int claimed = 0;
+
+  BEGIN_OBJECT_LOCK(self)
+  if (self->busy) {
+    PyErr_SetString(PyExc_RuntimeError, "Listing is in use by another thread");
+  }
+  else if (reopen && self->state == LISTING_OPEN) {
+    PyErr_SetString(PyExc_RuntimeError, "Listing is already open");
+  }
+  else {
+    self->busy = 1;
+    claimed = 1;
+  }
+  END_OBJECT_LOCK
+  return claimed;
+}
+
+static void Listing_release(ListingObject *self) {
+  BEGIN_OBJECT_LOCK(self)
+  self->busy = 0;
+  END_OBJECT_LOCK
+}
+
+static int Listing_init(ListingObject *self, PyObject *args, PyObject *kwargs) {
+  const char *userid_in, *keyring_in;
+
+  static char *kwlist[] = {"userid", "keyring", NULL};
+
+  if (!PyArg_ParseTupleAndKeywords(args, kwargs, "yy", kwlist, &userid_in, &keyring_in)) {
+    return -1;
+  }
+  if (strlen(userid_in) > MAX_USERID_LEN || strlen(keyring_in) > MAX_KEYRING_LEN) {
+    PyErr_SetString(PyExc_ValueError,
+      "userid is limited to " STRINGIFY(MAX_USERID_LEN) " bytes and keyring to "
+      STRINGIFY(MAX_KEYRING_LEN) " bytes");
+    return -1;
+  }
+  if (!Listing_claim(self, 1)) {
+    return -1;
+  }
+
+  memset(self->userid, 0x00, sizeof(self->userid));
+  memset(self->keyring, 0x00, sizeof(self->keyring));
+  strncpy(self->userid, userid_in, MAX_USERID_LEN);
+  strncpy(self->keyring, keyring_in, MAX_KEYRING_LEN);
+
+  memset(&self->getParm, 0x00, sizeof(R_datalib_data_get));
+  memset(&self->handle, 0x00, sizeof(R_datalib_result_handle));
+  self->getParm.handle = &self->handle;
+  self->getParm.certificate_ptr = self->buffers->certificate;
+  self->getParm.private_key_ptr = self->buffers->private_key;
+  self->getParm.label_ptr = self->buffers->label;
+  self->getParm.subjects_DN_ptr = self->buffers->subject_DN;
+  self->getParm.record_ID_ptr = self->buffers->record_id;
+  self->getParm.certificate_status = 0x00000000;
+  self->position = 0;
+  self->state = LISTING_NEW;
+
+  prepare_R_datalib_parameters(&self->parms, self->userid, self->keyring);
+  Listing_release(self);
+  return 0;
+}
+
+// Release the result handle held by an open listing
+static void Listing_close(ListingObject *self) {
+  R_datalib_data_abort dataAbort;
+  R_datalib_function abortFunc = {"", DATA_ABORT_CODE, 0x00000000, 0, &dataAbort};
+
+  if (self->state == LISTING_OPEN) {
+    dataAbort.handle = &self->handle;
+    load_R_datalib_function(&self->parms, &abortFunc);
+    invoke_R_datalib(&self->parms);
+  }
+  self->state = LISTING_DONE;
+}
+
+// Read the next entry into getParm. Returns 1 for an entry, 0 at the end and -1 on failure,
+// keeping the failing return codes in self->error.
+static int Listing_step(ListingObject *self) {
+  R_datalib_parm_list_64 *parms = &self->parms;
+  R_datalib_function getFunc = {"", GETNEXT_CODE, 0x80000000, 1, &self->getParm};
+
+  if (self->state == LISTING_DONE) {
+    return 0;
+  }
+  if (self->state == LISTING_NEW) {
+    getFunc.code = GETCERT_CODE;
+  }
+
+  resetGetParm(&self->getParm);
+  load_R_datalib_function(parms, &getFunc);
+  Py_BEGIN_ALLOW_THREADS
+  invoke_R_datalib(parms);
+  Py_END_ALLOW_THREADS
+
+  if (parms->return_code == 8 && parms->RACF_return_code == 8 && parms->RACF_reason_code == 44) { // No more cert found;
+    Listing_close(self);
+    return 0;
+  }
+  if (parms->return_code != 0) {
+    self->error.function_code = parms->function_code;
+    self->error.SAF_return_code = parms->return_code;
+    self->error.RACF_return_code = parms->RACF_return_code;
+    self->error.RACF_reason_code = parms->RACF_reason_code;
+    Listing_close(self);
+    return -1;
+  }
+  self->state = LISTING_OPEN;
+  self->position++;
+  return 1;
+}
+
+static PyObject* Listing_error(ListingObject *self) {
+  return throwRdatalibException(self->error.function_code, self->error.SAF_return_code,
+                                self->error.RACF_return_code, self->error.RACF_reason_code);
+}
 
-    R_datalib_function dataPutFunc = {"DATAPUT", DATAPUT_CODE, 0x00000000, 0, &put_parm};
+static void Listing_dealloc(ListingObject *self) {
+  PyTypeObject *type = Py_TYPE(self);
 
-    put_parm.Default = 0x00000000;
-    put_parm.certificate_len = strlen(cert_buff);
-    put_parm.certificate_ptr = cert_buff;
-    put_parm.private_key_len = strlen(priv_key);
-    put_parm.private_key_ptr = priv_key;
-    put_parm.label_len = strlen(label);
-    put_parm.label_ptr = label;
-    put_parm.cert_userid_len = strlen(userid);
-    memset(put_parm.cert_userid, ' ', MAX_USERID_LEN); // fill the cert_userid field with blanks
-    memcpy(put_parm.cert_userid, userid, put_parm.cert_userid_len);
+  Listing_close(self);
+  PyMem_Free(self->buffers);
+  type->tp_free((PyObject *)self);
+  Py_DECREF(type);
+}
+
+// Read up to limit entries of a claimed listing
+static PyObject* Listing_read(ListingObject *self, Py_ssize_t limit, PyObject *codepage,
+                             PyObject *encoder, PyObject *interner, int bodies, int private_keys) {
+  cpydatalib_state *state = PyType_GetModuleState(Py_TYPE(self));
+  PyObject *entries, *entry;
+  Py_ssize_t index;
+  int status;
+
+  entries = PyList_New(0);
+  if (entries == NULL) {
+    return NULL;
+  }
+  for (index = 0; index < limit; index++) {
+    status = Listing_step(self);
+    if (status == 0) {
+      break;
+    }
+    if (status < 0) {
+      Py_DECREF(entries);
+      return Listing_error(self);
+    }
+    entry = new_certificate_entry(state, &self->getParm, codepage, encoder, interner, bodies,
+                                  private_keys);
+    if (entry == NULL || PyList_Append(entries, entry) < 0) {
+      Py_XDECREF(entry);
+      Py_DECREF(entries);
+      Listing_close(self);
+      return NULL;
+    }
+    Py_DECREF(entry);
+  }
+  return entries;
+}
 
-    set_up_R_datalib_parameters(&rdatalib_parms, &dataPutFunc, userid, keyring);
-    invoke_R_datalib(&rdatalib_parms);
-    return check_return_code(&rdatalib_parms);
+static const char * const listingFetchNames[] = {"limit", "codepage", "encoder", "bodies",
+                                                 "private_keys", "interner", NULL};
+static const Argument_spec listingFetchSpec = {"fetch", listingFetchNames, 1, 1};
+
+static PyObject* Listing_fetch(ListingObject *self, PyObject *const *args, Py_ssize_t nargs,
+                               PyObject *kwnames) {
+  PyObject *values[6];
+  Py_ssize_t limit;
+  PyObject *entries;
+  int bodies = 1, private_keys = 0;
+
+  if (!collect_arguments(&listingFetchSpec, args, nargs, kwnames, values) ||
+      !ssize_argument(&listingFetchSpec, 0, values[0], &limit) ||
+      (values[3] != NULL && !flag_argument(values[3], &bodies)) ||
+      (values[4] != NULL && !flag_argument(values[4], &private_keys))) {
+    return NULL;
+  }
+  if (limit < 0) {
+    PyErr_SetString(PyExc_ValueError, "limit must not be negative");
+    return NULL;
+  }
+  if (!checkEntryOptions(OR_NONE(values[1]), OR_NONE(values[2]), OR_NONE(values[5])) ||
+      !Listing_claim(self, 0)) {
+    return NULL;
+  }
+  entries = Listing_read(self, limit, OR_NONE(values[1]), OR_NONE(values[2]), OR_NONE(values[5]),
+                         bodies, private_keys);
+  Listing_release(self);
+  return entries;
 }
 
+static const char * const listingSkipNames[] = {"count", NULL};
+static const Argument_spec listingSkipSpec = {"skip", listingSkipNames, 1, 1};
+
+static PyObject* Listing_skip(ListingObject *self, PyObject *const *args, Py_ssize_t nargs,
+                              PyObject *kwnames) {
+  PyObject *values[1];
+  Py_ssize_t count, skipped;
+  int status = 1;
+
+  if (!collect_arguments(&listingSkipSpec, args, nargs, kwnames, values) ||
+      !ssize_argument(&listingSkipSpec, 0, values[0], &count)) {
+    return NULL;
+  }
+  if (!Listing_claim(self, 0)) {
+    return NULL;
+  }
+  for (skipped = 0; skipped < count; skipped++) {
+    status = Listing_step(self);
+    if (status <= 0) {
+      break;
+    }
+  }
+  Listing_release(self);
+  if (status < 0) {
+    return Listing_error(self);
+  }
+  return PyLong_FromSsize_t(skipped);
+}
+
+static const char * const listingSeekNames[] = {"label", NULL};
+static const Argument_spec listingSeekSpec = {"seek", listingSeekNames, 1, 1};
+
+static PyObject* Listing_seek(ListingObject *self, PyObject *const *args, Py_ssize_t nargs,
+                              PyObject *kwnames) {
+  PyObject *values[1];
+  const char *label;
+  Py_ssize_t label_len;
+  int status, found = 0;
+
+  if (!collect_arguments(&listingSeekSpec, args, nargs, kwnames, values) ||
+      !bytes_argument(&listingSeekSpec, 0, values[0], MAX_LABEL_LEN, &label, &label_len)) {
+    return NULL;
+  }
+  if (!Listing_claim(self, 0)) {
+    return NULL;
+  }
+  while ((status = Listing_step(self)) > 0) {
+    if (self->getParm.label_len == label_len && memcmp(self->getParm.label_ptr, label, label_len) == 0) {
+      found = 1;
+      break;
+    }
+  }
+  Listing_release(self);
+  if (status < 0) {
+    return Listing_error(self);
+  }
+  return PyBool_FromLong(found);
+}
+
+static PyObject* Listing_abort(ListingObject *self, PyObject *Py_UNUSED(ignored)) {
+  if (!Listing_claim(self, 0)) {
+    return NULL;
+  }
+  Listing_close(self);
+  Listing_release(self);
+  Py_RETURN_NONE;
+}
+
+static PyObject* Listing_get_position(ListingObject *self, void *closure) {
+  return PyLong_FromSsize_t(self->position);
+}
+
+static PyObject* Listing_get_finished(ListingObject *self, void *closure) {
+  return PyBool_FromLong(self->state == LISTING_DONE);
+}
+
+static PyObject* Listing_get_userid(ListingObject *self, void *closure) {
+  return PyBytes_FromString(self->userid);
+}
+
+static PyObject* Listing_get_keyring(ListingObject *self, void *closure) {
+  return PyBytes_FromString(self->keyring);
+}
+
+//Listing docstrings
+static char listingDocs[] =
+   "Listing(userid, keyring): Walks a keyring with a single R_datalib result handle that "
+   "stays open between calls, so each call only reads the entries it returns. The handle is "
+   "released with DATA_ABORT when the end of the keyring is reached, when abort() is called "
+   "or when the listing is deallocated. An empty keyring is an empty listing.\n";
+
+static char listingFetchDocs[] =
+   "fetch(limit, *, codepage=None, encoder=None, bodies=True, private_keys=False, "
+   "interner=None): Returns "
+   "up to limit further CertificateEntry objects, built as by cpydatalib.listKeyring(). With "
+   "private_keys each entry also carries its private key. The GIL is released while entries "
+   "are read. Returns R_datalib return and reason codes on failure, after which the listing "
+   "is finished.\n";
+
+static char listingSkipDocs[] =
+   "skip(count): Advances past up to count entries without building them and returns the "
+   "number skipped.\n";
+
+static char listingSeekDocs[] =
+   "seek(label): Advances past the entry with label. Returns False, leaving the listing "
+   "finished, when no further entry has that label.\n";
+
+static char listingAbortDocs[] =
+   "abort(): Releases the result handle. The listing is finished afterwards.\n";
+
+static PyMethodDef Listing_methods[] = {
+   {"fetch", (PyCFunction)Listing_fetch,
+      METH_FASTCALL | METH_KEYWORDS, listingFetchDocs},
+   {"skip", (PyCFunction)Listing_skip,
+      METH_FASTCALL | METH_KEYWORDS, listingSkipDocs},
+   {"seek", (PyCFunction)Listing_seek,
+      METH_FASTCALL | METH_KEYWORDS, listingSeekDocs},
+   {"abort", (PyCFunction)Listing_abort,
+      METH_NOARGS, listingAbortDocs},
+  {NULL}
+};
+
+static PyGetSetDef Listing_getset[] = {
+   {"position", (getter)Listing_get_position, NULL, "Number of entries read so far.", NULL},
+   {"finished", (getter)Listing_get_finished, NULL, "Whether the result handle was released.", NULL},
+   {"userid", (getter)Listing_get_userid, NULL, "Userid of the listed keyring.", NULL},
+   {"keyring", (getter)Listing_get_keyring, NULL, "Name of the listed keyring.", NULL},
+  {NULL}
+};
+
+static PyType_Slot Listing_slots[] = {
+  {Py_tp_doc, listingDocs},
+  {Py_tp_new, Listing_new},
+  {Py_tp_init, Listing_init},
+  {Py_tp_dealloc, Listing_dealloc},
+  {Py_tp_methods, Listing_methods},
+  {Py_tp_getset, Listing_getset},
+  {0, NULL}
+};
+
+static PyType_Spec Listing_spec = {
+  .name = "cpydatalib.Listing",
+  .basicsize = sizeof(ListingObject),
+  .itemsize = 0,
+  .flags = Py_TPFLAGS_DEFAULT | Py_TPFLAGS_IMMUTABLETYPE,
+  .slots = Listing_slots,
+};
+
 //Method docstrings
+static char executeDocs[] =
+   "execute(operations, *, stop_on_error=True): Runs a sequence of operations in one call "
+   "with the GIL released. Each operation is a tuple (function_code, userid, keyring[, "
+   "label[, certificate[, private_key[, usage[, default]]]]]) for x'07' NEWRING, x'08' "
+   "DATAPUT, x'09' DATAREMOVE, x'0A' DELRING or x'0B' REFRESH. Every operation is checked "
+   "before any runs. Returns an array('i') with four ints per operation: function code, SAF "
+   "return code, RACF return code and RACF reason code. Operations that did not run, because "
+   "an earlier one failed with stop_on_error, have all four zero.\n";
+
 static char getDataDocs[] =
-   "getData(userid, keyring, label): Obtains certificate data (including private key) and "
-   "returns this information in a python dictionary. If R_datalib encounters a failure, "
+   "getData(userid, keyring, label, *, interner=None, default=False): Obtains certificate "
+   "data (including private key), label and record ID and returns this information in a "
+   "python dictionary. The certificate is matched by label, or with default=True and no label "
+   "the keyring's default certificate is returned. When an interner is "
+   "given, the certificate is whatever interner returns for a memoryview of the DER. If "
+   "R_datalib encounters a failure, "
    "returns return and reasoun codes from R_Datalib RACF Callable Service.\n";
 
 static char listKeyringDocs[] =
-   "listKeyring(userid, keyring): Obtains certificate data for all certificates on the "
-   "keyring and returns this information in a list of python dictionaries. If R_datalib "
+   "listKeyring(userid, keyring, *, codepage=None, encoder=None, bodies=True, interner=None): "
+   "Obtains "
+   "certificate data for all certificates on the keyring and returns this information in a "
+   "list of CertificateEntry objects. Label and owner are decoded lazily with codepage and the "
+   "certificate is passed lazily through encoder when these are given. With bodies=False "
+   "certificates are left out and only each entry's digest reflects them. With an interner, "
+   "each certificate is whatever interner returns for a memoryview of the DER, so identical "
+   "certificates can share one bytes object. If R_datalib "
    "encounters a failure, returns return and reasoun codes from R_Datalib RACF Callable "
    "Service.\n";
 
@@ -373,41 +1283,120 @@ static char touchKeyringDocs[] =
    "touchKeyring(userid, keyring, function_code): Touches a specific keyring to perform "
    "a specified function (x'07' Create this keyring, x'0B' Refresh this keyring, x'0A' "
    "Delete this keyring). If R_datalib encounters a failure, returns return and reason "
-   "codes from R_Datalib RACF Callable Service.\n";
+   "codes from R_Datalib RACF Callable Service. Raises ValueError for any other function "
+   "code.\n";
 
 static char dataPutDocs[] =
-   "dataPut(userid, keyring, label, certificate, private_key): Adds the specified "
-   "certificate information to RACF with the spefified label. If R_datalib encounters "
-   "a failure, returns return and reasoun codes from R_Datalib RACF Callable Service.\n";
+   "dataPut(userid, keyring, label, certificate, private_key, *, usage=0, default=False, "
+   "owner=None): Adds the specified certificate information to RACF with the spefified "
+   "label, owned by owner or else by userid. The certificate and private key may be any "
+   "bytes-like objects and are passed to R_datalib without copying. usage is the R_datalib "
+   "certificate usage code (x'02' CERTAUTH, x'08' PERSONAL) and default makes the "
+   "certificate the keyring default. If R_datalib encounters a failure, returns return and "
+   "reasoun codes from R_Datalib RACF Callable Service.\n";
+
+static char pemEncodeDocs[] =
+   "pemEncode(data, label='CERTIFICATE'): Returns bytes-like data as a PEM block of base 64 "
+   "text in lines of 64 characters. Usable as the encoder of listKeyring() and "
+   "Listing.fetch().\n";
+
+static char pemBundleDocs[] =
+   "pemBundle(items, label='CERTIFICATE'): Returns the concatenated PEM blocks of a sequence "
+   "of bytes-like objects or CertificateEntry objects, such as a whole listing, as one bytes "
+   "object written without the GIL.\n";
+
+static char pemDecodeDocs[] =
+   "pemDecode(data): Returns a list of (label, der) tuples, one for each PEM block in the "
+   "ASCII str or bytes-like data, in order. Text outside the blocks is ignored. Raises "
+   "ValueError for a block without a matching END line or with invalid base 64 text.\n";
 
 // Method definition
 static PyMethodDef cpydatalib_methods[] = {
    {"getData", (PyCFunction)getData,
-      METH_VARARGS | METH_KEYWORDS, getDataDocs},
+      METH_FASTCALL | METH_KEYWORDS, getDataDocs},
    {"listKeyring", (PyCFunction)listKeyring,
-      METH_VARARGS | METH_KEYWORDS, listKeyringDocs},
+      METH_FASTCALL | METH_KEYWORDS, listKeyringDocs},
    {"dataRemove", (PyCFunction)dataRemove,
-      METH_VARARGS | METH_KEYWORDS, dataRemoveDocs},
+      METH_FASTCALL | METH_KEYWORDS, dataRemoveDocs},
    {"touchKeyring", (PyCFunction)touchKeyring,
-      METH_VARARGS | METH_KEYWORDS, touchKeyringDocs},
+      METH_FASTCALL | METH_KEYWORDS, touchKeyringDocs},
    {"dataPut", (PyCFunction)dataPut,
-      METH_VARARGS | METH_KEYWORDS, dataPutDocs},
+      METH_FASTCALL | METH_KEYWORDS, dataPutDocs},
+   {"execute", (PyCFunction)execute,
+      METH_FASTCALL | METH_KEYWORDS, executeDocs},
+   {"pemEncode", (PyCFunction)pemEncode,
+      METH_FASTCALL | METH_KEYWORDS, pemEncodeDocs},
+   {"pemBundle", (PyCFunction)pemBundle,
+      METH_FASTCALL | METH_KEYWORDS, pemBundleDocs},
+   {"pemDecode", (PyCFunction)pemDecode,
+      METH_FASTCALL | METH_KEYWORDS, pemDecodeDocs},
   {NULL}
 };
 
+static int cpydatalib_exec(PyObject *module) {
+  cpydatalib_state *state = PyModule_GetState(module);
+
+  state->session_type = (PyTypeObject *)PyType_FromModuleAndSpec(module, &Session_spec, NULL);
+  if (state->session_type == NULL || PyModule_AddType(module, state->session_type) < 0) {
+    return -1;
+  }
+  state->listing_type = (PyTypeObject *)PyType_FromModuleAndSpec(module, &Listing_spec, NULL);
+  if (state->listing_type == NULL || PyModule_AddType(module, state->listing_type) < 0) {
+    return -1;
+  }
+  return init_certificate_entry_state(module, state);
+}
+
+static int cpydatalib_traverse(PyObject *module, visitproc visit, void *arg) {
+  cpydatalib_state *state = PyModule_GetState(module);
+
+  Py_VISIT(state->session_type);
+  Py_VISIT(state->listing_type);
+  return traverse_certificate_entry_state(state, visit, arg);
+}
+
+static int cpydatalib_clear(PyObject *module) {
+  cpydatalib_state *state = PyModule_GetState(module);
+
+  Py_CLEAR(state->session_type);
+  Py_CLEAR(state->listing_type);
+  clear_certificate_entry_state(state);
+  return 0;
+}
+
+static void cpydatalib_free(void *module) {
+  cpydatalib_clear((PyObject *)module);
+}
+
+// Nothing is kept in C globals, so the module can be imported by several interpreters, each
+// with its own GIL, and can run without a GIL on free-threaded builds
+static PyModuleDef_Slot cpydatalib_slots[] = {
+  {Py_mod_exec, cpydatalib_exec},
+#ifdef Py_mod_multiple_interpreters
+  {Py_mod_multiple_interpreters, Py_MOD_PER_INTERPRETER_GIL_SUPPORTED},
+#endif
+#ifdef Py_mod_gil
+  {Py_mod_gil, Py_MOD_GIL_NOT_USED},
+#endif
+  {0, NULL}
+};
+
 //Module definition
 static struct PyModuleDef cpydatalib_module_def =
 {
         PyModuleDef_HEAD_INIT,
-        "cpydatalib", 
-        "C code that enables pyRACF to call the R_datalib RACF callable service.\n",
-        -1,
-        cpydatalib_methods
+        .m_name = "cpydatalib",
+        .m_doc = "C code that enables pyRACF to call the R_datalib RACF callable service.\n",
+        .m_size = sizeof(cpydatalib_state),
+        .m_methods = cpydatalib_methods,
+        .m_slots = cpydatalib_slots,
+        .m_traverse = cpydatalib_traverse,
+        .m_clear = cpydatalib_clear,
+        .m_free = cpydatalib_free,
 };
 
 //Module initialization function
 PyMODINIT_FUNC PyInit_cpydatalib(void)
 {
-        Py_Initialize();
-        return PyModule_Create(&cpydatalib_module_def);
+        return PyModuleDef_Init(&cpydatalib_module_def);
 }
\ No newline at end of file
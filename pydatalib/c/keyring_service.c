@@ -35,18 +35,82 @@ void invoke_R_datalib(R_datalib_parm_list_64 * p) {
             );
 }
 
-void set_up_R_datalib_parameters(R_datalib_parm_list_64 * p, R_datalib_function * function, char * userid, char * keyring) {
+void prepare_R_datalib_parameters(R_datalib_parm_list_64 * p, char * userid, char * keyring) {
+    size_t userid_len = strlen(userid);
+    size_t keyring_len = strlen(keyring);
+
     memset(p, 0, sizeof(R_datalib_parm_list_64));
     p->num_parms = 14;
     p->saf_rc_ALET = 0;
     p->racf_rc_ALET = 0;
     p->racf_rsn_ALET = 0;
+    p->RACF_userid_len = (char)userid_len;
+    memcpy(p->RACF_userid, userid, userid_len);
+    p->ring_name_len = (char)keyring_len;
+    memcpy(p->ring_name, keyring, keyring_len);
+}
+
+void load_R_datalib_function(R_datalib_parm_list_64 * p, R_datalib_function * function) {
+    p->return_code = 0;
+    p->RACF_return_code = 0;
+    p->RACF_reason_code = 0;
     p->function_code = function->code;
     p->attributes = function->default_attributes;
-    memset(&p->RACF_userid_len, strlen(userid), 1);
-    memcpy(p->RACF_userid, userid, strlen(userid));
-    memset(&p->ring_name_len, strlen(keyring), 1);
-    memcpy(p->ring_name, keyring, strlen(keyring));
     p->parm_list_version = function->parm_list_version;
     p->parmlist = function->parmlist;
+}
+
+void set_up_R_datalib_parameters(R_datalib_parm_list_64 * p, R_datalib_function * function, char * userid, char * keyring) {
+    prepare_R_datalib_parameters(p, userid, keyring);
+    load_R_datalib_function(p, function);
+}
+
+void data_put(R_datalib_parm_list_64 * p, const char * userid, const char * label, int label_len,
+              char * certificate, int certificate_len, char * private_key, int private_key_len,
+              int usage, int is_default) {
+    R_datalib_data_put put_parm;
+    R_datalib_function dataPutFunc = {"DATAPUT", DATAPUT_CODE, 0x00000000, 0, &put_parm};
+
+    memset(&put_parm, 0x00, sizeof(R_datalib_data_put));
+    put_parm.certificate_usage = usage;
+    // X'80000000' = default certificate for the keyring
+    put_parm.Default = is_default ? 0x80000000 : 0x00000000;
+    put_parm.certificate_len = certificate_len;
+    put_parm.certificate_ptr = certificate;
+    put_parm.private_key_len = private_key_len;
+    put_parm.private_key_ptr = private_key;
+    put_parm.label_len = label_len;
+    put_parm.label_ptr = (char *)label;
+    put_parm.cert_userid_len = strlen(userid);
+    memset(put_parm.cert_userid, ' ', MAX_USERID_LEN); // fill the cert_userid field with blanks
+    memcpy(put_parm.cert_userid, userid, put_parm.cert_userid_len);
+
+    load_R_datalib_function(p, &dataPutFunc);
+    invoke_R_datalib(p);
+}
+
+void data_remove(R_datalib_parm_list_64 * p, char * userid, const char * label, int label_len) {
+    R_datalib_data_remove rem_parm;
+    R_datalib_function dataRemoveFunc = {"DATAREMOVE", DATAREMOVE_CODE, 0x00000000, 0, &rem_parm};
+
+    memset(&rem_parm, 0x00, sizeof(R_datalib_data_remove));
+    rem_parm.label_len = label_len;
+    rem_parm.label_addr = (char *)label;
+    rem_parm.CERT_userid_len = strlen(userid);
+    memset(rem_parm.CERT_userid, ' ', MAX_USERID_LEN); // fill the CERT_userid field with blanks
+    memcpy(rem_parm.CERT_userid, userid, rem_parm.CERT_userid_len);
+
+    load_R_datalib_function(p, &dataRemoveFunc);
+    invoke_R_datalib(p);
+}
+
+int touch_keyring(R_datalib_parm_list_64 * p, char function_code) {
+    R_datalib_function touchFunc = {"", function_code, 0x00000000, 0, NULL};
+
+    if (function_code != NEWRING_CODE && function_code != REFRESH_CODE && function_code != DELRING_CODE) {
+        return FALSE;
+    }
+    load_R_datalib_function(p, &touchFunc);
+    invoke_R_datalib(p);
+    return TRUE;
 }
\ No newline at end of file
@@ -0,0 +1,34 @@
+/*
+* This program and the accompanying materials are made available under the terms of the *
+* Eclipse Public License v2.0 which accompanies this distribution, and is available at *
+* https://www.eclipse.org/legal/epl-v20.html                                      *
+*                                                                                 *
+* SPDX-License-Identifier: EPL-2.0                                                *
+*                                                                                 *
+*/
+
+#ifndef _keyring_args
+#define _keyring_args
+
+#include "keyring_types.h"
+
+// Parameters of a METH_FASTCALL | METH_KEYWORDS entry point. The first required parameters
+// must be given, the first positional ones may be given by position and the rest are
+// keyword-only.
+typedef struct {
+  const char *function;
+  const char * const *names;
+  int required;
+  int positional;
+} Argument_spec;
+
+int collect_arguments(const Argument_spec*, PyObject *const*, Py_ssize_t, PyObject*, PyObject**);
+int bytes_argument(const Argument_spec*, int, PyObject*, Py_ssize_t, const char**, Py_ssize_t*);
+int copy_argument(const Argument_spec*, int, PyObject*, Py_ssize_t, char*);
+int int_argument(const Argument_spec*, int, PyObject*, int*);
+int byte_argument(const Argument_spec*, int, PyObject*, unsigned char*);
+int ssize_argument(const Argument_spec*, int, PyObject*, Py_ssize_t*);
+int flag_argument(PyObject*, int*);
+int buffer_argument(const Argument_spec*, int, PyObject*, Py_buffer*);
+
+#endif
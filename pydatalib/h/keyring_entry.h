@@ -0,0 +1,45 @@
+/*
+* This program and the accompanying materials are made available under the terms of the *
+* Eclipse Public License v2.0 which accompanies this distribution, and is available at *
+* https://www.eclipse.org/legal/epl-v20.html                                      *
+*                                                                                 *
+* SPDX-License-Identifier: EPL-2.0                                                *
+*                                                                                 *
+*/
+
+#ifndef _keyring_entry
+#define _keyring_entry
+
+#include "keyring_types.h"
+
+enum {USAGE_PERSONAL, USAGE_CERTAUTH, USAGE_OTHER, USAGE_COUNT};
+enum {STATUS_TRUST, STATUS_HIGHTRUST, STATUS_NOTRUST, STATUS_UNKNOWN, STATUS_COUNT};
+
+// Module state. Every interpreter that imports cpydatalib gets its own types and interned values.
+typedef struct {
+  PyTypeObject *session_type;
+  PyTypeObject *listing_type;
+  PyTypeObject *entry_type;
+  PyObject *usage_values[USAGE_COUNT];
+  PyObject *status_values[STATUS_COUNT];
+  PyObject *field_name_tuple;
+} cpydatalib_state;
+
+// Without a GIL, state an object fills in lazily or checks and sets is guarded by a critical
+// section on the object. With the GIL the guarded code cannot be interleaved anyway.
+#ifdef Py_GIL_DISABLED
+#define BEGIN_OBJECT_LOCK(op) Py_BEGIN_CRITICAL_SECTION(op)
+#define END_OBJECT_LOCK Py_END_CRITICAL_SECTION()
+#else
+#define BEGIN_OBJECT_LOCK(op) {
+#define END_OBJECT_LOCK }
+#endif
+
+int init_certificate_entry_state(PyObject*, cpydatalib_state*);
+int traverse_certificate_entry_state(cpydatalib_state*, visitproc, void*);
+void clear_certificate_entry_state(cpydatalib_state*);
+PyObject* new_certificate_entry(cpydatalib_state*, R_datalib_data_get*, PyObject*, PyObject*,
+                                PyObject*, int, int);
+PyObject* intern_certificate(PyObject*, const char*, Py_ssize_t);
+
+#endif
@@ -13,6 +13,7 @@
 
 #include "keyring_types.h"
 
-void get_data(char*, char*, char*, Data_get_buffers*, Return_codes*);
+void get_data(char*, char*, int, char*, Data_get_buffers*, Return_codes*);
+void get_data_with_parameters(R_datalib_parm_list_64*, int, char*, Data_get_buffers*, Return_codes*);
 
 #endif 
\ No newline at end of file
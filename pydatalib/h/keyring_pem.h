@@ -0,0 +1,23 @@
+/*
+* This program and the accompanying materials are made available under the terms of the *
+* Eclipse Public License v2.0 which accompanies this distribution, and is available at *
+* https://www.eclipse.org/legal/epl-v20.html                                      *
+*                                                                                 *
+* SPDX-License-Identifier: EPL-2.0                                                *
+*                                                                                 *
+*/
+
+#ifndef _keyring_pem
+#define _keyring_pem
+
+#include "keyring_types.h"
+
+// Characters of base 64 text per PEM line, as RFC 7468 requires
+#define PEM_LINE_LEN 64
+#define PEM_MAX_LABEL_LEN 64
+
+PyObject* pemEncode(PyObject*, PyObject *const*, Py_ssize_t, PyObject*);
+PyObject* pemBundle(PyObject*, PyObject *const*, Py_ssize_t, PyObject*);
+PyObject* pemDecode(PyObject*, PyObject *const*, Py_ssize_t, PyObject*);
+
+#endif
@@ -36,6 +36,10 @@
 #define DELRING_CODE 0x0A
 #define REFRESH_CODE 0x0B
 #define HELP_CODE  0x00
+
+// Attributes a DataGetFirst result handle can match on
+#define MATCH_LABEL 1
+#define MATCH_DEFAULT 2
 #define NOTSUPPORTED_CODE 0x00
 
 #define TRUE 1
@@ -83,6 +87,7 @@ typedef struct _Data_get_buffers {
     char label[MAX_LABEL_LEN + 1];
     int subject_DN_length;
     char subject_DN[MAX_SUBJECT_DN_LEN];
+    int record_id_length;
     char record_id[MAX_RECORD_ID_LEN];
 } Data_get_buffers;
 
@@ -149,7 +154,12 @@ typedef _Packed struct _R_datalib_data_put { // DO NOT change property positions
 } R_datalib_data_put;
 
 void invoke_R_datalib(R_datalib_parm_list_64*);
+void prepare_R_datalib_parameters(R_datalib_parm_list_64*, char*, char*);
+void load_R_datalib_function(R_datalib_parm_list_64*, R_datalib_function*);
 void set_up_R_datalib_parameters(R_datalib_parm_list_64* , R_datalib_function* , char* ,char* );
+void data_put(R_datalib_parm_list_64*, const char*, const char*, int, char*, int, char*, int, int, int);
+void data_remove(R_datalib_parm_list_64*, char*, const char*, int);
+int touch_keyring(R_datalib_parm_list_64*, char);
 void dump_certificate_and_key(Data_get_buffers*);
 
 static PyObject* throwRdatalibException(int, int, int, int);
@@ -0,0 +1,422 @@
+"""Audit trail of keyring mutations, written to a JSON Lines file by a background thread."""
+
+import atexit
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import List, NamedTuple, Optional, Sequence
+
+from .datalib_logger import logger
+from .keyring_operations import DATAPUT, DATAREMOVE, DELRING, NEWRING, REFRESH
+
+FSYNC_BATCH = "batch"
+FSYNC_INTERVAL = "interval"
+FSYNC_NEVER = "never"
+
+# CertAdmin method recorded for each audited R_datalib function code
+AUDITED_OPERATIONS = {
+    NEWRING: "add_keyring",
+    DATAPUT: "add_certificate",
+    DATAREMOVE: "remove_certificate",
+    DELRING: "delete_keyring",
+    REFRESH: "refresh_keyring",
+}
+
+
+class AuditRecord(NamedTuple):
+    """
+    One audited mutation. time is seconds since the epoch and duration the seconds spent in
+    the native call. Return codes are None when the call raised, and error names what.
+    """
+
+    time: float
+    operation: str
+    userid: str
+    keyring: str
+    label: Optional[str]
+    fingerprint: Optional[str]
+    saf_return_code: Optional[int]
+    racf_return_code: Optional[int]
+    racf_reason_code: Optional[int]
+    duration: float
+    error: Optional[str]
+
+    def to_json(self) -> str:
+        """The record as one line of the audit file, without the newline."""
+        return json.dumps(
+            {
+                "time": datetime.datetime.fromtimestamp(
+                    self.time, datetime.timezone.utc
+                ).isoformat(),
+                "operation": self.operation,
+                "userid": self.userid,
+                "keyring": self.keyring,
+                "label": self.label,
+                "fingerprint": self.fingerprint,
+                "safReturnCode": self.saf_return_code,
+                "racfReturnCode": self.racf_return_code,
+                "racfReasonCode": self.racf_reason_code,
+                "duration_ms": round(self.duration * 1000, 3),
+                "error": self.error,
+            },
+            separators=(",", ":"),
+        )
+
+
+class AuditStats(NamedTuple):
+    """
+    Counters of an AuditLog. blocked counts records whose caller waited for room in the
+    buffer, for blocked_time seconds in all. lost counts records given up on at close
+    because the file could not be written.
+    """
+
+    recorded: int
+    written: int
+    batches: int
+    fsyncs: int
+    rotations: int
+    buffered: int
+    max_buffered: int
+    blocked: int
+    blocked_time: float
+    write_errors: int
+    lost: int
+
+
+class AuditOptions(NamedTuple):
+    """Tuning of an AuditLog, passed to it as keyword arguments."""
+
+    capacity: int = 4096
+    batch_size: int = 256
+    flush_interval: float = 1.0
+    fsync: str = FSYNC_BATCH
+    fsync_interval: float = 1.0
+    max_bytes: int = 0
+    backup_count: int = 5
+
+
+class AuditOutcome(NamedTuple):
+    """
+    How an audited call ended: its SAF, RACF return and RACF reason codes, or None when it
+    raised error, and the seconds it took.
+    """
+
+    return_codes: Optional[Sequence[int]] = (0, 0, 0)
+    duration: float = 0.0
+    error: Optional[BaseException] = None
+
+
+class _AuditCounters:
+    def __init__(self) -> None:
+        self.recorded = 0
+        self.written = 0
+        self.batches = 0
+        self.fsyncs = 0
+        self.rotations = 0
+        self.max_buffered = 0
+        self.blocked = 0
+        self.blocked_time = 0.0
+        self.write_errors = 0
+        self.lost = 0
+
+
+class _AuditFile:
+    """
+    The file an AuditLog appends to, used by its writer thread only. Syncs and rotations
+    are counted into counters under condition.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        options: AuditOptions,
+        counters: _AuditCounters,
+        condition: threading.Condition,
+    ) -> None:
+        self.path = path
+        self.options = options
+        self.counters = counters
+        self.condition = condition
+        self.file = open(path, "ab")
+        self.size = self.file.tell()
+        self.synced_at = time.monotonic()
+        self.unsynced = False
+
+    def write(self, records: List[AuditRecord]) -> None:
+        """Appends records, rotating the file first when they would grow it too far."""
+        data = "".join(record.to_json() + "\n" for record in records).encode("utf-8")
+        if (
+            self.options.max_bytes
+            and self.size
+            and self.size + len(data) > self.options.max_bytes
+        ):
+            self.rotate()
+        self.file.write(data)
+        self.file.flush()
+        self.size += len(data)
+        self.unsynced = True
+
+    def sync(self, forced: bool) -> None:
+        """Syncs what was written when fsync asks for it now, or always when forced."""
+        if not self.unsynced or self.options.fsync == FSYNC_NEVER:
+            return
+        now = time.monotonic()
+        if (
+            self.options.fsync == FSYNC_INTERVAL
+            and not forced
+            and now - self.synced_at < self.options.fsync_interval
+        ):
+            return
+        os.fsync(self.file.fileno())
+        self.synced_at = now
+        self.unsynced = False
+        with self.condition:
+            self.counters.fsyncs += 1
+
+    def rotate(self) -> None:
+        """Moves the file to path.1, shifting older files, and starts an empty one."""
+        self.sync(True)
+        self.file.close()
+        backup_count = self.options.backup_count
+        try:
+            if backup_count > 0:
+                for index in range(backup_count - 1, 0, -1):
+                    source = f"{self.path}.{index}"
+                    if os.path.exists(source):
+                        os.replace(source, f"{self.path}.{index + 1}")
+                os.replace(self.path, f"{self.path}.1")
+            else:
+                os.remove(self.path)
+        finally:
+            self.file = open(self.path, "ab")
+            self.size = self.file.tell()
+        if self.options.fsync != FSYNC_NEVER:
+            directory = os.open(
+                os.path.dirname(os.path.abspath(self.path)), os.O_RDONLY
+            )
+            try:
+                os.fsync(directory)
+            finally:
+                os.close(directory)
+        with self.condition:
+            self.counters.rotations += 1
+
+
+class AuditLog:
+    """
+    Records mutations into a ring buffer of capacity records that a background thread
+    appends to path in batches, once batch_size records are waiting or flush_interval
+    seconds after the first of them. Recording only waits when the buffer is full.
+
+    fsync is FSYNC_BATCH to sync every batch written, FSYNC_INTERVAL to sync at most every
+    fsync_interval seconds, or FSYNC_NEVER to leave it to the system. When max_bytes is set,
+    a batch that would grow the file past it first rotates the file to path.1, shifting
+    older files up to path.backup_count. A batch that cannot be written is retried, so a
+    failing disk eventually fills the buffer and holds up the callers. These options are
+    keyword arguments with the defaults of AuditOptions.
+    """
+
+    def __init__(self, path: str, **options) -> None:
+        options = AuditOptions(**options)
+        if options.fsync not in (FSYNC_BATCH, FSYNC_INTERVAL, FSYNC_NEVER):
+            raise ValueError(
+                f"fsync must be one of {FSYNC_BATCH}, {FSYNC_INTERVAL} and {FSYNC_NEVER}"
+            )
+        if options.capacity < 1 or options.batch_size < 1:
+            raise ValueError("capacity and batch_size must be positive")
+        self.__options = options._replace(
+            batch_size=min(options.batch_size, options.capacity)
+        )
+        self.__condition = threading.Condition()
+        self.__counters = _AuditCounters()
+        self.__file = _AuditFile(path, options, self.__counters, self.__condition)
+        self.__buffer: List[Optional[AuditRecord]] = [None] * options.capacity
+        self.__head = 0
+        self.__count = 0
+        self.__flush_requests = 0
+        self.__closing = False
+
+        self.__writer = threading.Thread(
+            target=self.__run, name="pydatalib-audit-writer", daemon=True
+        )
+        self.__writer.start()
+        atexit.register(self.close)
+
+    @property
+    def path(self) -> str:
+        return self.__file.path
+
+    def record(
+        self,
+        operation: str,
+        userid: str,
+        keyring: str,
+        label: Optional[str] = None,
+        certificate: Optional[bytes] = None,
+        *,
+        outcome: AuditOutcome = AuditOutcome(),
+    ) -> None:
+        """
+        Adds a record of operation to the buffer, with the SHA-256 fingerprint of
+        certificate when one was written and the outcome of the call.
+        """
+        codes = (
+            tuple(outcome.return_codes)
+            if outcome.return_codes is not None
+            else (None, None, None)
+        )
+        entry = AuditRecord(
+            time.time(),
+            operation,
+            userid,
+            keyring,
+            label,
+            hashlib.sha256(certificate).hexdigest() if certificate else None,
+            *codes,
+            outcome.duration,
+            repr(outcome.error) if outcome.error is not None else None,
+        )
+        capacity = len(self.__buffer)
+        counters = self.__counters
+        with self.__condition:
+            if self.__closing:
+                raise ValueError("The audit log is closed")
+            if self.__count == capacity:
+                start = time.monotonic()
+                while self.__count == capacity and not self.__closing:
+                    self.__condition.wait()
+                counters.blocked += 1
+                counters.blocked_time += time.monotonic() - start
+                if self.__closing:
+                    raise ValueError("The audit log is closed")
+            self.__buffer[(self.__head + self.__count) % capacity] = entry
+            self.__count += 1
+            counters.recorded += 1
+            counters.max_buffered = max(counters.max_buffered, self.__count)
+            if self.__count == self.__options.batch_size:
+                self.__condition.notify_all()
+
+    def flush(self, timeout: Optional[float] = None) -> bool:
+        """
+        Waits until every record made so far is written and, unless fsync is FSYNC_NEVER,
+        synced to disk. Returns False when timeout seconds pass first.
+        """
+        counters = self.__counters
+        with self.__condition:
+            target = counters.recorded
+            self.__flush_requests += 1
+            self.__condition.notify_all()
+            try:
+                return self.__condition.wait_for(
+                    lambda: counters.written + counters.lost >= target
+                    and not self.__unsynced_for_flush(),
+                    timeout,
+                )
+            finally:
+                self.__flush_requests -= 1
+
+    def close(self) -> None:
+        """Writes the buffered records, stops the writer thread and closes the file."""
+        with self.__condition:
+            if self.__closing:
+                return
+            self.__closing = True
+            self.__condition.notify_all()
+        self.__writer.join()
+        self.__file.file.close()
+        atexit.unregister(self.close)
+
+    def stats(self) -> AuditStats:
+        """Returns the log's counters."""
+        counters = self.__counters
+        with self.__condition:
+            return AuditStats(
+                counters.recorded,
+                counters.written,
+                counters.batches,
+                counters.fsyncs,
+                counters.rotations,
+                self.__count,
+                counters.max_buffered,
+                counters.blocked,
+                counters.blocked_time,
+                counters.write_errors,
+                counters.lost,
+            )
+
+    def __enter__(self) -> "AuditLog":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __unsynced_for_flush(self) -> bool:
+        return self.__file.unsynced and self.__options.fsync != FSYNC_NEVER
+
+    def __take(self) -> List[AuditRecord]:
+        """Empties the buffer. Called with the condition held."""
+        capacity = len(self.__buffer)
+        end = self.__head + self.__count
+        batch = self.__buffer[self.__head : min(end, capacity)]
+        batch += self.__buffer[: max(end - capacity, 0)]
+        for index in range(self.__head, self.__head + self.__count):
+            self.__buffer[index % capacity] = None
+        self.__head = end % capacity
+        self.__count = 0
+        self.__condition.notify_all()
+        return batch
+
+    def __run(self) -> None:
+        pending: List[AuditRecord] = []
+        counters = self.__counters
+        while True:
+            with self.__condition:
+                deadline = time.monotonic() + self.__options.flush_interval
+                while not (
+                    self.__closing
+                    or self.__flush_requests
+                    or self.__count >= self.__options.batch_size
+                    or pending
+                ):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self.__condition.wait(remaining)
+                if not pending:
+                    pending = self.__take()
+                closing = self.__closing
+                forced = closing or self.__flush_requests > 0
+
+            failed = False
+            if pending:
+                try:
+                    self.__file.write(pending)
+                except OSError as error:
+                    failed = True
+                    logger.error(
+                        "Cannot write audit records to %s: %s", self.path, error
+                    )
+            try:
+                self.__file.sync(forced)
+            except OSError as error:
+                failed = True
+                logger.error("Cannot sync audit log %s: %s", self.path, error)
+
+            with self.__condition:
+                if failed:
+                    counters.write_errors += 1
+                    if closing:
+                        counters.lost += len(pending)
+                        pending = []
+                else:
+                    counters.written += len(pending)
+                    counters.batches += 1 if pending else 0
+                    pending = []
+                self.__condition.notify_all()
+                if closing and not pending and self.__count == 0:
+                    return
+            if failed and not closing:
+                time.sleep(self.__options.flush_interval)
@@ -0,0 +1,273 @@
+"""Minimal DER reader for the X.509 fields pydatalib needs without external dependencies."""
+
+from datetime import datetime, timezone
+from typing import NamedTuple, Optional, Tuple
+
+_SEQUENCE = 0x30
+_INTEGER = 0x02
+_UTC_TIME = 0x17
+_GENERALIZED_TIME = 0x18
+_VERSION = 0xA0
+_BIT_STRING = 0x03
+_OBJECT_IDENTIFIER = 0x06
+_OCTET_STRING = 0x04
+_BOOLEAN = 0x01
+_EXTENSIONS = 0xA3
+_KEY_IDENTIFIER = 0x80
+
+_SUBJECT_KEY_IDENTIFIER = bytes.fromhex("551d0e")
+_AUTHORITY_KEY_IDENTIFIER = bytes.fromhex("551d23")
+
+_SET = 0x31
+# String types an attribute value of a distinguished name is decoded from, by tag
+_STRING_ENCODINGS = {
+    0x0C: "utf-8",
+    0x13: "ascii",
+    0x14: "latin-1",
+    0x16: "ascii",
+    0x1E: "utf-16-be",
+}
+# RFC 4514 names of attribute types; others are written as dotted OIDs
+_ATTRIBUTE_NAMES = {
+    bytes.fromhex("550403"): "CN",
+    bytes.fromhex("550406"): "C",
+    bytes.fromhex("550407"): "L",
+    bytes.fromhex("550408"): "ST",
+    bytes.fromhex("550409"): "STREET",
+    bytes.fromhex("55040a"): "O",
+    bytes.fromhex("55040b"): "OU",
+    bytes.fromhex("0992268993f22c640119"): "DC",
+    bytes.fromhex("0992268993f22c640101"): "UID",
+}
+
+_RSA_ENCRYPTION = bytes.fromhex("2a864886f70d010101")
+_EC_PUBLIC_KEY = bytes.fromhex("2a8648ce3d0201")
+# Named curves by OID, with their key size in bits
+_CURVE_SIZES = {
+    bytes.fromhex("2a8648ce3d030107"): 256,
+    bytes.fromhex("2b81040022"): 384,
+    bytes.fromhex("2b81040023"): 521,
+}
+
+
+class CertificateDetails(NamedTuple):
+    """Fields parsed from a DER encoded X.509 certificate."""
+
+    serial_number: int
+    issuer: bytes
+    subject: bytes
+    not_before: datetime
+    not_after: datetime
+    key_size: Optional[int] = None
+    subject_key_id: Optional[bytes] = None
+    authority_key_id: Optional[bytes] = None
+
+
+def parse_certificate(der: bytes) -> CertificateDetails:
+    """Parses the TBSCertificate fields of a DER encoded X.509 certificate."""
+    try:
+        _, certificate_start, _ = _read_tlv(der, 0, _SEQUENCE)
+        _, offset, certificate_end = _read_tlv(der, certificate_start, _SEQUENCE)
+        if der[offset] == _VERSION:
+            offset = _read_tlv(der, offset)[2]
+        _, serial_start, offset = _read_tlv(der, offset, _INTEGER)
+        serial_number = int.from_bytes(der[serial_start:offset], "big", signed=True)
+        offset = _read_tlv(der, offset, _SEQUENCE)[2]
+        issuer_start = offset
+        offset = _read_tlv(der, offset, _SEQUENCE)[2]
+        issuer = bytes(der[issuer_start:offset])
+        _, validity_start, offset = _read_tlv(der, offset, _SEQUENCE)
+        not_before, validity_start = _read_time(der, validity_start)
+        not_after, _ = _read_time(der, validity_start)
+        subject_start = offset
+        offset = _read_tlv(der, offset, _SEQUENCE)[2]
+        subject = bytes(der[subject_start:offset])
+        key_size = _read_key_size(der, offset)
+        subject_key_id, authority_key_id = _read_key_ids(der, offset, certificate_end)
+    except (IndexError, ValueError) as error:
+        raise ValueError(f"Malformed DER certificate: {error}") from error
+    return CertificateDetails(
+        serial_number,
+        issuer,
+        subject,
+        not_before,
+        not_after,
+        key_size,
+        subject_key_id,
+        authority_key_id,
+    )
+
+
+# PEM labels of the unencrypted private key formats private_key_format() tells apart
+PRIVATE_KEY_LABELS = ("PRIVATE KEY", "RSA PRIVATE KEY", "EC PRIVATE KEY")
+
+
+def private_key_format(der: bytes) -> str:
+    """
+    Returns the PEM label of a DER private key: PRIVATE KEY for PKCS #8, RSA PRIVATE KEY for
+    PKCS #1 and EC PRIVATE KEY for RFC 5915 keys.
+    """
+    try:
+        _, offset, _ = _read_tlv(der, 0, _SEQUENCE)
+        offset = _read_tlv(der, offset, _INTEGER)[2]
+        tag = der[offset]
+    except IndexError as error:
+        raise ValueError(f"Malformed DER private key: {error}") from error
+    if tag == _SEQUENCE:
+        return "PRIVATE KEY"
+    if tag == _INTEGER:
+        return "RSA PRIVATE KEY"
+    if tag == _OCTET_STRING:
+        return "EC PRIVATE KEY"
+    raise ValueError(
+        f"Unknown DER private key format, tag {tag:#04x} after the version"
+    )
+
+
+def format_name(name: bytes) -> str:
+    """
+    Formats a DER encoded Name, such as CertificateDetails.subject, as an RFC 4514 string
+    with the most specific RDN first, e.g. "CN=server,O=Example,C=US".
+    """
+    try:
+        _, offset, end = _read_tlv(name, 0, _SEQUENCE)
+        rdns = []
+        while offset < end:
+            _, attribute_offset, offset = _read_tlv(name, offset, _SET)
+            attributes = []
+            while attribute_offset < offset:
+                _, type_start, attribute_offset = _read_tlv(
+                    name, attribute_offset, _SEQUENCE
+                )
+                _, oid_start, value_offset = _read_tlv(
+                    name, type_start, _OBJECT_IDENTIFIER
+                )
+                oid = bytes(name[oid_start:value_offset])
+                attributes.append(
+                    f"{_ATTRIBUTE_NAMES.get(oid) or _dotted(oid)}="
+                    + _format_value(name, value_offset, attribute_offset)
+                )
+            rdns.append("+".join(attributes))
+    except (IndexError, ValueError) as error:
+        raise ValueError(f"Malformed DER name: {error}") from error
+    return ",".join(reversed(rdns))
+
+
+def _format_value(der: bytes, offset: int, end: int) -> str:
+    """Returns an attribute value escaped as RFC 4514 requires, or as #hex if not a string."""
+    tag, start, value_end = _read_tlv(der, offset)
+    encoding = _STRING_ENCODINGS.get(tag)
+    if encoding is None:
+        return "#" + bytes(der[offset:end]).hex()
+    text = bytes(der[start:value_end]).decode(encoding)
+    escaped = "".join(
+        "\\" + character if character in ',+"\\<>;' else character for character in text
+    )
+    if escaped.startswith(("#", " ")):
+        escaped = "\\" + escaped
+    if escaped.endswith(" ") and not escaped.endswith("\\ "):
+        escaped = escaped[:-1] + "\\ "
+    return escaped
+
+
+def _dotted(oid: bytes) -> str:
+    """Returns an OBJECT IDENTIFIER value in dotted decimal notation."""
+    arcs, value = [], 0
+    for byte in oid:
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            arcs.append(value)
+            value = 0
+    first = min(arcs[0] // 40, 2)
+    return ".".join(str(arc) for arc in [first, arcs[0] - 40 * first] + arcs[1:])
+
+
+def _read_key_ids(
+    der: bytes, offset: int, end: int
+) -> Tuple[Optional[bytes], Optional[bytes]]:
+    """
+    Returns the subject and authority key identifiers from the extensions that follow the
+    SubjectPublicKeyInfo at offset, where present.
+    """
+    offset = _read_tlv(der, offset, _SEQUENCE)[2]
+    # Skip the optional issuerUniqueID and subjectUniqueID
+    while offset < end and der[offset] != _EXTENSIONS:
+        offset = _read_tlv(der, offset)[2]
+    if offset >= end:
+        return None, None
+    _, extensions_start, _ = _read_tlv(der, offset, _EXTENSIONS)
+    _, offset, extensions_end = _read_tlv(der, extensions_start, _SEQUENCE)
+    subject_key_id = authority_key_id = None
+    while offset < extensions_end:
+        _, extension_start, offset = _read_tlv(der, offset, _SEQUENCE)
+        _, oid_start, value_offset = _read_tlv(der, extension_start, _OBJECT_IDENTIFIER)
+        oid = bytes(der[oid_start:value_offset])
+        if der[value_offset] == _BOOLEAN:
+            value_offset = _read_tlv(der, value_offset)[2]
+        _, value_start, _ = _read_tlv(der, value_offset, _OCTET_STRING)
+        if oid == _SUBJECT_KEY_IDENTIFIER:
+            _, key_start, key_end = _read_tlv(der, value_start, _OCTET_STRING)
+            subject_key_id = bytes(der[key_start:key_end])
+        elif oid == _AUTHORITY_KEY_IDENTIFIER:
+            _, identifier_start, identifier_end = _read_tlv(der, value_start, _SEQUENCE)
+            if (
+                identifier_start < identifier_end
+                and der[identifier_start] == _KEY_IDENTIFIER
+            ):
+                _, key_start, key_end = _read_tlv(der, identifier_start)
+                authority_key_id = bytes(der[key_start:key_end])
+    return subject_key_id, authority_key_id
+
+
+def _read_key_size(der: bytes, offset: int) -> Optional[int]:
+    """Returns the key size of the SubjectPublicKeyInfo at offset, if the algorithm is known."""
+    _, info_start, _ = _read_tlv(der, offset, _SEQUENCE)
+    _, algorithm_start, key_offset = _read_tlv(der, info_start, _SEQUENCE)
+    _, oid_start, parameters = _read_tlv(der, algorithm_start, _OBJECT_IDENTIFIER)
+    algorithm = bytes(der[oid_start:parameters])
+    if algorithm == _EC_PUBLIC_KEY and der[parameters] == _OBJECT_IDENTIFIER:
+        _, curve_start, curve_end = _read_tlv(der, parameters)
+        return _CURVE_SIZES.get(bytes(der[curve_start:curve_end]))
+    if algorithm == _RSA_ENCRYPTION:
+        _, key_start, _ = _read_tlv(der, key_offset, _BIT_STRING)
+        # Skip the count of unused bits, then read the modulus of RSAPublicKey
+        _, rsa_start, _ = _read_tlv(der, key_start + 1, _SEQUENCE)
+        _, modulus_start, modulus_end = _read_tlv(der, rsa_start, _INTEGER)
+        return int.from_bytes(der[modulus_start:modulus_end], "big").bit_length()
+    return None
+
+
+def _read_tlv(
+    der: bytes, offset: int, expected_tag: int = None
+) -> Tuple[int, int, int]:
+    """Returns (tag, value start, value end) of the DER element at offset."""
+    tag = der[offset]
+    if expected_tag is not None and tag != expected_tag:
+        raise ValueError(
+            f"expected tag {expected_tag:#04x} at {offset}, got {tag:#04x}"
+        )
+    length = der[offset + 1]
+    start = offset + 2
+    if length & 0x80:
+        length_bytes = length & 0x7F
+        length = int.from_bytes(der[start : start + length_bytes], "big")
+        start += length_bytes
+    end = start + length
+    if end > len(der):
+        raise ValueError(f"element at {offset} runs past the end of the data")
+    return tag, start, end
+
+
+def _read_time(der: bytes, offset: int) -> Tuple[datetime, int]:
+    """Returns the UTCTime or GeneralizedTime at offset and the offset after it."""
+    tag, start, end = _read_tlv(der, offset)
+    text = bytes(der[start:end]).decode("ascii").rstrip("Z")
+    if tag == _UTC_TIME:
+        # RFC 5280: two digit years of 50 and above are 19YY, below 50 are 20YY
+        century = "19" if int(text[:2]) >= 50 else "20"
+        value = datetime.strptime(century + text, "%Y%m%d%H%M%S")
+    elif tag == _GENERALIZED_TIME:
+        value = datetime.strptime(text.split(".")[0], "%Y%m%d%H%M%S")
+    else:
+        raise ValueError(f"expected a time at {offset}, got tag {tag:#04x}")
+    return value.replace(tzinfo=timezone.utc), end
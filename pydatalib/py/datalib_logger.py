@@ -0,0 +1,201 @@
+"""Structured, lazily formatted debug logging for pydatalib."""
+
+import logging
+import logging.handlers
+import queue
+import threading
+from typing import NamedTuple, Optional
+
+logger = logging.getLogger("pydatalib")
+
+FUNCTION_CODES = {
+    "getData": 1,
+    "listKeyring": 1,
+    "listPage": 2,
+    "dataPut": 8,
+    "dataRemove": 9,
+}
+
+
+class DatalibCall(NamedTuple):
+    """
+    A finished cpydatalib call: the keyword arguments besides userid and keyring, the
+    result, None when it raised, and the seconds it took.
+    """
+
+    function: str
+    userid: bytes
+    keyring: bytes
+    arguments: dict
+    result: object
+    duration: float
+
+
+_queue_listener: Optional[logging.handlers.QueueListener] = None
+# Handler pydatalib attached to the logger directly, replaced rather than added to
+_direct_handler: Optional[logging.Handler] = None
+_config_lock = threading.RLock()
+
+
+def enable_debug_logging(
+    use_queue: bool = False, handler: Optional[logging.Handler] = None
+) -> None:
+    """
+    Sets the pydatalib logger to DEBUG for the whole process and sends its records to
+    handler, stderr by default, through the queue listener with use_queue. Calling it again
+    without a handler keeps the one configured, so records are never emitted twice.
+    """
+    logger.setLevel(logging.DEBUG)
+    _configure_handler(handler, use_queue)
+
+
+def enable_queue_logging(*handlers: logging.Handler) -> logging.handlers.QueueListener:
+    """
+    Routes pydatalib records through an unbounded queue drained by a background thread,
+    so emitting a record never waits on handler I/O. Replaces the listener and any handler
+    enable_debug_logging() attached before.
+    """
+    global _queue_listener, _direct_handler
+    with _config_lock:
+        disable_queue_logging()
+        if _direct_handler is not None:
+            logger.removeHandler(_direct_handler)
+            _direct_handler = None
+        if not handlers:
+            handlers = (_default_handler(),)
+        record_queue = queue.SimpleQueue()
+        logger.addHandler(logging.handlers.QueueHandler(record_queue))
+        _queue_listener = logging.handlers.QueueListener(
+            record_queue, *handlers, respect_handler_level=True
+        )
+        _queue_listener.start()
+        return _queue_listener
+
+
+def disable_queue_logging() -> None:
+    """Stops the queue listener, flushing queued records, and removes its queue handler."""
+    global _queue_listener
+    with _config_lock:
+        if _queue_listener is None:
+            return
+        for handler in list(logger.handlers):
+            if isinstance(handler, logging.handlers.QueueHandler):
+                logger.removeHandler(handler)
+        _queue_listener.stop()
+        _queue_listener = None
+
+
+def _configure_handler(handler: Optional[logging.Handler], use_queue: bool) -> None:
+    """Attaches handler, or a stderr handler unless one is configured already, once."""
+    global _direct_handler
+    with _config_lock:
+        if handler is None:
+            if _queue_listener is not None or (
+                _direct_handler is not None and not use_queue
+            ):
+                return
+            if _direct_handler is not None:
+                # Moved behind the queue
+                handler = _direct_handler
+            elif logger.handlers:
+                # Handlers the application attached take the records
+                return
+            else:
+                handler = _default_handler()
+        if use_queue:
+            enable_queue_logging(handler)
+            return
+        disable_queue_logging()
+        if _direct_handler is not None:
+            logger.removeHandler(_direct_handler)
+        logger.addHandler(handler)
+        _direct_handler = handler
+
+
+def _default_handler() -> logging.Handler:
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(asctime)s %(name)s %(message)s"))
+    return handler
+
+
+def log_datalib_call(
+    call: DatalibCall,
+    codepage: str,
+    log_payloads: bool = False,
+    debug: bool = False,
+    use_queue: bool = False,
+) -> None:
+    """
+    Logs one cpydatalib call with its structured fields. Callers check the level first.
+    With debug, the call of a CertAdmin created with debug=True, the records reach the
+    logger's handlers whatever its level, and a stderr handler, routed through the queue
+    listener with use_queue, is attached once if the records would reach none.
+    """
+    function, arguments, result = call.function, call.arguments, call.result
+    function_code = arguments.get("function_code", FUNCTION_CODES.get(function))
+    label = arguments.get("label")
+    if label is not None:
+        label = label.decode(codepage)
+    return_codes = (
+        result if isinstance(result, dict) and "functionCode" in result else None
+    )
+    fields = {
+        "operation": function,
+        "ring": f"{call.userid.decode(codepage)}/{call.keyring.decode(codepage)}",
+        "label": label,
+        "function_code": function_code,
+        "duration_ms": call.duration * 1000,
+        "bytes_in": _payload_size(
+            arguments.get("certificate"), arguments.get("private_key")
+        ),
+        "bytes_out": _result_size(result),
+        "return_codes": return_codes,
+    }
+    if debug and not logger.hasHandlers():
+        _configure_handler(None, use_queue)
+    emit = _emit if debug else logger.debug
+    emit(
+        "%s %s label=%s function_code=%s duration_ms=%.3f bytes_in=%d bytes_out=%d "
+        + "return_codes=%s",
+        function,
+        fields["ring"],
+        label,
+        function_code,
+        fields["duration_ms"],
+        fields["bytes_in"],
+        fields["bytes_out"],
+        return_codes,
+        extra={"datalib": fields},
+    )
+    if log_payloads:
+        emit(
+            "%s %s payload: arguments=%r result=%r",
+            function,
+            fields["ring"],
+            arguments,
+            result,
+            extra={"datalib": fields},
+        )
+
+
+def _emit(message: str, *args, extra: dict) -> None:
+    """Hands a debug record to the logger's handlers, whatever the logger's level."""
+    if logger.disabled or logger.manager.disable >= logging.DEBUG:
+        return
+    logger.handle(
+        logger.makeRecord(
+            logger.name, logging.DEBUG, __file__, 0, message, args, None, extra=extra
+        )
+    )
+
+
+def _payload_size(*payloads) -> int:
+    return sum(len(payload) for payload in payloads if payload is not None)
+
+
+def _result_size(result) -> int:
+    if isinstance(result, list):
+        return _payload_size(*(entry.der for entry in result))
+    if isinstance(result, dict) and "certificate" in result:
+        return _payload_size(result["certificate"], result.get("privateKey"))
+    return 0
@@ -0,0 +1,101 @@
+"""Content-addressed pool sharing one copy of each certificate across keyrings and calls."""
+
+import hashlib
+import sys
+import threading
+from typing import Dict, NamedTuple, Optional
+
+# Certificates added between sweeps, at least, before the pool is swept again
+_SWEEP_INTERVAL = 256
+
+
+class InternStats(NamedTuple):
+    """
+    Counters of an InternPool. saved_bytes counts the certificate bytes that lookups served
+    from the pool instead of allocating, live_bytes what the pooled certificates hold now.
+    """
+
+    lookups: int
+    hits: int
+    live: int
+    live_bytes: int
+    saved_bytes: int
+    swept: int
+
+    @property
+    def hit_rate(self) -> float:
+        return self.hits / self.lookups if self.lookups else 0.0
+
+
+class InternPool:
+    """
+    Maps SHA-256 fingerprints to the one bytes object holding that DER. Pass the pool as
+    interner to cpydatalib listings and getData(), or to CertAdmin, and identical certificates
+    are looked up before a copy is made. bytes cannot be weakly referenced, so the pool acts as
+    a weak one instead: sweeps, run as certificates are added, drop the certificates no entry
+    or result refers to any more.
+    """
+
+    def __init__(self) -> None:
+        self.__certificates: Dict[bytes, bytes] = {}
+        self.__lock = threading.Lock()
+        self.__added = 0
+        self.__lookups = 0
+        self.__hits = 0
+        self.__saved_bytes = 0
+        self.__swept = 0
+
+    def __call__(self, der) -> bytes:
+        """Returns the pooled copy of der, a bytes-like object, adding it when it is new."""
+        fingerprint = hashlib.sha256(der).digest()
+        with self.__lock:
+            self.__lookups += 1
+            certificate = self.__certificates.get(fingerprint)
+            if certificate is not None:
+                self.__hits += 1
+                self.__saved_bytes += len(certificate)
+                return certificate
+            self.__added += 1
+            if self.__added >= max(_SWEEP_INTERVAL, len(self.__certificates) // 2):
+                self.__sweep()
+            certificate = self.__certificates[fingerprint] = bytes(der)
+            return certificate
+
+    def __len__(self) -> int:
+        return len(self.__certificates)
+
+    def get(self, fingerprint: str) -> Optional[bytes]:
+        """Returns the pooled certificate with a hex SHA-256 fingerprint, or None."""
+        return self.__certificates.get(bytes.fromhex(fingerprint))
+
+    def sweep(self) -> int:
+        """Drops the certificates only the pool refers to and returns how many."""
+        with self.__lock:
+            return self.__sweep()
+
+    def stats(self) -> InternStats:
+        """Sweeps the pool and returns its counters."""
+        with self.__lock:
+            self.__sweep()
+            return InternStats(
+                self.__lookups,
+                self.__hits,
+                len(self.__certificates),
+                sum(len(certificate) for certificate in self.__certificates.values()),
+                self.__saved_bytes,
+                self.__swept,
+            )
+
+    def __sweep(self) -> int:
+        # Two references remain for a certificate nothing else uses: the pool's own and
+        # the argument of getrefcount()
+        unused = [
+            fingerprint
+            for fingerprint in self.__certificates
+            if sys.getrefcount(self.__certificates[fingerprint]) <= 2
+        ]
+        for fingerprint in unused:
+            del self.__certificates[fingerprint]
+        self.__added = 0
+        self.__swept += len(unused)
+        return len(unused)
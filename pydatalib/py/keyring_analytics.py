@@ -0,0 +1,302 @@
+"""Columnar statistics over keyring listings and inventories. Requires numpy."""
+
+import time
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from .certificate_details import parse_certificate
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - numpy is the optional analytics extra
+    np = None
+
+# Columns held as categorical codes, and the numeric columns histograms can be taken of
+CATEGORICAL_COLUMNS = ("userid", "keyring", "owner", "usage", "status")
+NUMERIC_COLUMNS = ("key_size", "not_before", "not_after")
+
+# Stored for validity and key size when a certificate could not be parsed
+MISSING = -1
+
+_DAY = 86400
+
+
+class _Categories:
+    """Assigns consecutive codes to the distinct values of a column as they are loaded."""
+
+    def __init__(self) -> None:
+        self.codes: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def code(self, value: str) -> int:
+        code = self.codes.get(value)
+        if code is None:
+            code = self.codes[value] = len(self.values)
+            self.values.append(value)
+        return code
+
+
+class KeyringAnalytics:
+    """
+    Keyring entries loaded into NumPy columns: categorical codes for userid, keyring, owner,
+    usage and status, the default flag, key size in bits, and validity as Unix timestamps.
+    Group-by, histogram and threshold queries run as vectorized operations over all entries.
+    Validity and key size are MISSING for certificates that could not be parsed.
+    """
+
+    def __init__(
+        self,
+        rows: Iterable[Tuple[str, str, str, str, str, str, bool, int, int, int]],
+    ) -> None:
+        """
+        Loads rows of (userid, keyring, label, owner, usage, status, default, key_size,
+        not_before, not_after). The class methods build these from listings and inventories.
+        """
+        if np is None:
+            raise ImportError(
+                "KeyringAnalytics requires numpy, install pydatalib[analytics]"
+            )
+        categories = {column: _Categories() for column in CATEGORICAL_COLUMNS}
+        codes = {column: [] for column in CATEGORICAL_COLUMNS}
+        labels, defaults, numbers = [], [], {column: [] for column in NUMERIC_COLUMNS}
+        for userid, keyring, label, owner, usage, status, default, *fields in rows:
+            for column, value in zip(
+                CATEGORICAL_COLUMNS, (userid, keyring, owner, usage, status)
+            ):
+                codes[column].append(categories[column].code(value))
+            labels.append(label)
+            defaults.append(bool(default))
+            for column, value in zip(NUMERIC_COLUMNS, fields):
+                numbers[column].append(value)
+
+        self.__categories = {
+            column: tuple(categories[column].values) for column in CATEGORICAL_COLUMNS
+        }
+        self.__columns = {
+            column: np.array(codes[column], dtype=np.int32)
+            for column in CATEGORICAL_COLUMNS
+        }
+        self.__columns.update(
+            (column, np.array(numbers[column], dtype=np.int64))
+            for column in NUMERIC_COLUMNS
+        )
+        self.__columns["default"] = np.array(defaults, dtype=bool)
+        self.__labels = labels
+
+    @classmethod
+    def from_listing(
+        cls, userid: str, keyring: str, entries: Iterable
+    ) -> "KeyringAnalytics":
+        """Loads the CertificateEntry objects list_keyring() returned for a keyring."""
+        return cls(_listing_row(userid, keyring, entry) for entry in entries)
+
+    @classmethod
+    def from_keyrings(
+        cls, cert_admin, keyrings: Iterable[Tuple[str, str]]
+    ) -> "KeyringAnalytics":
+        """Lists every (userid, keyring) through cert_admin and loads the entries."""
+        return cls(
+            _listing_row(userid, keyring, entry)
+            for userid, keyring in keyrings
+            for entry in cert_admin.list_keyring(userid, keyring)
+        )
+
+    @classmethod
+    def from_inventory(cls, entries: Iterable) -> "KeyringAnalytics":
+        """
+        Loads InventoryEntry records. Validity comes from the recorded timestamps, key sizes
+        are only known for inventories that store DER.
+        """
+        return cls(_inventory_row(entry) for entry in entries)
+
+    def __len__(self) -> int:
+        return len(self.__labels)
+
+    def column(self, name: str) -> "np.ndarray":
+        """Returns a column: codes for categorical columns, values for the others."""
+        return self.__columns[name]
+
+    def categories(self, name: str) -> Tuple[str, ...]:
+        """Returns the values of a categorical column, indexed by code."""
+        return self.__categories[name]
+
+    def count_by(self, *columns: str) -> Dict[Union[str, tuple], int]:
+        """
+        Counts entries by the values of one or more categorical columns, or of default.
+        Keys are single values for one column and tuples of values for several. Only the
+        combinations present are counted, so the cost does not grow with the product of the
+        columns' cardinalities.
+        """
+        if not columns:
+            raise ValueError("count_by needs at least one column")
+        for column in columns:
+            if column != "default" and column not in self.__categories:
+                raise ValueError(f"Unknown categorical column {column}")
+        codes = np.stack([self.__columns[column] for column in columns], axis=1)
+        rows, counts = np.unique(codes, axis=0, return_counts=True)
+        result = {}
+        for row, count in zip(rows.tolist(), counts.tolist()):
+            values = tuple(
+                self.__value(column, int(code)) for column, code in zip(columns, row)
+            )
+            result[values[0] if len(columns) == 1 else values] = count
+        return result
+
+    def histogram(
+        self, column: str, bins: Union[int, Sequence[float]] = 10
+    ) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Returns (counts, bin edges) of a numeric column, leaving out MISSING values."""
+        values = self.__columns[column]
+        return np.histogram(values[values != MISSING], bins=bins)
+
+    def key_sizes(self) -> Dict[int, int]:
+        """Counts entries by key size in bits, for the sizes that could be determined."""
+        sizes, counts = np.unique(self.__columns["key_size"], return_counts=True)
+        return {
+            int(size): int(count)
+            for size, count in zip(sizes, counts)
+            if size != MISSING
+        }
+
+    def expiry_histogram(
+        self,
+        days: Sequence[int] = (0, 30, 60, 90, 180, 365),
+        now: Optional[Union[datetime, float]] = None,
+    ) -> Dict[str, int]:
+        """
+        Counts entries by days left until they expire: already expired, within each of the
+        given day boundaries, and beyond the last one.
+        """
+        remaining = self.__remaining(now)
+        known = remaining[self.__columns["not_after"] != MISSING]
+        edges = np.asarray(days, dtype=np.int64) * _DAY
+        counts = np.bincount(
+            np.searchsorted(edges, known, side="right"), minlength=len(edges) + 1
+        )
+        names = ["expired" if days[0] == 0 else f"<{days[0]}d"] + [
+            f"<{upper}d" if lower == 0 else f"{lower}-{upper}d"
+            for lower, upper in zip(days, days[1:])
+        ]
+        names.append(f">={days[-1]}d")
+        return dict(zip(names, (int(count) for count in counts)))
+
+    def select(
+        self,
+        expires_within_days: Optional[float] = None,
+        key_size_below: Optional[int] = None,
+        now: Optional[Union[datetime, float]] = None,
+        **equals: str,
+    ) -> List[Tuple[str, str, str]]:
+        """
+        Returns (userid, keyring, label) of the entries matching every condition: expiring
+        within a number of days (already expired included), a key size below a number of
+        bits, and categorical columns equal to the given values.
+        """
+        mask = self.mask(expires_within_days, key_size_below, now, **equals)
+        userids = self.__categories["userid"]
+        keyrings = self.__categories["keyring"]
+        return [
+            (
+                userids[self.__columns["userid"][index]],
+                keyrings[self.__columns["keyring"][index]],
+                self.__labels[index],
+            )
+            for index in np.flatnonzero(mask)
+        ]
+
+    def count(
+        self,
+        expires_within_days: Optional[float] = None,
+        key_size_below: Optional[int] = None,
+        now: Optional[Union[datetime, float]] = None,
+        **equals: str,
+    ) -> int:
+        """Counts the entries select() would return."""
+        return int(
+            np.count_nonzero(
+                self.mask(expires_within_days, key_size_below, now, **equals)
+            )
+        )
+
+    def mask(
+        self,
+        expires_within_days: Optional[float] = None,
+        key_size_below: Optional[int] = None,
+        now: Optional[Union[datetime, float]] = None,
+        **equals: str,
+    ) -> "np.ndarray":
+        """Returns the boolean mask of the entries matching the conditions of select()."""
+        mask = np.ones(len(self), dtype=bool)
+        if expires_within_days is not None:
+            mask &= self.__columns["not_after"] != MISSING
+            mask &= self.__remaining(now) < expires_within_days * _DAY
+        if key_size_below is not None:
+            key_size = self.__columns["key_size"]
+            mask &= (key_size != MISSING) & (key_size < key_size_below)
+        for column, value in equals.items():
+            if column == "default":
+                mask &= self.__columns["default"] == bool(value)
+                continue
+            if column not in self.__categories:
+                raise ValueError(f"Unknown categorical column {column}")
+            try:
+                code = self.__categories[column].index(value)
+            except ValueError:
+                return np.zeros(len(self), dtype=bool)
+            mask &= self.__columns[column] == code
+        return mask
+
+    def __remaining(self, now: Optional[Union[datetime, float]]) -> "np.ndarray":
+        if now is None:
+            now = time.time()
+        elif isinstance(now, datetime):
+            now = now.timestamp()
+        return self.__columns["not_after"] - int(now)
+
+    def __value(self, column: str, code: int):
+        return bool(code) if column == "default" else self.__categories[column][code]
+
+
+def _listing_row(userid: str, keyring: str, entry) -> tuple:
+    key_size = not_before = not_after = MISSING
+    if entry.der is not None:
+        try:
+            details = parse_certificate(entry.der)
+            key_size = MISSING if details.key_size is None else details.key_size
+            not_before = int(details.not_before.timestamp())
+            not_after = int(details.not_after.timestamp())
+        except ValueError:
+            pass
+    return (
+        userid,
+        keyring,
+        entry.label,
+        entry.owner,
+        entry.usage,
+        entry.status,
+        entry.default,
+        key_size,
+        not_before,
+        not_after,
+    )
+
+
+def _inventory_row(entry) -> tuple:
+    key_size = None
+    if entry.der is not None:
+        try:
+            key_size = parse_certificate(entry.der).key_size
+        except ValueError:
+            pass
+    return (
+        entry.userid,
+        entry.keyring,
+        entry.label,
+        entry.owner,
+        entry.usage,
+        entry.status,
+        entry.default,
+        MISSING if key_size is None else key_size,
+        MISSING if entry.not_before is None else int(entry.not_before.timestamp()),
+        MISSING if entry.not_after is None else int(entry.not_after.timestamp()),
+    )
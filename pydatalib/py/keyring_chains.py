@@ -0,0 +1,145 @@
+"""Certificate chains resolved from keyring contents with CAs indexed by subject and key id."""
+
+from datetime import datetime, timezone
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .certificate_details import CertificateDetails, parse_certificate
+
+# Problems a link of a chain can be flagged with
+EXPIRED = "expired"
+NOT_YET_VALID = "not yet valid"
+MISSING_ISSUER = "missing issuer"
+UNPARSABLE = "unparsable"
+CYCLE = "cycle"
+
+
+class ChainLink(NamedTuple):
+    """One certificate of a chain and what is wrong with it, if anything."""
+
+    label: str
+    subject: Optional[bytes]
+    issuer: Optional[bytes]
+    not_after: Optional[datetime]
+    problems: Tuple[str, ...]
+
+
+class CertificateChain(NamedTuple):
+    """
+    Chain from a certificate up to a self-signed root, or up to the last certificate whose
+    issuer was found on the keyring. complete is True when the chain reaches a root and no
+    link has a problem.
+    """
+
+    label: str
+    links: Tuple[ChainLink, ...]
+    complete: bool
+
+    @property
+    def broken_links(self) -> Tuple[ChainLink, ...]:
+        return tuple(link for link in self.links if link.problems)
+
+
+class _Certificate:
+    __slots__ = ("label", "details", "valid")
+
+    def __init__(self, label: str, details: Optional[CertificateDetails], valid: bool):
+        self.label = label
+        self.details = details
+        self.valid = valid
+
+
+def build_chains(
+    entries: Iterable,
+    usages: Tuple[str, ...] = ("PERSONAL",),
+    now: Optional[datetime] = None,
+) -> Dict[str, CertificateChain]:
+    """
+    Resolves the chain of every entry with one of the given usages against the CERTAUTH
+    entries listed with it. Each certificate is parsed once and CAs are looked up by
+    subject key identifier, or by subject when the authority key identifier is missing, so
+    the whole keyring resolves in linear time. Chains through the same CA share its links.
+    """
+    if now is None:
+        now = datetime.now(timezone.utc)
+    targets: List[_Certificate] = []
+    by_key_id: Dict[bytes, List[_Certificate]] = {}
+    by_subject: Dict[bytes, List[_Certificate]] = {}
+    for entry in entries:
+        try:
+            details = parse_certificate(entry.der)
+            valid = details.not_before <= now <= details.not_after
+        except (TypeError, ValueError):
+            details, valid = None, False
+        certificate = _Certificate(entry.label, details, valid)
+        if entry.usage in usages:
+            targets.append(certificate)
+        if entry.usage == "CERTAUTH" and details is not None:
+            by_subject.setdefault(details.subject, []).append(certificate)
+            if details.subject_key_id is not None:
+                by_key_id.setdefault(details.subject_key_id, []).append(certificate)
+
+    resolved: Dict[int, Tuple[Tuple[ChainLink, ...], bool]] = {}
+    resolving = set()
+
+    def issuer_of(details: CertificateDetails) -> Optional[_Certificate]:
+        candidates = None
+        if details.authority_key_id is not None:
+            candidates = by_key_id.get(details.authority_key_id)
+        if candidates is None:
+            candidates = by_subject.get(details.issuer)
+        if not candidates:
+            return None
+        # Prefer a CA that is valid now, then the one that stays valid longest
+        return max(
+            candidates,
+            key=lambda candidate: (candidate.valid, candidate.details.not_after),
+        )
+
+    def resolve(certificate: _Certificate) -> Tuple[Tuple[ChainLink, ...], bool]:
+        key = id(certificate)
+        if key in resolved:
+            return resolved[key]
+        details = certificate.details
+        if details is None:
+            link = ChainLink(certificate.label, None, None, None, (UNPARSABLE,))
+            resolved[key] = ((link,), False)
+            return resolved[key]
+
+        problems = []
+        if details.not_after < now:
+            problems.append(EXPIRED)
+        elif details.not_before > now:
+            problems.append(NOT_YET_VALID)
+        self_signed = details.subject == details.issuer and (
+            details.authority_key_id is None
+            or details.authority_key_id == details.subject_key_id
+        )
+        rest: Tuple[ChainLink, ...] = ()
+        complete = True
+        if not self_signed:
+            issuer = issuer_of(details)
+            if issuer is None:
+                problems.append(MISSING_ISSUER)
+                complete = False
+            elif id(issuer) in resolving:
+                problems.append(CYCLE)
+                complete = False
+            else:
+                resolving.add(key)
+                rest, complete = resolve(issuer)
+                resolving.discard(key)
+        link = ChainLink(
+            certificate.label,
+            details.subject,
+            details.issuer,
+            details.not_after,
+            tuple(problems),
+        )
+        resolved[key] = ((link,) + rest, complete and not problems)
+        return resolved[key]
+
+    chains = {}
+    for certificate in targets:
+        links, complete = resolve(certificate)
+        chains[certificate.label] = CertificateChain(certificate.label, links, complete)
+    return chains
@@ -0,0 +1,95 @@
+"""Per-keyring lookup of certificates by fingerprint, subject and record ID."""
+
+import hashlib
+import re
+from typing import Dict, Iterable, Optional, Union
+
+from .certificate_details import format_name, parse_certificate
+
+# Lookups served from a KeyringIndex, as extract_certificate() keywords
+FINGERPRINT = "fingerprint"
+SUBJECT = "subject"
+RECORD_ID = "record_id"
+
+_SEPARATORS = re.compile(r"\s*(?<!\\)([,+=])\s*")
+
+
+def normalize_fingerprint(fingerprint: str) -> str:
+    """Returns a hex SHA-256 fingerprint in lower case without colons or blanks."""
+    return re.sub(r"[\s:]", "", fingerprint).lower()
+
+
+def normalize_subject(subject: Union[str, bytes]) -> Union[str, bytes]:
+    """
+    Returns an RFC 4514 distinguished name in lower case without blanks around separators,
+    so DNs written differently compare equal. DER encoded names are returned as they are.
+    """
+    if isinstance(subject, bytes):
+        return subject
+    return _SEPARATORS.sub(r"\1", subject.strip()).lower()
+
+
+class KeyringIndex:
+    """
+    Labels of a keyring's certificates by SHA-256 fingerprint, subject and record ID, built
+    from one listing so a lookup costs the same however many certificates the keyring holds.
+    Subjects are indexed both as DER and as normalized RFC 4514 strings. When several
+    certificates share a subject, the first one listed is found.
+    """
+
+    def __init__(self, entries: Iterable) -> None:
+        self.__labels: Dict[str, Dict[object, str]] = {
+            FINGERPRINT: {},
+            SUBJECT: {},
+            RECORD_ID: {},
+        }
+        for entry in entries:
+            for kind, key in self.__keys(entry.der, entry.record_id):
+                self.__labels[kind].setdefault(key, entry.label)
+
+    def __len__(self) -> int:
+        return len(self.__labels[FINGERPRINT])
+
+    def label(self, kind: str, value: Union[str, bytes]) -> Optional[str]:
+        """Returns the label of the certificate with a fingerprint, subject or record ID."""
+        return self.__labels[kind].get(self.__normalize(kind, value))
+
+    @classmethod
+    def matches(
+        cls,
+        kind: str,
+        value: Union[str, bytes],
+        certificate: bytes,
+        record_id: Optional[bytes],
+    ) -> bool:
+        """Whether a certificate extracted by label still has the fingerprint, subject or ID."""
+        key = cls.__normalize(kind, value)
+        return any(
+            (found_kind, found_key) == (kind, key)
+            for found_kind, found_key in cls.__keys(certificate, record_id)
+        )
+
+    @staticmethod
+    def __normalize(kind: str, value: Union[str, bytes]) -> Union[str, bytes]:
+        if kind == FINGERPRINT:
+            return normalize_fingerprint(value)
+        if kind == SUBJECT:
+            return normalize_subject(value)
+        if kind == RECORD_ID:
+            return value
+        raise ValueError(f"Unknown lookup {kind}")
+
+    @staticmethod
+    def __keys(certificate: Optional[bytes], record_id: Optional[bytes]):
+        if record_id:
+            yield RECORD_ID, bytes(record_id)
+        if certificate is None:
+            return
+        yield FINGERPRINT, hashlib.sha256(certificate).hexdigest()
+        try:
+            subject = parse_certificate(certificate).subject
+            formatted = format_name(subject)
+        except ValueError:
+            return
+        yield SUBJECT, subject
+        yield SUBJECT, normalize_subject(formatted)
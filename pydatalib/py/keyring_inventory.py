@@ -0,0 +1,304 @@
+"""SQLite-backed keyring inventory shared by every process that opens the same file."""
+
+import hashlib
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import List, NamedTuple, Optional, Tuple
+
+from .cert_admin import CertAdmin
+from .certificate_details import parse_certificate
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    userid TEXT NOT NULL,
+    keyring TEXT NOT NULL,
+    label TEXT NOT NULL,
+    owner TEXT NOT NULL,
+    usage TEXT NOT NULL,
+    status TEXT NOT NULL,
+    is_default INTEGER NOT NULL,
+    fingerprint TEXT NOT NULL,
+    not_before INTEGER,
+    not_after INTEGER,
+    der BLOB,
+    PRIMARY KEY (userid, keyring, label)
+);
+CREATE INDEX IF NOT EXISTS entries_fingerprint ON entries (fingerprint);
+CREATE INDEX IF NOT EXISTS entries_not_after ON entries (not_after);
+CREATE TABLE IF NOT EXISTS rings (
+    userid TEXT NOT NULL,
+    keyring TEXT NOT NULL,
+    refreshed_at REAL NOT NULL,
+    PRIMARY KEY (userid, keyring)
+);
+"""
+
+_COLUMNS = (
+    "userid, keyring, label, owner, usage, status, is_default, fingerprint, "
+    + "not_before, not_after, der"
+)
+
+
+class InventoryEntry(NamedTuple):
+    """Metadata for one keyring entry as recorded by the last refresh of its ring."""
+
+    userid: str
+    keyring: str
+    label: str
+    owner: str
+    usage: str
+    status: str
+    default: bool
+    fingerprint: str
+    not_before: Optional[datetime]
+    not_after: Optional[datetime]
+    der: Optional[bytes]
+
+
+class RefreshSummary(NamedTuple):
+    """Counts of entries changed by a refresh, and when the listing it recorded started."""
+
+    added: int
+    updated: int
+    removed: int
+    unchanged: int
+    refreshed_at: float
+
+
+class KeyringInventory:
+    """
+    Persistent inventory of keyring entries. Refreshes list the ring through R_datalib and
+    only rewrite entries whose fingerprint or metadata changed. The database runs in WAL
+    mode, so any number of processes can query it while a single writer refreshes.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        cert_admin: Optional[CertAdmin] = None,
+        store_der: bool = False,
+        timeout: float = 30.0,
+    ) -> None:
+        self.__path = path
+        self.__cert_admin = cert_admin if cert_admin is not None else CertAdmin()
+        self.__store_der = store_der
+        self.__timeout = timeout
+        self.__local = threading.local()
+        connection = self.__connection()
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.executescript(_SCHEMA)
+
+    def refresh(self, userid: str, keyring: str) -> RefreshSummary:
+        """
+        Lists the keyring and records what changed since the last refresh. The listing is
+        taken without holding the database, so when refreshes of one ring overlap, the one
+        whose listing started last is kept: a refresh finding a later listing already
+        recorded changes nothing and reports that listing's time.
+        """
+        listed_at = time.time()
+        listing = self.__cert_admin.list_keyring(userid=userid, keyring=keyring)
+        connection = self.__connection()
+        added = updated = unchanged = 0
+        # BEGIN IMMEDIATE takes the write lock up front so concurrent refreshes queue
+        # behind each other instead of failing when they try to upgrade a read lock.
+        connection.execute("BEGIN IMMEDIATE")
+        try:
+            recorded = connection.execute(
+                "SELECT refreshed_at FROM rings WHERE userid = ? AND keyring = ?",
+                (userid, keyring),
+            ).fetchone()
+            if recorded is not None and recorded[0] > listed_at:
+                connection.execute("COMMIT")
+                return RefreshSummary(0, 0, 0, 0, recorded[0])
+            stored = {
+                row[0]: row[1:]
+                for row in connection.execute(
+                    "SELECT label, fingerprint, owner, usage, status, is_default, "
+                    + "der IS NOT NULL FROM entries WHERE userid = ? AND keyring = ?",
+                    (userid, keyring),
+                )
+            }
+            for entry in listing:
+                der = entry.der
+                fingerprint = hashlib.sha256(der).hexdigest()
+                metadata = (entry.owner, entry.usage, entry.status, int(entry.default))
+                previous = stored.pop(entry.label, None)
+                if previous is None:
+                    self.__insert(
+                        connection,
+                        (userid, keyring, entry.label),
+                        metadata,
+                        der,
+                        fingerprint,
+                    )
+                    added += 1
+                elif previous[0] != fingerprint or previous[5] != self.__store_der:
+                    self.__insert(
+                        connection,
+                        (userid, keyring, entry.label),
+                        metadata,
+                        der,
+                        fingerprint,
+                    )
+                    updated += 1
+                elif previous[1:5] != metadata:
+                    connection.execute(
+                        "UPDATE entries SET owner = ?, usage = ?, status = ?, is_default = ? "
+                        + "WHERE userid = ? AND keyring = ? AND label = ?",
+                        (*metadata, userid, keyring, entry.label),
+                    )
+                    updated += 1
+                else:
+                    unchanged += 1
+            connection.executemany(
+                "DELETE FROM entries WHERE userid = ? AND keyring = ? AND label = ?",
+                [(userid, keyring, label) for label in stored],
+            )
+            connection.execute(
+                "INSERT OR REPLACE INTO rings (userid, keyring, refreshed_at) VALUES (?, ?, ?)",
+                (userid, keyring, listed_at),
+            )
+            connection.execute("COMMIT")
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        return RefreshSummary(added, updated, len(stored), unchanged, listed_at)
+
+    def get(self, userid: str, keyring: str, label: str) -> Optional[InventoryEntry]:
+        """Returns the recorded entry with a label, or None."""
+        rows = self.__query(
+            "userid = ? AND keyring = ? AND label = ?", (userid, keyring, label)
+        )
+        return rows[0] if rows else None
+
+    def entries(
+        self,
+        userid: Optional[str] = None,
+        keyring: Optional[str] = None,
+        usage: Optional[str] = None,
+        status: Optional[str] = None,
+    ) -> List[InventoryEntry]:
+        """Returns recorded entries, optionally filtered by ring owner, ring, usage and status."""
+        conditions, parameters = [], []
+        for column, value in (
+            ("userid", userid),
+            ("keyring", keyring),
+            ("usage", usage),
+            ("status", status),
+        ):
+            if value is not None:
+                conditions.append(f"{column} = ?")
+                parameters.append(value)
+        return self.__query(" AND ".join(conditions) or "1", parameters)
+
+    def default_certificate(
+        self, userid: str, keyring: str
+    ) -> Optional[InventoryEntry]:
+        """Returns the recorded default certificate of a ring, or None."""
+        rows = self.__query(
+            "userid = ? AND keyring = ? AND is_default != 0", (userid, keyring)
+        )
+        return rows[0] if rows else None
+
+    def find_by_fingerprint(self, fingerprint: str) -> List[InventoryEntry]:
+        """Returns every recorded entry, across rings, whose SHA-256 fingerprint matches."""
+        return self.__query("fingerprint = ?", (fingerprint.lower(),))
+
+    def expiring_before(
+        self,
+        moment: datetime,
+        userid: Optional[str] = None,
+        keyring: Optional[str] = None,
+    ) -> List[InventoryEntry]:
+        """Returns recorded entries that are no longer valid at moment, soonest first."""
+        conditions = ["not_after < ?"]
+        parameters = [int(moment.timestamp())]
+        if userid is not None:
+            conditions.append("userid = ?")
+            parameters.append(userid)
+        if keyring is not None:
+            conditions.append("keyring = ?")
+            parameters.append(keyring)
+        return self.__query(
+            " AND ".join(conditions) + " ORDER BY not_after", parameters
+        )
+
+    def refreshed_at(self, userid: str, keyring: str) -> Optional[float]:
+        """Returns when the listing last recorded for a ring started, or None if none was."""
+        row = (
+            self.__connection()
+            .execute(
+                "SELECT refreshed_at FROM rings WHERE userid = ? AND keyring = ?",
+                (userid, keyring),
+            )
+            .fetchone()
+        )
+        return row[0] if row else None
+
+    def close(self) -> None:
+        """Closes the calling thread's database connection."""
+        connection = getattr(self.__local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self.__local.connection = None
+
+    def __connection(self) -> sqlite3.Connection:
+        """sqlite3 connections cannot be shared across threads, so each thread opens its own."""
+        connection = getattr(self.__local, "connection", None)
+        if connection is None:
+            connection = sqlite3.connect(
+                self.__path, timeout=self.__timeout, isolation_level=None
+            )
+            self.__local.connection = connection
+        return connection
+
+    def __insert(
+        self,
+        connection: sqlite3.Connection,
+        key: Tuple[str, str, str],
+        metadata: tuple,
+        der: bytes,
+        fingerprint: str,
+    ) -> None:
+        """Stores an entry under its (userid, keyring, label)."""
+        try:
+            details = parse_certificate(der)
+            validity = (
+                int(details.not_before.timestamp()),
+                int(details.not_after.timestamp()),
+            )
+        except ValueError:
+            validity = (None, None)
+        connection.execute(
+            f"INSERT OR REPLACE INTO entries ({_COLUMNS}) "
+            + "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                *key,
+                *metadata,
+                fingerprint,
+                *validity,
+                der if self.__store_der else None,
+            ),
+        )
+
+    def __query(self, condition: str, parameters) -> List[InventoryEntry]:
+        rows = self.__connection().execute(
+            f"SELECT {_COLUMNS} FROM entries WHERE {condition}", parameters
+        )
+        return [
+            InventoryEntry(
+                *row[:6],
+                bool(row[6]),
+                row[7],
+                _from_timestamp(row[8]),
+                _from_timestamp(row[9]),
+                row[10],
+            )
+            for row in rows
+        ]
+
+
+def _from_timestamp(value: Optional[int]) -> Optional[datetime]:
+    return None if value is None else datetime.fromtimestamp(value, tz=timezone.utc)
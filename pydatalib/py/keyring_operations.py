@@ -0,0 +1,119 @@
+"""Keyring write operations: batches for CertAdmin.apply() and keyring clone reports."""
+
+from typing import List, NamedTuple, Optional, Tuple
+
+NEWRING = 0x07
+DATAPUT = 0x08
+DATAREMOVE = 0x09
+DELRING = 0x0A
+REFRESH = 0x0B
+
+# cpydatalib function each operation stands in for, as seen by logging and the rate governor
+OPERATION_FUNCTIONS = {
+    NEWRING: "touchKeyring",
+    DATAPUT: "dataPut",
+    DATAREMOVE: "dataRemove",
+    DELRING: "touchKeyring",
+    REFRESH: "touchKeyring",
+}
+
+
+class CertificateAttributes(NamedTuple):
+    """
+    Keywords a certificate is added with: usage is PERSONAL or CERTAUTH, and default makes
+    the certificate the keyring default.
+    """
+
+    usage: Optional[str] = None
+    default: bool = False
+
+
+class Operation(NamedTuple):
+    """One keyring operation. Build these with the class methods rather than directly."""
+
+    function_code: int
+    userid: str
+    keyring: str
+    label: Optional[str] = None
+    certificate: Optional[bytes] = None
+    private_key: bytes = b""
+    usage: Optional[str] = None
+    default: bool = False
+
+    @classmethod
+    def add_keyring(cls, userid: str, keyring: str) -> "Operation":
+        return cls(NEWRING, userid, keyring)
+
+    @classmethod
+    def delete_keyring(cls, userid: str, keyring: str) -> "Operation":
+        return cls(DELRING, userid, keyring)
+
+    @classmethod
+    def refresh_keyring(cls, userid: str, keyring: str) -> "Operation":
+        return cls(REFRESH, userid, keyring)
+
+    @classmethod
+    def add_certificate(
+        cls,
+        userid: str,
+        keyring: str,
+        label: str,
+        certificate_data: bytes,
+        private_key: bytes = b"",
+        **attributes,
+    ) -> "Operation":
+        return cls(
+            DATAPUT,
+            userid,
+            keyring,
+            label,
+            certificate_data,
+            private_key,
+            *CertificateAttributes(**attributes),
+        )
+
+    @classmethod
+    def remove_certificate(cls, userid: str, keyring: str, label: str) -> "Operation":
+        return cls(DATAREMOVE, userid, keyring, label)
+
+
+class OperationResult(NamedTuple):
+    """Outcome of one operation of a batch. executed is False when an earlier one failed."""
+
+    operation: Operation
+    executed: bool
+    saf_return_code: int
+    racf_return_code: int
+    racf_reason_code: int
+
+    @property
+    def ok(self) -> bool:
+        return self.executed and self.saf_return_code == 0
+
+    @property
+    def return_codes(self) -> dict:
+        """Return codes in the form DatalibServiceError takes."""
+        return {
+            "functionCode": self.operation.function_code,
+            "safReturnCode": self.saf_return_code,
+            "racfReturnCode": self.racf_return_code,
+            "racfReasonCode": self.racf_reason_code,
+        }
+
+
+class CloneReport(NamedTuple):
+    """What CertAdmin.clone_keyring() copied, and how fast."""
+
+    copied: int
+    skipped: int
+    failed: List[Tuple[str, dict]]
+    bytes_copied: int
+    seconds: float
+
+    @property
+    def certificates_per_second(self) -> float:
+        return self.copied / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes_copied / self.seconds if self.seconds else 0.0
@@ -0,0 +1,197 @@
+"""Cursor-based paging over keyrings backed by native listing handles."""
+
+import base64
+import binascii
+import importlib
+import json
+import secrets
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from .datalib_logger import logger
+from .datalib_service_error import DatalibServiceError
+
+if TYPE_CHECKING:
+    import cpydatalib
+
+
+class KeyringPage(NamedTuple):
+    """One page of a keyring listing. cursor is None once the keyring is exhausted."""
+
+    entries: List["cpydatalib.CertificateEntry"]
+    cursor: Optional[str]
+
+
+class KeyringPager:
+    """
+    Hands out pages of keyring listings with opaque resume cursors. The native handle behind
+    a cursor stays open, so the next page only reads its own entries. When the handle has
+    expired or was already resumed by another request, a fresh listing skips ahead to the
+    last label returned. If that entry was removed meanwhile, the fresh listing skips one
+    entry less than the cursor's position, so it resumes with the entry that followed the
+    removed one. A background thread, running while any handle is held, releases handles
+    idle for longer than idle_timeout with DATA_ABORT. Listings are opened on backend,
+    cpydatalib unless another is given.
+    """
+
+    def __init__(
+        self,
+        call: Callable,
+        codepage: str,
+        idle_timeout: float = 60.0,
+        max_handles: int = 64,
+        interner: Optional[Callable] = None,
+        backend=None,
+    ) -> None:
+        self.__call = call
+        self.__backend = (
+            backend if backend is not None else importlib.import_module("cpydatalib")
+        )
+        self.__interner = interner
+        self.__codepage = codepage
+        self.__idle_timeout = idle_timeout
+        self.__max_handles = max_handles
+        self.__handles: Dict[str, Tuple["cpydatalib.Listing", float]] = {}
+        self.__lock = threading.Condition()
+        self.__reaper: Optional[threading.Thread] = None
+
+    def page(
+        self,
+        userid: str,
+        keyring: str,
+        limit: int,
+        cursor: Optional[str] = None,
+        encoder: Optional[Callable] = None,
+        bodies: bool = True,
+    ) -> KeyringPage:
+        """Returns up to limit entries, starting after the entry the cursor was issued for."""
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        userid_enc = userid.encode(self.__codepage)
+        keyring_enc = keyring.encode(self.__codepage)
+
+        listing = None
+        state = self.__decode(cursor, userid, keyring) if cursor is not None else None
+        with self.__lock:
+            self.__expire_idle(time.monotonic())
+            if state is not None:
+                held = self.__handles.pop(state["handle"], None)
+                if held is not None and held[0].position == state["position"]:
+                    listing = held[0]
+                elif held is not None:
+                    held[0].abort()
+        if listing is None:
+            listing = self.__backend.Listing(userid_enc, keyring_enc)
+            if state is not None:
+                listing = self.__resume(listing, userid_enc, keyring_enc, state)
+
+        entries = self.__call(
+            "listPage",
+            userid_enc,
+            keyring_enc,
+            target=listing.fetch,
+            limit=limit,
+            codepage=self.__codepage,
+            encoder=encoder,
+            bodies=bodies,
+            interner=self.__interner,
+        )
+        if isinstance(entries, dict):
+            raise DatalibServiceError(entries)
+        if listing.finished:
+            return KeyringPage(entries, None)
+
+        handle_id = secrets.token_urlsafe(12)
+        with self.__lock:
+            self.__handles[handle_id] = (listing, time.monotonic())
+            while len(self.__handles) > self.__max_handles:
+                oldest = min(self.__handles, key=lambda key: self.__handles[key][1])
+                self.__handles.pop(oldest)[0].abort()
+            if self.__reaper is None:
+                self.__reaper = threading.Thread(
+                    target=self.__reap, name="pydatalib-listing-reaper", daemon=True
+                )
+                self.__reaper.start()
+        return KeyringPage(
+            entries,
+            self.__encode(
+                userid, keyring, handle_id, listing.position, entries[-1].label
+            ),
+        )
+
+    def expire_idle(self) -> int:
+        """Aborts every handle idle for longer than idle_timeout and returns how many."""
+        with self.__lock:
+            return self.__expire_idle(time.monotonic())
+
+    def close(self) -> None:
+        """Aborts every held handle. Outstanding cursors resume by skipping ahead."""
+        with self.__lock:
+            handles, self.__handles = self.__handles, {}
+            self.__lock.notify_all()
+        for listing, _ in handles.values():
+            listing.abort()
+
+    def __expire_idle(self, now: float) -> int:
+        expired = [
+            handle_id
+            for handle_id, (_, last_used) in self.__handles.items()
+            if now - last_used > self.__idle_timeout
+        ]
+        for handle_id in expired:
+            self.__handles.pop(handle_id)[0].abort()
+        if expired:
+            logger.debug("Aborted %d idle listing handles", len(expired))
+        return len(expired)
+
+    def __reap(self) -> None:
+        """Expires idle handles as they come due, until no handle is held."""
+        with self.__lock:
+            while self.__handles:
+                self.__expire_idle(time.monotonic())
+                if not self.__handles:
+                    break
+                oldest = min(last_used for _, last_used in self.__handles.values())
+                self.__lock.wait(
+                    max(oldest + self.__idle_timeout - time.monotonic(), 0) + 0.01
+                )
+            self.__reaper = None
+
+    def __resume(
+        self,
+        listing: "cpydatalib.Listing",
+        userid_enc: bytes,
+        keyring_enc: bytes,
+        state: dict,
+    ) -> "cpydatalib.Listing":
+        found = listing.seek(state["label"].encode(self.__codepage))
+        if isinstance(found, dict):
+            raise DatalibServiceError(found)
+        if not found:
+            # The entry the cursor ended on was among those skipped and is gone now
+            listing = self.__backend.Listing(userid_enc, keyring_enc)
+            skipped = listing.skip(max(state["position"] - 1, 0))
+            if isinstance(skipped, dict):
+                raise DatalibServiceError(skipped)
+        return listing
+
+    @staticmethod
+    def __encode(
+        userid: str, keyring: str, handle_id: str, position: int, label: str
+    ) -> str:
+        state = [userid, keyring, handle_id, position, label]
+        return base64.urlsafe_b64encode(json.dumps(state).encode("utf-8")).decode(
+            "ascii"
+        )
+
+    @staticmethod
+    def __decode(cursor: str, userid: str, keyring: str) -> dict:
+        try:
+            state = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+            cursor_userid, cursor_keyring, handle_id, position, label = state
+        except (binascii.Error, UnicodeError, ValueError, TypeError) as error:
+            raise ValueError("Malformed keyring cursor") from error
+        if (cursor_userid, cursor_keyring) != (userid, keyring):
+            raise ValueError(f"Cursor was not issued for keyring {userid}/{keyring}")
+        return {"handle": handle_id, "position": position, "label": label}
@@ -0,0 +1,254 @@
+"""Background prefetch of configured keyrings and certificates, refreshed ahead of expiry."""
+
+import heapq
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+from .datalib_logger import logger
+from .rate_governor import BULK, call_priority
+
+
+class PrefetchTarget(NamedTuple):
+    """A keyring to keep listed, or only the given labels of it to keep extracted."""
+
+    userid: str
+    keyring: str
+    labels: Optional[Tuple[str, ...]] = None
+
+
+class PrefetchStatus(NamedTuple):
+    """
+    Progress of a KeyringPrefetcher. ready is True once every item was loaded or failed
+    its first attempt; failed items are retried in the background.
+    """
+
+    items: int
+    loaded: int
+    failed: int
+    refreshes: int
+    ready: bool
+
+
+class _Cached(NamedTuple):
+    value: object
+    expires_at: float
+
+
+class _Item:
+    def __init__(self) -> None:
+        self.cached: Optional[_Cached] = None
+        self.failures = 0
+        self.attempted = False
+        self.refreshes = 0
+
+
+def prefetch_targets(config: Union[str, Iterable]) -> List[PrefetchTarget]:
+    """
+    Reads prefetch targets from a JSON file path, or from an iterable of (userid, keyring[,
+    labels]) sequences or of mappings with userid, keyring and optional labels.
+    """
+    if isinstance(config, str):
+        with open(config, "r", encoding="utf-8") as file:
+            config = json.load(file)
+    targets = []
+    for item in config:
+        if isinstance(item, dict):
+            userid, keyring, labels = (
+                item["userid"],
+                item["keyring"],
+                item.get("labels"),
+            )
+        else:
+            userid, keyring, *rest = item
+            labels = rest[0] if rest else None
+        if isinstance(labels, str):
+            labels = (labels,)
+        targets.append(
+            PrefetchTarget(userid, keyring, tuple(labels) if labels else None)
+        )
+    return targets
+
+
+class KeyringPrefetcher:
+    """
+    Loads configured listings and certificates on a bounded pool of threads and keeps them
+    in memory for ttl seconds. Each item is reloaded once refresh_ahead of its ttl remains,
+    so a fresh copy replaces it before it expires. A failed load is retried with backoff and
+    the previous copy is served until it expires. Loads run in the BULK priority lane.
+    """
+
+    def __init__(
+        self,
+        targets: Iterable[PrefetchTarget],
+        load_listing: Callable[[str, str], list],
+        load_certificate: Callable[[str, str, str], dict],
+        *,
+        max_workers: int = 4,
+        ttl: float = 300.0,
+        refresh_ahead: float = 0.2,
+    ) -> None:
+        if not 0 <= refresh_ahead < 1:
+            raise ValueError("refresh_ahead must be at least 0 and less than 1")
+        self.__loaders = {"listing": load_listing, "certificate": load_certificate}
+        self.__ttl = ttl
+        self.__refresh_ahead = refresh_ahead
+        self.__items: Dict[tuple, _Item] = {}
+        for target in targets:
+            if target.labels is None:
+                self.__items[("listing", target.userid, target.keyring)] = _Item()
+            else:
+                for label in target.labels:
+                    key = ("certificate", target.userid, target.keyring, label)
+                    self.__items[key] = _Item()
+        self.__generations: Dict[Tuple[str, str], int] = {}
+        # Heap of (due time, key), None once stopped
+        self.__schedule: Optional[List[Tuple[float, tuple]]] = []
+        self.__condition = threading.Condition()
+        self.__ready = threading.Event()
+        self.__executor = ThreadPoolExecutor(
+            max_workers, thread_name_prefix="pydatalib-prefetch"
+        )
+        self.__thread: Optional[threading.Thread] = None
+        if not self.__items:
+            self.__ready.set()
+
+    def start(self) -> None:
+        """Starts loading every item in the background."""
+        with self.__condition:
+            if self.__thread is not None:
+                return
+            for key in self.__items:
+                self.__executor.submit(self.__load, key)
+            self.__thread = threading.Thread(
+                target=self.__run, name="pydatalib-prefetch-scheduler", daemon=True
+            )
+            self.__thread.start()
+
+    def listing(self, userid: str, keyring: str) -> Optional[list]:
+        """Returns a copy of the prefetched listing of a keyring, or None."""
+        value = self.__get(("listing", userid, keyring))
+        return None if value is None else list(value)
+
+    def certificate(self, userid: str, keyring: str, label: str) -> Optional[dict]:
+        """Returns a copy of a prefetched extract_certificate() result, or None."""
+        value = self.__get(("certificate", userid, keyring, label))
+        return None if value is None else dict(value)
+
+    def invalidate(self, userid: str, keyring: str) -> None:
+        """Drops everything held for a keyring and reloads it in the background."""
+        with self.__condition:
+            keys = [key for key in self.__items if key[1:3] == (userid, keyring)]
+            if not keys:
+                return
+            for key in keys:
+                self.__items[key].cached = None
+            # Loads already in progress may have read the keyring before it changed
+            ring = (userid, keyring)
+            self.__generations[ring] = self.__generations.get(ring, 0) + 1
+            if self.__schedule is None:
+                return
+            self.__schedule = [
+                item for item in self.__schedule if item[1][1:3] != (userid, keyring)
+            ]
+            heapq.heapify(self.__schedule)
+            for key in keys:
+                self.__push(key, 0.0)
+
+    def status(self) -> PrefetchStatus:
+        """Returns how many items are loaded and whether the first pass has finished."""
+        with self.__condition:
+            items = self.__items.values()
+            return PrefetchStatus(
+                len(self.__items),
+                sum(item.cached is not None for item in items),
+                sum(item.failures > 0 for item in items),
+                sum(item.refreshes for item in items),
+                self.__ready.is_set(),
+            )
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        """Blocks until every item was loaded or failed once, and returns whether it was."""
+        return self.__ready.wait(timeout)
+
+    def stop(self) -> None:
+        """Stops refreshing and waits for loads in progress."""
+        with self.__condition:
+            self.__schedule = None
+            self.__condition.notify_all()
+        self.__executor.shutdown(wait=True, cancel_futures=True)
+
+    def __get(self, key: tuple):
+        item = self.__items.get(key)
+        cached = item.cached if item is not None else None
+        if cached is None or cached.expires_at <= time.monotonic():
+            return None
+        return cached.value
+
+    def __load(self, key: tuple) -> None:
+        item = self.__items[key]
+        with self.__condition:
+            if self.__schedule is None:
+                return
+            generation = self.__generations.get(key[1:3], 0)
+        try:
+            with call_priority(BULK):
+                value = self.__loaders[key[0]](*key[1:])
+        except Exception as error:  # pylint: disable=broad-exception-caught
+            with self.__condition:
+                item.failures += 1
+                logger.warning("Prefetching %s failed: %s", "/".join(key[1:]), error)
+                self.__push(key, min(self.__ttl, 2.0**item.failures))
+                item.attempted = True
+                self.__check_ready()
+            return
+        with self.__condition:
+            if self.__generations.get(key[1:3], 0) != generation:
+                return
+            if item.attempted:
+                item.refreshes += 1
+            item.attempted = True
+            item.failures = 0
+            item.cached = _Cached(value, time.monotonic() + self.__ttl)
+            self.__push(key, self.__ttl * (1 - self.__refresh_ahead))
+            self.__check_ready()
+
+    def __check_ready(self) -> None:
+        if self.__ready.is_set():
+            return
+        items = self.__items.values()
+        if all(item.attempted for item in items):
+            logger.debug(
+                "Prefetched %d of %d items",
+                sum(item.cached is not None for item in items),
+                len(self.__items),
+            )
+            self.__ready.set()
+
+    def __push(self, key: tuple, delay: float) -> None:
+        if self.__schedule is None:
+            return
+        heapq.heappush(self.__schedule, (time.monotonic() + delay, key))
+        self.__condition.notify()
+
+    def __run(self) -> None:
+        while True:
+            with self.__condition:
+                while self.__schedule is not None and (
+                    not self.__schedule or self.__schedule[0][0] > time.monotonic()
+                ):
+                    timeout = (
+                        self.__schedule[0][0] - time.monotonic()
+                        if self.__schedule
+                        else None
+                    )
+                    self.__condition.wait(timeout)
+                if self.__schedule is None:
+                    return
+                _, key = heapq.heappop(self.__schedule)
+            try:
+                self.__executor.submit(self.__load, key)
+            except RuntimeError:
+                return
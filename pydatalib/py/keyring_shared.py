@@ -0,0 +1,433 @@
+"""Keyring listings shared between processes through multiprocessing.shared_memory."""
+
+import importlib
+import os
+import secrets
+import struct
+import sys
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from typing import TYPE_CHECKING, Dict, Iterable, List, Mapping, Optional, Tuple
+
+if TYPE_CHECKING:
+    import cpydatalib
+
+LAYOUT_VERSION = 1
+
+# Control segment: magic, layout version and the published generation, written twice so a
+# reader can tell a torn read from a finished write
+_CONTROL = struct.Struct("<4sHxxQQ")
+_CONTROL_MAGIC = b"PDLC"
+
+# Snapshot segment: header, then one ring record per keyring followed by its entry records
+_HEADER = struct.Struct("<4sHxxIQ")
+_HEADER_MAGIC = b"PDLS"
+# userid length, keyring length, flags, entry count, offset of the first entry record
+_RING = struct.Struct("<HHIII")
+# digest, certificate length, private key length, label length, owner length, record ID
+# length, usage, status, flags; the variable length fields follow in that order
+_ENTRY = struct.Struct("<QIIHHHBBB")
+
+_USAGES = ("PERSONAL", "CERTAUTH", "OTHER")
+_STATUSES = ("TRUST", "HIGHTRUST", "NOTRUST", "UNKNOWN")
+
+# Ring flags
+_KEYS_LISTED = 0x01
+# Entry flags
+_DEFAULT = 0x01
+_BODY = 0x02
+_PRIVATE_KEY = 0x04
+_RECORD_ID = 0x08
+_TEXT = 0x10
+
+
+class _Segment(shared_memory.SharedMemory):
+    """
+    Shared memory segment that stays mapped, instead of failing to close, while memoryviews
+    of it are alive. The mapping is released with the last of them.
+    """
+
+    def close(self) -> None:
+        try:
+            super().close()
+        except BufferError:
+            if getattr(self, "_fd", -1) >= 0:
+                os.close(self._fd)
+                self._fd = -1
+
+
+def _open_segment(name: str, create: bool = False, size: int = 0) -> _Segment:
+    """
+    Opens a segment without leaving it to the resource tracker. Before Python 3.13 every
+    process that opens a segment registers it and removes it when that process exits, which
+    would pull the cache away from the other workers.
+    """
+    if sys.version_info >= (3, 13):
+        return _Segment(name, create, size, track=False)
+    segment = _Segment(name, create, size)
+    # pylint: disable-next=protected-access
+    resource_tracker.unregister(segment._name, "shared_memory")
+    return segment
+
+
+def _unlink_segment(segment: _Segment) -> None:
+    if sys.version_info < (3, 13):
+        # unlink() unregisters the segment, so it has to be registered for that to succeed
+        # pylint: disable-next=protected-access
+        resource_tracker.register(segment._name, "shared_memory")
+    segment.unlink()
+
+
+def _encode_entry(entry, private_keys: bool) -> tuple:
+    """Returns the record header fields and variable length fields of an entry."""
+    label, owner = entry.label, entry.owner
+    flags = 0
+    if isinstance(label, str):
+        label, owner, flags = label.encode("utf-8"), owner.encode("utf-8"), _TEXT
+    certificate = entry.der
+    if certificate is not None:
+        flags |= _BODY
+        if not isinstance(certificate, (bytes, memoryview)):
+            certificate = bytes(certificate)
+    private_key = entry.private_key if private_keys else None
+    if private_key is not None:
+        flags |= _PRIVATE_KEY
+    record_id = entry.record_id
+    if record_id is not None:
+        flags |= _RECORD_ID
+    if entry.default:
+        flags |= _DEFAULT
+    fields = (label, owner, record_id or b"", certificate or b"", private_key or b"")
+    header = (
+        entry.digest,
+        len(fields[3]),
+        len(fields[4]),
+        len(label),
+        len(owner),
+        len(fields[2]),
+        _USAGES.index(entry.usage) if entry.usage in _USAGES else len(_USAGES) - 1,
+        (
+            _STATUSES.index(entry.status)
+            if entry.status in _STATUSES
+            else len(_STATUSES) - 1
+        ),
+        flags,
+    )
+    return header, fields
+
+
+class SharedSnapshot:
+    """
+    One published generation of a SharedKeyringCache. A snapshot's segment is never written
+    again, so everything read from it is consistent, and certificates are memoryviews of the
+    shared segment rather than copies. The segment stays mapped while any of them is alive.
+    """
+
+    def __init__(self, segment: _Segment, entry_type: type) -> None:
+        self.__entry_type = entry_type
+        # The segment is closed, leaving it mapped for views still in use, with the snapshot
+        self.__segment = segment
+        self.__buffer = segment.buf
+        magic, layout, rings, self.generation = _HEADER.unpack_from(self.__buffer)
+        if magic != _HEADER_MAGIC or layout != LAYOUT_VERSION:
+            raise ValueError(f"{segment.name} is not a pydatalib keyring snapshot")
+        self.__rings: Dict[Tuple[str, str], Tuple[int, int, int]] = {}
+        self.__labels: Dict[Tuple[str, str], Dict[object, int]] = {}
+        offset = _HEADER.size
+        for _ in range(rings):
+            userid_len, keyring_len, flags, count, first = _RING.unpack_from(
+                self.__buffer, offset
+            )
+            offset += _RING.size
+            userid = bytes(self.__buffer[offset : offset + userid_len]).decode("utf-8")
+            offset += userid_len
+            keyring = bytes(self.__buffer[offset : offset + keyring_len]).decode(
+                "utf-8"
+            )
+            offset += keyring_len
+            self.__rings[(userid, keyring)] = (first, count, flags)
+
+    def rings(self) -> List[Tuple[str, str]]:
+        """Returns the (userid, keyring) pairs the snapshot holds."""
+        return list(self.__rings)
+
+    def listing(
+        self, userid: str, keyring: str, private_keys: bool = False
+    ) -> Optional[List["cpydatalib.CertificateEntry"]]:
+        """
+        Returns the entries of a keyring as list_keyring() would, or None when the snapshot
+        does not hold it. Certificates are memoryviews of the segment; private keys are only
+        included when asked for and published.
+        """
+        ring = self.__rings.get((userid, keyring))
+        if ring is None:
+            return None
+        first, count, _ = ring
+        entries = []
+        offset = first
+        for _ in range(count):
+            entry, offset = self.__entry(offset, private_keys)
+            entries.append(entry)
+        return entries
+
+    def certificate(self, userid: str, keyring: str, label: str) -> Optional[dict]:
+        """
+        Returns an extract_certificate() result for a label, with memoryviews of the segment
+        for certificate and private key, or None when the snapshot does not hold the keyring,
+        the label or the keyring's private keys.
+        """
+        ring = self.__rings.get((userid, keyring))
+        if ring is None or not ring[2] & _KEYS_LISTED:
+            return None
+        offset = self.__label_offsets((userid, keyring), ring).get(label)
+        if offset is None:
+            return None
+        fields = _ENTRY.unpack_from(self.__buffer, offset)
+        views = self.__fields(offset, fields)
+        return {
+            "certificate": views[3],
+            "privateKey": views[4],
+            "label": label,
+            "recordId": bytes(views[2]) if fields[8] & _RECORD_ID else None,
+        }
+
+    def __label_offsets(self, key: Tuple[str, str], ring: tuple) -> Dict[object, int]:
+        labels = self.__labels.get(key)
+        if labels is None:
+            labels = {}
+            first, count, _ = ring
+            offset = first
+            for _ in range(count):
+                fields = _ENTRY.unpack_from(self.__buffer, offset)
+                label = bytes(self.__fields(offset, fields)[0])
+                labels.setdefault(
+                    label.decode("utf-8") if fields[8] & _TEXT else label, offset
+                )
+                offset += _ENTRY.size + sum(fields[1:6])
+            self.__labels[key] = labels
+        return labels
+
+    def __fields(self, offset: int, fields: tuple) -> List[memoryview]:
+        """Views of label, owner, record ID, certificate and private key of a record."""
+        _, certificate_len, key_len, label_len, owner_len, record_id_len = fields[:6]
+        views = []
+        offset += _ENTRY.size
+        for length in (label_len, owner_len, record_id_len, certificate_len, key_len):
+            views.append(self.__buffer[offset : offset + length])
+            offset += length
+        return views
+
+    def __entry(self, offset: int, private_keys: bool) -> tuple:
+        fields = _ENTRY.unpack_from(self.__buffer, offset)
+        digest, usage, status, flags = fields[0], fields[6], fields[7], fields[8]
+        label, owner, record_id, certificate, private_key = self.__fields(
+            offset, fields
+        )
+        entry = self.__entry_type(
+            bytes(label),
+            bytes(owner),
+            _USAGES[usage],
+            _STATUSES[status],
+            flags & _DEFAULT,
+            None,
+            "utf-8" if flags & _TEXT else None,
+            private_key=(
+                bytes(private_key) if private_keys and flags & _PRIVATE_KEY else None
+            ),
+            record_id=bytes(record_id) if flags & _RECORD_ID else None,
+            digest=digest,
+        )
+        if flags & _BODY:
+            entry = entry.with_certificate(certificate)
+        return entry, offset + _ENTRY.size + sum(fields[1:6])
+
+
+class SharedKeyringCache:
+    """
+    Keyring listings held in shared memory, published by one process and read by any
+    number of others, such as the workers of a pre-forked server, without each of them
+    listing the keyrings through RACF.
+
+    The process that creates the cache publishes whole snapshots of the keyrings it lists.
+    Each snapshot is written to a new segment and becomes visible with one update of a small
+    control segment, so readers never see a snapshot half written and can keep using an
+    older one while a newer one is published. Readers attach by name, or inherit the cache
+    across fork(). Segments are created with mode 0600; the creator removes them with
+    unlink(). Entries read back are CertificateEntry objects of backend, cpydatalib unless
+    another is given.
+    """
+
+    def __init__(
+        self, name: Optional[str] = None, create: bool = False, backend=None
+    ) -> None:
+        if name is None:
+            if not create:
+                raise ValueError("name is required unless create=True")
+            name = f"pydatalib_{os.getpid()}_{secrets.token_hex(4)}"
+        self.__name = name
+        self.__entry_type = (
+            backend if backend is not None else importlib.import_module("cpydatalib")
+        ).CertificateEntry
+        # Workers inherit the cache across fork(), but only its creator writes to it
+        self.__owner = os.getpid() if create else None
+        self.__lock = threading.Lock()
+        self.__snapshot: Optional[SharedSnapshot] = None
+        self.__published: Optional[_Segment] = None
+        self.__control = _open_segment(name, create, _CONTROL.size)
+        if create:
+            _CONTROL.pack_into(
+                self.__control.buf, 0, _CONTROL_MAGIC, LAYOUT_VERSION, 0, 0
+            )
+        magic, layout, _, _ = _CONTROL.unpack_from(self.__control.buf)
+        if magic != _CONTROL_MAGIC or layout != LAYOUT_VERSION:
+            self.__control.close()
+            raise ValueError(f"{name} is not a pydatalib keyring cache")
+
+    def __enter__(self) -> "SharedKeyringCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    @property
+    def name(self) -> str:
+        """Name other processes attach to the cache with."""
+        return self.__name
+
+    @property
+    def generation(self) -> int:
+        """Number of the latest published snapshot, 0 before the first."""
+        while True:
+            _, _, generation, check = _CONTROL.unpack_from(self.__control.buf)
+            if generation == check:
+                return generation
+
+    def publish(
+        self,
+        listings: Mapping[Tuple[str, str], Iterable],
+        private_keys: bool = False,
+    ) -> int:
+        """
+        Publishes listings, CertificateEntry lists keyed by (userid, keyring), as the next
+        snapshot and returns its generation. With private_keys the entries' private keys are
+        stored too, so extract_certificate() can be served for those keyrings. Keyrings left
+        out are no longer held.
+        """
+        if self.__owner != os.getpid():
+            raise ValueError(
+                "Only the process that created the cache can publish to it"
+            )
+        with self.__lock:
+            generation = self.generation + 1
+            rings = []
+            size = _HEADER.size
+            for (userid, keyring), entries in listings.items():
+                key = (userid.encode("utf-8"), keyring.encode("utf-8"))
+                records = [_encode_entry(entry, private_keys) for entry in entries]
+                rings.append((key, records))
+                size += _RING.size + len(key[0]) + len(key[1])
+                size += sum(_ENTRY.size + sum(header[1:6]) for header, _ in records)
+
+            segment = _open_segment(f"{self.__name}.{generation}", True, size)
+            try:
+                self.__write(segment.buf, generation, rings, private_keys)
+            except BaseException:
+                _unlink_segment(segment)
+                segment.close()
+                raise
+            _CONTROL.pack_into(
+                self.__control.buf,
+                0,
+                _CONTROL_MAGIC,
+                LAYOUT_VERSION,
+                generation,
+                generation,
+            )
+            # Readers still attaching to the previous snapshot retry with this one
+            if self.__published is not None:
+                _unlink_segment(self.__published)
+                self.__published.close()
+            self.__published = segment
+        return generation
+
+    @staticmethod
+    def __write(buffer: memoryview, generation: int, rings: list, private_keys: bool):
+        _HEADER.pack_into(
+            buffer, 0, _HEADER_MAGIC, LAYOUT_VERSION, len(rings), generation
+        )
+        offset = _HEADER.size
+        first = offset + sum(
+            _RING.size + len(userid) + len(keyring) for (userid, keyring), _ in rings
+        )
+        for (userid, keyring), records in rings:
+            flags = _KEYS_LISTED if private_keys else 0
+            _RING.pack_into(
+                buffer, offset, len(userid), len(keyring), flags, len(records), first
+            )
+            offset += _RING.size
+            for value in (userid, keyring):
+                buffer[offset : offset + len(value)] = value
+                offset += len(value)
+            for header, fields in records:
+                _ENTRY.pack_into(buffer, first, *header)
+                first += _ENTRY.size
+                for value in fields:
+                    buffer[first : first + len(value)] = value
+                    first += len(value)
+
+    def snapshot(self) -> Optional[SharedSnapshot]:
+        """Returns the latest published snapshot, or None before the first."""
+        with self.__lock:
+            missing = None
+            while True:
+                generation = self.generation
+                if generation == 0:
+                    return None
+                if (
+                    self.__snapshot is not None
+                    and self.__snapshot.generation == generation
+                ):
+                    return self.__snapshot
+                try:
+                    segment = _open_segment(f"{self.__name}.{generation}")
+                except FileNotFoundError:
+                    # Replaced while attaching, unless the cache was removed
+                    if missing == generation:
+                        raise
+                    missing = generation
+                    continue
+                # The previous snapshot is unmapped once nothing refers to it or its views
+                self.__snapshot = SharedSnapshot(segment, self.__entry_type)
+                return self.__snapshot
+
+    def listing(
+        self, userid: str, keyring: str
+    ) -> Optional[List["cpydatalib.CertificateEntry"]]:
+        """Returns the entries of a keyring from the latest snapshot, or None."""
+        snapshot = self.snapshot()
+        return None if snapshot is None else snapshot.listing(userid, keyring)
+
+    def certificate(self, userid: str, keyring: str, label: str) -> Optional[dict]:
+        """Returns a certificate of a keyring from the latest snapshot, or None."""
+        snapshot = self.snapshot()
+        return (
+            None if snapshot is None else snapshot.certificate(userid, keyring, label)
+        )
+
+    def close(self) -> None:
+        """Releases this process's mappings. Views handed out stay valid."""
+        with self.__lock:
+            self.__snapshot = None
+            if self.__published is not None:
+                self.__published.close()
+            self.__control.close()
+
+    def unlink(self) -> None:
+        """Removes the cache's segments. Processes attached to them keep their mappings."""
+        if self.__owner != os.getpid():
+            raise ValueError("Only the process that created the cache can remove it")
+        with self.__lock:
+            if self.__published is not None:
+                _unlink_segment(self.__published)
+                self.__published = None
+            _unlink_segment(self.__control)
@@ -0,0 +1,121 @@
+"""Certificate bodies spilled to a temporary file once a listing exceeds its memory budget."""
+
+import mmap
+import tempfile
+import threading
+from typing import TYPE_CHECKING, Callable, Optional
+
+if TYPE_CHECKING:
+    import cpydatalib
+
+
+class SpillFile:
+    """
+    Temporary file the bodies of one listing are appended to. It is memory-mapped on first
+    read and closed once the listing and every body taken from it are released.
+    """
+
+    def __init__(self) -> None:
+        self.__file = tempfile.TemporaryFile(prefix="pydatalib-spill-")
+        self.__size = 0
+        self.__map: Optional[mmap.mmap] = None
+        self.__lock = threading.Lock()
+
+    @property
+    def size(self) -> int:
+        return self.__size
+
+    def append(self, data: bytes) -> int:
+        """Writes data at the end of the file and returns its offset."""
+        with self.__lock:
+            if self.__map is not None:
+                raise ValueError("Spill file is already mapped")
+            offset = self.__size
+            self.__file.write(data)
+            self.__size += len(data)
+            return offset
+
+    def view(self, offset: int, length: int) -> memoryview:
+        """Returns a read-only view of length bytes at offset, without copying them."""
+        with self.__lock:
+            if self.__map is None:
+                self.__file.flush()
+                self.__map = mmap.mmap(
+                    self.__file.fileno(), self.__size, access=mmap.ACCESS_READ
+                )
+        return memoryview(self.__map)[offset : offset + length]
+
+
+class SpilledCertificate:
+    """
+    Lazily loaded certificate body held in a SpillFile. Nothing is read until the body is
+    accessed: view() maps it without copying, bytes() copies the DER and read() returns the
+    DER, or its encoded form when the listing was made with an encoder.
+    """
+
+    __slots__ = ("__spill", "__offset", "__length", "__encoder")
+
+    def __init__(
+        self,
+        spill: SpillFile,
+        offset: int,
+        length: int,
+        encoder: Optional[Callable] = None,
+    ) -> None:
+        self.__spill = spill
+        self.__offset = offset
+        self.__length = length
+        self.__encoder = encoder
+
+    def __len__(self) -> int:
+        return self.__length
+
+    def __bytes__(self) -> bytes:
+        return self.view().tobytes()
+
+    def __repr__(self) -> str:
+        return f"SpilledCertificate(offset={self.__offset}, length={self.__length})"
+
+    def view(self) -> memoryview:
+        """Returns a read-only, memory-mapped view of the DER certificate."""
+        return self.__spill.view(self.__offset, self.__length)
+
+    def read(self):
+        """Returns the DER certificate, or encoder(der) when the body has an encoder."""
+        der = bytes(self)
+        return der if self.__encoder is None else self.__encoder(der)
+
+
+class BodyBudget:
+    """
+    Keeps certificate bodies of a listing in memory until they add up to memory_budget
+    bytes, counting encoded forms when there is an encoder, and spills the rest.
+    """
+
+    def __init__(self, memory_budget: int, encoder: Optional[Callable] = None) -> None:
+        if memory_budget < 0:
+            raise ValueError("memory_budget must not be negative")
+        self.__remaining = memory_budget
+        self.__encoder = encoder
+        self.__spill: Optional[SpillFile] = None
+        self.spilled = 0
+
+    def admit(
+        self, entry: "cpydatalib.CertificateEntry"
+    ) -> "cpydatalib.CertificateEntry":
+        """Returns entry, or a copy of it whose body was spilled when it exceeds the budget."""
+        der = entry.der
+        if der is None:
+            return entry
+        # A base 64 encoded body is cached next to the DER once read
+        cost = len(der) if self.__encoder is None else len(der) * 7 // 3
+        if cost <= self.__remaining:
+            self.__remaining -= cost
+            return entry
+        if self.__spill is None:
+            self.__spill = SpillFile()
+        self.spilled += 1
+        offset = self.__spill.append(der)
+        return entry.with_certificate(
+            SpilledCertificate(self.__spill, offset, len(der), self.__encoder)
+        )
@@ -0,0 +1,185 @@
+"""ssl.SSLContext objects built from keyring contents in memory."""
+
+import os
+import shutil
+import ssl
+import tempfile
+import threading
+import time
+from typing import Callable, Dict, Iterable, Optional, Tuple
+
+from .certificate_details import private_key_format
+from .datalib_logger import logger
+
+
+class SslContextCache:
+    """
+    SSL contexts by (userid, keyring, label, server_side), each with the snapshot of the
+    keyring it was built from. Concurrent callers wait for one build per context, while
+    contexts of other keyrings are served and built meanwhile.
+    """
+
+    def __init__(self) -> None:
+        self.__contexts: Dict[tuple, Tuple[tuple, float, ssl.SSLContext]] = {}
+        # Guards the contexts, build locks and write counts, never held across RACF calls
+        self.__lock = threading.Lock()
+        self.__builds: Dict[tuple, threading.Lock] = {}
+        # Writes reported for each (userid, keyring)
+        self.__writes: Dict[Tuple[str, str], int] = {}
+
+    def get(
+        self,
+        key: tuple,
+        max_age: float,
+        snapshot: Callable[[], tuple],
+        build: Callable[[], ssl.SSLContext],
+    ) -> ssl.SSLContext:
+        """
+        Returns the context cached for key. Once it is max_age seconds old, it is kept if
+        snapshot() still returns the snapshot it was built from, and replaced by build()
+        otherwise.
+        """
+        ring = key[:2]
+        with self.__lock:
+            cached = self.__contexts.get(key)
+            if cached is not None and time.monotonic() - cached[1] < max_age:
+                return cached[2]
+            build_lock = self.__builds.setdefault(key, threading.Lock())
+        with build_lock:
+            with self.__lock:
+                # Another caller may have built it while this one waited
+                cached = self.__contexts.get(key)
+                now = time.monotonic()
+                if cached is not None and now - cached[1] < max_age:
+                    return cached[2]
+                writes = self.__writes.get(ring, 0)
+            current = snapshot()
+            if cached is not None and cached[0] == current:
+                context = cached[2]
+            else:
+                logger.debug("Building SSL context from %s/%s", *ring)
+                context = build()
+            with self.__lock:
+                # A context read before a write to the keyring finished is not kept
+                if self.__writes.get(ring, 0) == writes:
+                    self.__contexts[key] = (current, now, context)
+            return context
+
+    def invalidate(self, userid: str, keyring: str) -> None:
+        """Drops the contexts of a keyring that was written to."""
+        with self.__lock:
+            self.__writes[(userid, keyring)] = (
+                self.__writes.get((userid, keyring), 0) + 1
+            )
+            for key in list(self.__contexts):
+                if key[:2] == (userid, keyring):
+                    del self.__contexts[key]
+
+
+def build_ssl_context(
+    pem_bundle: Callable[..., bytes],
+    server_side: bool,
+    certificate: Optional[bytes] = None,
+    private_key: Optional[bytes] = None,
+    chain: Iterable[bytes] = (),
+    cadata: Optional[bytes] = None,
+) -> ssl.SSLContext:
+    """
+    Returns a server or client context presenting certificate, followed by the chain of
+    intermediate CA certificates, with its DER private key, and trusting the concatenated
+    DER CA certificates in cadata. pem_bundle is the backend's pemBundle().
+    """
+    context = ssl.SSLContext(
+        ssl.PROTOCOL_TLS_SERVER if server_side else ssl.PROTOCOL_TLS_CLIENT
+    )
+    if certificate is not None:
+        if not private_key:
+            raise ValueError("The certificate has no private key on the keyring")
+        _load_cert_chain(
+            context,
+            pem_bundle((certificate, *chain)),
+            pem_bundle((private_key,), private_key_format(private_key)),
+        )
+    if cadata:
+        context.load_verify_locations(cadata=cadata)
+    return context
+
+
+def _load_cert_chain(context: ssl.SSLContext, chain: bytes, key: bytes) -> None:
+    """
+    Loads a PEM certificate chain and private key. ssl only reads these from paths, so they
+    are passed through an anonymous memory file on Linux. Elsewhere, z/OS included, the
+    paths are named pipes in a private temporary directory that a thread feeds while ssl
+    reads them, so the key never reaches a file system. Only a platform with neither, such
+    as Windows, falls back to a file that only the owner can read, removed once loaded.
+    """
+    if hasattr(os, "memfd_create"):
+        descriptor = os.memfd_create("pydatalib-tls", os.MFD_CLOEXEC)
+        try:
+            _write_all(descriptor, key + chain)
+            context.load_cert_chain(f"/proc/self/fd/{descriptor}")
+        finally:
+            os.close(descriptor)
+        return
+    directory = tempfile.mkdtemp(prefix="pydatalib-tls-")
+    try:
+        if hasattr(os, "mkfifo"):
+            _load_through_pipes(
+                context,
+                (os.path.join(directory, "chain.pem"), chain),
+                (os.path.join(directory, "key.pem"), key),
+            )
+            return
+        logger.warning(
+            "No memory files or named pipes here, the TLS key goes to a file"
+        )
+        path = os.path.join(directory, "chain.pem")
+        descriptor = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        try:
+            _write_all(descriptor, key + chain)
+        finally:
+            os.close(descriptor)
+        context.load_cert_chain(path)
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def _load_through_pipes(context: ssl.SSLContext, *pipes: Tuple[str, bytes]) -> None:
+    """
+    Loads the certificate chain and the private key from pipes, (path, data) pairs in the
+    order ssl opens them. Each pipe is fed exactly once.
+    """
+    for path, _ in pipes:
+        os.mkfifo(path, 0o600)
+    done = threading.Event()
+
+    def feed() -> None:
+        for path, data in pipes:
+            if done.is_set():
+                return
+            # Waits until ssl opens the pipe for reading
+            descriptor = os.open(path, os.O_WRONLY)
+            try:
+                _write_all(descriptor, data)
+            except BrokenPipeError:
+                pass
+            finally:
+                os.close(descriptor)
+
+    feeder = threading.Thread(target=feed, name="pydatalib-tls-feeder", daemon=True)
+    feeder.start()
+    try:
+        context.load_cert_chain(pipes[0][0], pipes[1][0])
+    finally:
+        done.set()
+        # When ssl gave up early the feeder waits for a reader, so open a pipe for it
+        while feeder.is_alive():
+            for path, _ in pipes:
+                os.close(os.open(path, os.O_RDONLY | os.O_NONBLOCK))
+            feeder.join(0.01)
+
+
+def _write_all(descriptor: int, data: bytes) -> None:
+    view = memoryview(data)
+    while view:
+        view = view[os.write(descriptor, view) :]
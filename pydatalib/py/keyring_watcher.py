@@ -0,0 +1,254 @@
+"""Keyring change detection by cheap, adaptively backed-off polling."""
+
+import asyncio
+import heapq
+import itertools
+import random
+import threading
+import time
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional
+
+from .datalib_logger import logger
+from .datalib_service_error import DatalibServiceError
+
+if TYPE_CHECKING:
+    import cpydatalib
+
+# GETFIRST on a keyring without certificates reports "no certificate found"
+_EMPTY_KEYRING = (8, 8, 44)
+
+
+class KeyringEvent(NamedTuple):
+    """A difference between two polls of a keyring."""
+
+    kind: str
+    userid: str
+    keyring: str
+    label: str
+    entry: Optional["cpydatalib.CertificateEntry"]
+
+
+class KeyringWatch:
+    """
+    A keyring polled by a KeyringWatcher. Events are passed to callbacks on the watcher
+    thread and to every `async for event in watch` loop.
+    """
+
+    def __init__(
+        self,
+        userid: str,
+        keyring: str,
+        interval: float,
+        max_interval: float,
+        callback: Optional[Callable[[List[KeyringEvent]], None]] = None,
+    ) -> None:
+        self.userid = userid
+        self.keyring = keyring
+        self.base_interval = interval
+        self.max_interval = max_interval
+        self.interval = interval
+        self.polls = 0
+        self.changes = 0
+        self.digests: Optional[Dict[str, int]] = None
+        # (None, callback) for callbacks and (loop, queue) for async loops, None once stopped
+        self.__listeners: Optional[list] = [(None, callback)] if callback else []
+        self.__lock = threading.Lock()
+
+    @property
+    def stopped(self) -> bool:
+        """Whether the watch was stopped."""
+        return self.__listeners is None
+
+    def add_callback(self, callback: Callable[[List[KeyringEvent]], None]) -> None:
+        """Registers another callback for this keyring's events."""
+        with self.__lock:
+            if self.__listeners is not None:
+                self.__listeners.append((None, callback))
+
+    def stop(self) -> None:
+        """Stops polling this keyring and ends any async iteration over its events."""
+        with self.__lock:
+            if self.__listeners is None:
+                return
+            listeners, self.__listeners = self.__listeners, None
+        for loop, queue in listeners:
+            if loop is not None:
+                loop.call_soon_threadsafe(queue.put_nowait, None)
+
+    async def events(self):
+        """Yields events as they are detected until the watch is stopped."""
+        subscriber = (asyncio.get_running_loop(), asyncio.Queue())
+        with self.__lock:
+            if self.__listeners is None:
+                return
+            self.__listeners.append(subscriber)
+        try:
+            while True:
+                event = await subscriber[1].get()
+                if event is None:
+                    return
+                yield event
+        finally:
+            with self.__lock:
+                if self.__listeners is not None:
+                    self.__listeners.remove(subscriber)
+
+    def __aiter__(self):
+        return self.events()
+
+    def _deliver(self, events: List[KeyringEvent]) -> None:
+        with self.__lock:
+            listeners = list(self.__listeners or ())
+        for loop, target in listeners:
+            if loop is not None:
+                for event in events:
+                    loop.call_soon_threadsafe(target.put_nowait, event)
+                continue
+            try:
+                target(events)
+            except Exception:  # pylint: disable=broad-exception-caught
+                logger.exception(
+                    "Keyring watch callback failed for %s/%s", self.userid, self.keyring
+                )
+
+
+class KeyringWatcher:
+    """
+    Polls any number of keyrings from one background thread. Each poll is a listing without
+    certificate bodies compared by entry digest. A keyring that did not change is polled less
+    often, up to its max_interval, and returns to its base interval as soon as it changes.
+    A poll that fails is logged and backed off the same way, and the keyring stays watched.
+    """
+
+    def __init__(self, cert_admin, backoff: float = 2.0, jitter: float = 0.1) -> None:
+        self.__cert_admin = cert_admin
+        self.__backoff = backoff
+        self.__jitter = jitter
+        self.__schedule = []
+        self.__sequence = itertools.count()
+        self.__condition = threading.Condition()
+        self.__thread: Optional[threading.Thread] = None
+        self.__stopped = False
+
+    def watch(
+        self,
+        userid: str,
+        keyring: str,
+        interval: float = 30.0,
+        max_interval: Optional[float] = None,
+        callback: Optional[Callable[[List[KeyringEvent]], None]] = None,
+    ) -> KeyringWatch:
+        """Starts polling a keyring. The first poll records a baseline and emits no events."""
+        if max_interval is None:
+            max_interval = interval * 16
+        watch = KeyringWatch(userid, keyring, interval, max_interval, callback)
+        with self.__condition:
+            if self.__stopped:
+                raise RuntimeError("KeyringWatcher has been stopped")
+            # Spread the baseline polls of many keyrings over the first interval
+            self.__push(watch, random.uniform(0, interval * self.__jitter))
+            if self.__thread is None:
+                self.__thread = threading.Thread(
+                    target=self.__run, name="pydatalib-keyring-watcher", daemon=True
+                )
+                self.__thread.start()
+        return watch
+
+    def stop(self) -> None:
+        """Stops every watch and the polling thread."""
+        with self.__condition:
+            self.__stopped = True
+            watches = [item[2] for item in self.__schedule]
+            self.__schedule.clear()
+            self.__condition.notify_all()
+        for watch in watches:
+            watch.stop()
+
+    def poll(self, watch: KeyringWatch) -> List[KeyringEvent]:
+        """Polls a keyring once, updating its interval and delivering any events."""
+        try:
+            listing = self.__cert_admin.list_keyring(
+                userid=watch.userid, keyring=watch.keyring, bodies=False
+            )
+        except DatalibServiceError as error:
+            codes = error.return_codes
+            if (
+                codes["safReturnCode"],
+                codes["racfReturnCode"],
+                codes["racfReasonCode"],
+            ) != _EMPTY_KEYRING:
+                logger.warning(
+                    "Polling %s/%s failed: %s", watch.userid, watch.keyring, error
+                )
+                watch.interval = min(
+                    watch.interval * self.__backoff, watch.max_interval
+                )
+                return []
+            listing = []
+        watch.polls += 1
+        entries = {entry.label: entry for entry in listing}
+        previous = watch.digests
+        watch.digests = {label: entry.digest for label, entry in entries.items()}
+        if previous is None:
+            return []
+
+        events = [
+            KeyringEvent(
+                "added" if label not in previous else "changed",
+                watch.userid,
+                watch.keyring,
+                label,
+                entry,
+            )
+            for label, entry in entries.items()
+            if previous.get(label) != entry.digest
+        ]
+        events.extend(
+            KeyringEvent("removed", watch.userid, watch.keyring, label, None)
+            for label in previous
+            if label not in entries
+        )
+        if not events:
+            watch.interval = min(watch.interval * self.__backoff, watch.max_interval)
+            return []
+        watch.interval = watch.base_interval
+        watch.changes += 1
+        watch._deliver(events)
+        return events
+
+    def __push(self, watch: KeyringWatch, delay: float) -> None:
+        heapq.heappush(
+            self.__schedule, (time.monotonic() + delay, next(self.__sequence), watch)
+        )
+        self.__condition.notify()
+
+    def __run(self) -> None:
+        while True:
+            with self.__condition:
+                while not self.__stopped and (
+                    not self.__schedule or self.__schedule[0][0] > time.monotonic()
+                ):
+                    timeout = (
+                        self.__schedule[0][0] - time.monotonic()
+                        if self.__schedule
+                        else None
+                    )
+                    self.__condition.wait(timeout)
+                if self.__stopped:
+                    return
+                _, _, watch = heapq.heappop(self.__schedule)
+            if watch.stopped:
+                # Stopped watches leave the schedule when they come due
+                continue
+            try:
+                self.poll(watch)
+            except Exception:  # pylint: disable=broad-exception-caught
+                # One bad keyring or backend bug must not end the thread every watch runs on
+                logger.exception("Polling %s/%s failed", watch.userid, watch.keyring)
+                watch.interval = min(
+                    watch.interval * self.__backoff, watch.max_interval
+                )
+            with self.__condition:
+                if not watch.stopped and not self.__stopped:
+                    jitter = random.uniform(-self.__jitter, self.__jitter)
+                    self.__push(watch, watch.interval * (1 + jitter))
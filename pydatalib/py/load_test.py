@@ -0,0 +1,378 @@
+"""Load generator driving mixes of CertAdmin calls against a LocalBackend with injected latency."""
+
+import argparse
+import asyncio
+import csv
+import json
+import random
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from .cert_admin import CertAdmin
+from .local_backend import LocalBackend
+
+MODES = ("threads", "processes", "asyncio")
+
+USERID = "LOADTEST"
+KEYRING = "LoadRing"
+
+# Distinct labels each worker puts to, so the keyring stays the same size however long it runs
+_PUT_LABELS = 8
+
+
+class Sample(NamedTuple):
+    """One call: when it finished, in seconds since the test started, and how long it took."""
+
+    time: float
+    operation: str
+    latency: float
+    ok: bool
+
+
+class IntervalStats(NamedTuple):
+    """Calls of one operation, or of all as "all", finishing in one interval. Latency in ms."""
+
+    start: float
+    operation: str
+    count: int
+    errors: int
+    throughput: float
+    p50: float
+    p95: float
+    p99: float
+
+    @property
+    def error_rate(self) -> float:
+        return self.errors / self.count if self.count else 0.0
+
+
+class LoadReport(NamedTuple):
+    """Result of run_load_test(): statistics per interval and over the whole run."""
+
+    mode: str
+    concurrency: int
+    duration: float
+    mix: Dict[str, float]
+    intervals: List[IntervalStats]
+    totals: List[IntervalStats]
+
+    def to_json(self, path: str) -> None:
+        """Writes the report, with every interval and the totals, as one JSON document."""
+        document = {
+            "mode": self.mode,
+            "concurrency": self.concurrency,
+            "duration": self.duration,
+            "mix": self.mix,
+            "intervals": [_row(stats) for stats in self.intervals],
+            "totals": [_row(stats) for stats in self.totals],
+        }
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(document, file, indent=2)
+
+    def to_csv(self, path: str) -> None:
+        """Writes one row per interval and operation, followed by the totals as interval -1."""
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            writer = csv.DictWriter(file, fieldnames=list(_row(self.totals[0])))
+            writer.writeheader()
+            writer.writerows(_row(stats) for stats in self.intervals)
+            writer.writerows(_row(stats._replace(start=-1.0)) for stats in self.totals)
+
+
+class _WorkloadOptions(NamedTuple):
+    latency: float = 0.002
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    certificates: int = 100
+    certificate_size: int = 1200
+    page_size: int = 20
+    admin_options: Optional[dict] = None
+    seed: int = 0
+
+
+class _Workload:
+    """The calls of a load test, bound to one CertAdmin and LocalBackend."""
+
+    def __init__(self, config: dict) -> None:
+        self.config = config
+        self.backend = LocalBackend(
+            latency=config["latency"],
+            jitter=config["jitter"],
+            error_rate=config["error_rate"],
+            seed=config["seed"],
+        )
+        self.certificate = random.Random(config["seed"]).randbytes(
+            config["certificate_size"]
+        )
+        self.labels = [f"LOAD{index}" for index in range(config["certificates"])]
+        codepage = config["admin_options"].get("codepage", "cp1047")
+        self.backend.add_ring(
+            USERID.encode(codepage),
+            KEYRING.encode(codepage),
+            [(label.encode(codepage), self.certificate) for label in self.labels],
+        )
+        self.admin = CertAdmin(backend=self.backend, **config["admin_options"])
+        self.operations = list(config["mix"])
+        self.weights = [config["mix"][operation] for operation in self.operations]
+
+    def call(self, operation: str, worker: int, sequence: int) -> None:
+        if operation == "extract":
+            label = self.labels[(worker * 7919 + sequence) % len(self.labels)]
+            self.admin.extract_certificate(USERID, KEYRING, label)
+        elif operation == "list":
+            self.admin.list_keyring(USERID, KEYRING)
+        elif operation == "page":
+            self.admin.list_keyring(USERID, KEYRING, limit=self.config["page_size"])
+        elif operation == "put":
+            label = f"PUT{worker}.{sequence % _PUT_LABELS}"
+            self.admin.add_certificate(USERID, KEYRING, label, self.certificate, b"")
+
+    def drive(self, worker: int, started: float, deadline: float) -> List[Sample]:
+        """Calls operations drawn from the mix until deadline, a time.time() value."""
+        chooser = random.Random(f"{self.config['seed']}:{worker}")
+        samples = []
+        sequence = 0
+        while time.time() < deadline:
+            operation = chooser.choices(self.operations, self.weights)[0]
+            samples.append(self.measure(operation, worker, sequence, started))
+            sequence += 1
+        return samples
+
+    def measure(
+        self, operation: str, worker: int, sequence: int, started: float
+    ) -> Sample:
+        start = time.perf_counter()
+        try:
+            self.call(operation, worker, sequence)
+            ok = True
+        except Exception:  # pylint: disable=broad-exception-caught
+            ok = False
+        latency = time.perf_counter() - start
+        return Sample(time.time() - started, operation, latency, ok)
+
+
+def run_load_test(
+    mix: Dict[str, float],
+    mode: str = "threads",
+    concurrency: int = 8,
+    duration: float = 10.0,
+    interval: float = 1.0,
+    **workload,
+) -> LoadReport:
+    """
+    Runs concurrency workers for duration seconds, each calling operations drawn from mix, a
+    mapping of extract, list, page and put to relative weights, against a keyring of
+    certificates held by a LocalBackend whose calls take latency seconds plus up to jitter
+    more and fail at error_rate. Workers are threads sharing one CertAdmin, asyncio tasks
+    handing calls to a pool of as many threads, or processes with a CertAdmin and backend
+    each. admin_options are passed on to CertAdmin, e.g. {"reuse_sessions": True}. The
+    options after interval are keywords.
+    """
+    unknown = set(mix) - {"extract", "list", "page", "put"}
+    if unknown or not mix or any(weight < 0 for weight in mix.values()):
+        raise ValueError(
+            "mix must weigh some of extract, list, page and put, none negatively"
+        )
+    if mode not in MODES:
+        raise ValueError(f"mode must be one of {', '.join(MODES)}")
+    config = {"mix": dict(mix), **_WorkloadOptions(**workload)._asdict()}
+    config["admin_options"] = dict(config["admin_options"] or {})
+    if mode == "processes":
+        samples = _run_processes(config, concurrency, duration)
+    else:
+        workload = _Workload(config)
+        started = time.time()
+        if mode == "threads":
+            samples = _run_threads(workload, concurrency, started, started + duration)
+        else:
+            samples = asyncio.run(
+                _run_tasks(workload, concurrency, started, started + duration)
+            )
+    return LoadReport(
+        mode,
+        concurrency,
+        duration,
+        config["mix"],
+        summarize(samples, interval, duration),
+        summarize(samples, duration, duration),
+    )
+
+
+def _run_threads(
+    workload: _Workload, concurrency: int, started: float, deadline: float
+) -> List[Sample]:
+    results: List[List[Sample]] = [[] for _ in range(concurrency)]
+
+    def work(worker: int) -> None:
+        results[worker] = workload.drive(worker, started, deadline)
+
+    threads = [
+        threading.Thread(target=work, args=(worker,), name=f"pydatalib-load-{worker}")
+        for worker in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return [sample for samples in results for sample in samples]
+
+
+async def _run_tasks(
+    workload: _Workload, concurrency: int, started: float, deadline: float
+) -> List[Sample]:
+    loop = asyncio.get_running_loop()
+    executor = ThreadPoolExecutor(concurrency, thread_name_prefix="pydatalib-load")
+
+    async def work(worker: int) -> List[Sample]:
+        chooser = random.Random(f"{workload.config['seed']}:{worker}")
+        samples = []
+        sequence = 0
+        while time.time() < deadline:
+            operation = chooser.choices(workload.operations, workload.weights)[0]
+            start = time.perf_counter()
+            sample = await loop.run_in_executor(
+                executor, workload.measure, operation, worker, sequence, started
+            )
+            # Include the time spent waiting for the event loop to resume the task
+            samples.append(sample._replace(latency=time.perf_counter() - start))
+            sequence += 1
+        return samples
+
+    try:
+        results = await asyncio.gather(*(work(worker) for worker in range(concurrency)))
+    finally:
+        executor.shutdown(wait=True)
+    return [sample for samples in results for sample in samples]
+
+
+def _run_processes(config: dict, concurrency: int, duration: float) -> List[Sample]:
+    # Every process builds its own keyring first, then all start calling at once
+    started = time.time() + 1.0 + 0.05 * concurrency
+    with ProcessPoolExecutor(concurrency) as executor:
+        futures = [
+            executor.submit(_process_worker, config, worker, started, duration)
+            for worker in range(concurrency)
+        ]
+        return [sample for future in futures for sample in future.result()]
+
+
+def _process_worker(
+    config: dict, worker: int, started: float, duration: float
+) -> List[Sample]:
+    workload = _Workload(config)
+    time.sleep(max(0.0, started - time.time()))
+    return workload.drive(worker, started, started + duration)
+
+
+def summarize(
+    samples: Iterable[Sample], interval: float, duration: float
+) -> List[IntervalStats]:
+    """
+    Groups samples by the interval they finished in, and within it by operation, with one
+    more group of all operations per interval. Throughput is in calls per second.
+    """
+    groups: Dict[tuple, List[Sample]] = {}
+    for sample in samples:
+        index = min(int(sample.time // interval), max(int(duration / interval) - 1, 0))
+        groups.setdefault((index, "all"), []).append(sample)
+        groups.setdefault((index, sample.operation), []).append(sample)
+    stats = []
+    for (index, operation), group in sorted(
+        groups.items(), key=lambda item: (item[0][0], item[0][1] != "all", item[0][1])
+    ):
+        start = index * interval
+        length = min(interval, duration - start) if duration > start else interval
+        latencies = sorted(sample.latency for sample in group)
+        stats.append(
+            IntervalStats(
+                start,
+                operation,
+                len(group),
+                sum(1 for sample in group if not sample.ok),
+                len(group) / length,
+                *(_percentile(latencies, rank) * 1000 for rank in (50, 95, 99)),
+            )
+        )
+    return stats
+
+
+def _percentile(ordered: List[float], rank: float) -> float:
+    """Nearest-rank percentile of sorted values."""
+    index = max(0, min(len(ordered) - 1, -(-len(ordered) * rank // 100) - 1))
+    return ordered[int(index)]
+
+
+def _row(stats: IntervalStats) -> dict:
+    row = stats._asdict()
+    row["error_rate"] = stats.error_rate
+    return row
+
+
+def _parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        operation, _, weight = part.partition("=")
+        mix[operation.strip()] = float(weight) if weight else 1.0
+    return mix
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    """Command line entry point: pydatalib-loadtest --help."""
+    parser = argparse.ArgumentParser(
+        prog="pydatalib-loadtest",
+        description="Drive a mix of CertAdmin calls against an in-memory stand-in backend.",
+    )
+    parser.add_argument(
+        "--mix",
+        default="extract=70,list=10,page=10,put=10",
+        help="operations and relative weights, e.g. extract=80,put=20",
+    )
+    parser.add_argument("--mode", choices=MODES, default="threads")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--interval", type=float, default=1.0, help="seconds")
+    parser.add_argument("--latency", type=float, default=2.0, help="ms per call")
+    parser.add_argument("--jitter", type=float, default=0.0, help="ms of extra latency")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--certificates", type=int, default=100)
+    parser.add_argument("--reuse-sessions", action="store_true")
+    parser.add_argument("--json", help="write the report to this JSON file")
+    parser.add_argument("--csv", help="write the report to this CSV file")
+    arguments = parser.parse_args(argv)
+
+    report = run_load_test(
+        _parse_mix(arguments.mix),
+        mode=arguments.mode,
+        concurrency=arguments.concurrency,
+        duration=arguments.duration,
+        interval=arguments.interval,
+        latency=arguments.latency / 1000,
+        jitter=arguments.jitter / 1000,
+        error_rate=arguments.error_rate,
+        certificates=arguments.certificates,
+        admin_options={"reuse_sessions": arguments.reuse_sessions},
+    )
+    print(
+        f"{'start':>6} {'operation':<9} {'calls':>7} {'calls/s':>9} {'errors':>7} "
+        + f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+    )
+    for stats in report.intervals:
+        _print_stats(f"{stats.start:.0f}s", stats)
+    for stats in report.totals:
+        _print_stats("total", stats)
+    if arguments.json:
+        report.to_json(arguments.json)
+    if arguments.csv:
+        report.to_csv(arguments.csv)
+
+
+def _print_stats(start: str, stats: IntervalStats) -> None:
+    print(
+        f"{start:>6} {stats.operation:<9} {stats.count:>7} {stats.throughput:>9.1f} "
+        + f"{stats.error_rate:>7.1%} {stats.p50:>8.2f} {stats.p95:>8.2f} {stats.p99:>8.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,614 @@
+"""In-memory stand-in for cpydatalib with injected latency, for load tests off z/OS."""
+
+import array
+import base64
+import hashlib
+import random
+import re
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from .keyring_operations import (
+    DATAPUT,
+    DATAREMOVE,
+    DELRING,
+    NEWRING,
+    OPERATION_FUNCTIONS,
+    REFRESH,
+)
+
+GETCERT = 1
+GETNEXT = 2
+
+# R_datalib usage codes DataPut takes, by the name listings report
+USAGE_NAMES = {0x08: "PERSONAL", 0x02: "CERTAUTH"}
+
+# Reason codes the stand-in fails with: bad keyring or userid, no further certificate,
+# keyring full, and the internal error returned for injected failures
+_BAD_RING = 28
+_NOT_FOUND = 44
+_RING_FULL = 92
+_INJECTED = 12
+
+_FIELD_NAMES = ("label", "owner", "usage", "status", "default", "certificate")
+
+_PEM_LINE_LEN = 64
+_PEM_BLOCK = re.compile(rb"-----BEGIN ([ -,.-~]{1,64})-----(.*?)-----END \1-----", re.S)
+
+
+class _EntryFields(NamedTuple):
+    label: bytes
+    owner: bytes
+    usage: str
+    status: str
+    default: int
+    der: Optional[bytes]
+    private_key: Optional[bytes]
+    record_id: Optional[bytes]
+
+
+class CertificateEntry:
+    """
+    Pure-Python counterpart of cpydatalib.CertificateEntry, taking the same arguments and
+    offering the same attributes and mapping access. Digests are computed differently, so
+    they only compare equal to digests of entries from the same backend.
+    """
+
+    __slots__ = ("__fields", "__codepage", "__encoder", "__digest", "__texts")
+
+    # Mirrors the arguments of cpydatalib.CertificateEntry(), positional ones included
+    def __init__(  # pylint: disable=too-many-arguments
+        self,
+        label: bytes,
+        owner: bytes,
+        usage: str,
+        status: str,
+        default: int,
+        certificate: Optional[bytes],
+        codepage: Optional[str] = None,
+        encoder: Optional[Callable] = None,
+        *,
+        private_key: Optional[bytes] = None,
+        record_id: Optional[bytes] = None,
+        digest: Optional[int] = None,
+    ) -> None:
+        if certificate is not None and not isinstance(certificate, bytes):
+            raise TypeError("certificate must be bytes or None")
+        if encoder is not None and not callable(encoder):
+            raise TypeError("encoder must be callable or None")
+        self.__fields = _EntryFields(
+            label,
+            owner,
+            usage,
+            status,
+            int(default),
+            certificate,
+            private_key,
+            record_id,
+        )
+        self.__codepage = codepage
+        self.__encoder = encoder
+        self.__digest = (
+            digest
+            if digest is not None
+            else entry_digest(certificate or b"", usage, status, default)
+        )
+        self.__texts: Dict[str, object] = {}
+
+    @property
+    def label(self):
+        return self.__decoded("label", self.__fields.label)
+
+    @property
+    def owner(self):
+        return self.__decoded("owner", self.__fields.owner)
+
+    @property
+    def usage(self) -> str:
+        return self.__fields.usage
+
+    @property
+    def status(self) -> str:
+        return self.__fields.status
+
+    @property
+    def default(self) -> int:
+        return self.__fields.default
+
+    @property
+    def certificate(self):
+        if self.__encoder is None or not isinstance(self.__fields.der, bytes):
+            return self.__fields.der
+        text = self.__texts.get("certificate")
+        if text is None:
+            text = self.__texts["certificate"] = self.__encoder(self.__fields.der)
+        return text
+
+    @property
+    def der(self):
+        return self.__fields.der
+
+    @property
+    def private_key(self) -> Optional[bytes]:
+        return self.__fields.private_key
+
+    @property
+    def record_id(self) -> Optional[bytes]:
+        return self.__fields.record_id
+
+    @property
+    def digest(self) -> int:
+        return self.__digest
+
+    def keys(self) -> tuple:
+        return _FIELD_NAMES
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in _FIELD_NAMES else default
+
+    def with_certificate(self, certificate) -> "CertificateEntry":
+        entry = CertificateEntry(
+            *self.__fields[:5],
+            None,
+            self.__codepage,
+            self.__encoder,
+            private_key=self.__fields.private_key,
+            record_id=self.__fields.record_id,
+            digest=self.__digest,
+        )
+        entry.__fields = self.__fields._replace(der=certificate)
+        return entry
+
+    def __getitem__(self, key):
+        if key not in _FIELD_NAMES:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __len__(self) -> int:
+        return len(_FIELD_NAMES)
+
+    def __iter__(self):
+        return iter(_FIELD_NAMES)
+
+    def __repr__(self) -> str:
+        return (
+            f"CertificateEntry(label={self.label!r}, owner={self.owner!r}, "
+            f"usage={self.usage!r}, status={self.status!r}, default={self.default})"
+        )
+
+    def __decoded(self, field: str, raw: bytes):
+        if self.__codepage is None:
+            return raw
+        text = self.__texts.get(field)
+        if text is None:
+            text = self.__texts[field] = raw.decode(self.__codepage)
+        return text
+
+
+def entry_digest(certificate, usage: str, status: str, default) -> int:
+    """64-bit digest of certificate, usage, status and default flag."""
+    digest = hashlib.blake2b(certificate, digest_size=8)
+    digest.update(f"\0{usage}\0{status}\0{1 if default else 0}".encode("ascii"))
+    return int.from_bytes(digest.digest(), "little")
+
+
+def pem_encode(data, label: str = "CERTIFICATE") -> str:
+    """Pure-Python counterpart of cpydatalib.pemEncode()."""
+    if not 0 < len(label) <= 64 or not all(" " <= c <= "~" and c != "-" for c in label):
+        raise ValueError(
+            "label must be 1 to 64 printable ASCII characters without hyphens"
+        )
+    text = base64.b64encode(data).decode("ascii")
+    lines = "".join(
+        text[start : start + _PEM_LINE_LEN] + "\n"
+        for start in range(0, len(text), _PEM_LINE_LEN)
+    )
+    return f"-----BEGIN {label}-----\n{lines}-----END {label}-----\n"
+
+
+def pem_bundle(items: Iterable, label: str = "CERTIFICATE") -> bytes:
+    """Pure-Python counterpart of cpydatalib.pemBundle()."""
+    return "".join(
+        pem_encode(
+            item if isinstance(item, (bytes, bytearray, memoryview)) else item.der,
+            label,
+        )
+        for item in items
+    ).encode("ascii")
+
+
+def pem_decode(data) -> List[Tuple[str, bytes]]:
+    """Pure-Python counterpart of cpydatalib.pemDecode()."""
+    data = data.encode("ascii") if isinstance(data, str) else bytes(data)
+    blocks = []
+    position = data.find(b"-----BEGIN ")
+    while position >= 0:
+        match = _PEM_BLOCK.match(data, position)
+        if match is None:
+            raise ValueError("PEM block has no matching END line")
+        label, body = match.groups()
+        blocks.append(
+            (
+                label.decode("ascii"),
+                base64.b64decode(b"".join(body.split()), validate=True),
+            )
+        )
+        position = data.find(b"-----BEGIN ", match.end())
+    return blocks
+
+
+class _Stored(NamedTuple):
+    owner: bytes
+    usage: str
+    default: bool
+    certificate: bytes
+    private_key: bytes
+
+
+class _PutOptions(NamedTuple):
+    """Keywords cpydatalib.dataPut() takes after the private key."""
+
+    usage: int = 0
+    default: bool = False
+    owner: Optional[bytes] = None
+
+
+def _failure(function_code: int, reason_code: int) -> dict:
+    return {
+        "functionCode": function_code,
+        "safReturnCode": 8,
+        "racfReturnCode": 8,
+        "racfReasonCode": reason_code,
+    }
+
+
+class LocalBackend:
+    """
+    Implements the cpydatalib calls CertAdmin makes against keyrings held in memory, so
+    CertAdmin(backend=LocalBackend(...)) runs anywhere. Every call sleeps for latency seconds
+    plus up to jitter more, standing in for the round trip to IRRSDL64, and fails with
+    R_datalib reason code 12 at error_rate. Return values and error dictionaries match
+    cpydatalib's; the lock serializing keyring access is not held while sleeping.
+    Entries and PEM helpers are the pure-Python ones of this module, so cpydatalib is not
+    needed.
+    """
+
+    CertificateEntry = CertificateEntry
+    pemEncode = staticmethod(pem_encode)
+    pemBundle = staticmethod(pem_bundle)
+    pemDecode = staticmethod(pem_decode)
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        jitter: float = 0.0,
+        error_rate: float = 0.0,
+        max_certificates: int = 20000,
+        seed: Optional[int] = None,
+    ) -> None:
+        if latency < 0 or jitter < 0 or not 0 <= error_rate <= 1:
+            raise ValueError(
+                "latency and jitter must not be negative, error_rate must be within 0 and 1"
+            )
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.__max_certificates = max_certificates
+        self.__random = random.Random(seed)
+        self.__rings: Dict[Tuple[bytes, bytes], Dict[bytes, _Stored]] = {}
+        self.__lock = threading.Lock()
+        self.calls = 0
+
+    def add_ring(
+        self,
+        userid: bytes,
+        keyring: bytes,
+        certificates: Optional[List[Tuple[bytes, bytes]]] = None,
+    ) -> None:
+        """Creates or empties a keyring, filled with (label, certificate) pairs, without delay."""
+        with self.__lock:
+            self.__rings[(userid, keyring)] = {
+                label: _Stored(userid, "PERSONAL", False, certificate, b"")
+                for label, certificate in certificates or ()
+            }
+
+    def getData(
+        self,
+        userid: bytes = b"",
+        keyring: bytes = b"",
+        label: Optional[bytes] = None,
+        *,
+        interner: Optional[Callable] = None,
+        default: bool = False,
+    ) -> dict:
+        if (label is None) != bool(default):
+            raise TypeError("label is required unless default=True")
+        failure = self.__enter(GETCERT)
+        if failure is not None:
+            return failure
+        with self.__lock:
+            ring = self.__rings.get((userid, keyring))
+            if ring is None:
+                return _failure(GETCERT, _BAD_RING)
+            if default:
+                label = next((key for key, item in ring.items() if item.default), None)
+            stored = ring.get(label)
+        if stored is None:
+            return _failure(GETCERT, _NOT_FOUND)
+        # The stand-in uses labels as record IDs
+        return {
+            "certificate": _intern(interner, stored.certificate),
+            "privateKey": stored.private_key,
+            "label": label,
+            "recordId": label,
+        }
+
+    def listKeyring(
+        self,
+        userid: bytes = b"",
+        keyring: bytes = b"",
+        *,
+        codepage=None,
+        encoder: Optional[Callable] = None,
+        bodies: bool = True,
+        interner: Optional[Callable] = None,
+    ):
+        listing = self.Listing(userid, keyring)
+        entries = listing.fetch(
+            self.__max_certificates,
+            codepage=codepage,
+            encoder=encoder,
+            bodies=bodies,
+            interner=interner,
+        )
+        listing.abort()
+        return entries
+
+    def dataPut(
+        self,
+        userid: bytes,
+        keyring: bytes,
+        label: bytes,
+        certificate,
+        private_key,
+        **options,
+    ):
+        usage, default, owner = _PutOptions(**options)
+        failure = self.__enter(DATAPUT)
+        if failure is not None:
+            return failure
+        stored = _Stored(
+            owner if owner is not None else userid,
+            USAGE_NAMES.get(usage, "PERSONAL"),
+            bool(default),
+            bytes(certificate),
+            bytes(private_key),
+        )
+        with self.__lock:
+            ring = self.__rings.get((userid, keyring))
+            if ring is None:
+                return _failure(DATAPUT, _BAD_RING)
+            if label not in ring and len(ring) >= self.__max_certificates:
+                return _failure(DATAPUT, _RING_FULL)
+            if default:
+                for other, entry in ring.items():
+                    if entry.default:
+                        ring[other] = entry._replace(default=False)
+            ring[label] = stored
+        return 0
+
+    def dataRemove(self, userid: bytes = b"", keyring: bytes = b"", label: bytes = b""):
+        failure = self.__enter(DATAREMOVE)
+        if failure is not None:
+            return failure
+        with self.__lock:
+            ring = self.__rings.get((userid, keyring))
+            if ring is None:
+                return _failure(DATAREMOVE, _BAD_RING)
+            if ring.pop(label, None) is None:
+                return _failure(DATAREMOVE, _NOT_FOUND)
+        return 0
+
+    def touchKeyring(
+        self, userid: bytes = b"", keyring: bytes = b"", function_code: int = REFRESH
+    ):
+        if function_code not in (NEWRING, DELRING, REFRESH):
+            raise ValueError(
+                "touchKeyring() function_code must be 7 (NEWRING), 10 (DELRING) or "
+                + f"11 (REFRESH), not {function_code}"
+            )
+        failure = self.__enter(function_code)
+        if failure is not None:
+            return failure
+        with self.__lock:
+            if function_code == NEWRING:
+                self.__rings[(userid, keyring)] = {}
+                return 0
+            if (userid, keyring) not in self.__rings:
+                return _failure(function_code, _BAD_RING)
+            if function_code == DELRING:
+                del self.__rings[(userid, keyring)]
+        return 0
+
+    def execute(self, operations: list, stop_on_error: bool = True) -> array.array:
+        for operation in operations:
+            if operation[0] not in OPERATION_FUNCTIONS:
+                raise ValueError(f"Unsupported function code {operation[0]}")
+        codes = []
+        stopped = False
+        for operation in operations:
+            function_code, userid, keyring, *arguments = operation
+            if stopped:
+                codes.extend((0, 0, 0, 0))
+                continue
+            if function_code == DATAPUT:
+                label, certificate, private_key, usage, default = arguments
+                result = self.dataPut(
+                    userid,
+                    keyring,
+                    label,
+                    certificate,
+                    private_key,
+                    usage=usage,
+                    default=default,
+                )
+            elif function_code == DATAREMOVE:
+                result = self.dataRemove(userid, keyring, arguments[0])
+            else:
+                result = self.touchKeyring(userid, keyring, function_code)
+            if result == 0:
+                codes.extend((function_code, 0, 0, 0))
+            else:
+                codes.extend(
+                    (
+                        function_code,
+                        result["safReturnCode"],
+                        result["racfReturnCode"],
+                        result["racfReasonCode"],
+                    )
+                )
+                stopped = stop_on_error
+        return array.array("i", codes)
+
+    def Session(self, userid: bytes, keyring: bytes) -> "_Session":
+        return _Session(self, userid, keyring)
+
+    def Listing(self, userid: bytes, keyring: bytes) -> "_Listing":
+        return _Listing(self, userid, keyring)
+
+    def _read(self, userid: bytes, keyring: bytes, position: int, count: int):
+        """Returns up to count (label, stored) pairs from position on, or None for no ring."""
+        failure = self.__enter(GETCERT if position == 0 else GETNEXT)
+        if failure is not None:
+            return failure
+        with self.__lock:
+            ring = self.__rings.get((userid, keyring))
+            if ring is None:
+                return None
+            return list(ring.items())[position : position + count]
+
+    def __enter(self, function_code: int) -> Optional[dict]:
+        """Waits out the injected latency and returns an injected failure, if any."""
+        with self.__lock:
+            self.calls += 1
+            delay = self.latency + self.jitter * self.__random.random()
+            failed = self.error_rate and self.__random.random() < self.error_rate
+        if delay:
+            time.sleep(delay)
+        return _failure(function_code, _INJECTED) if failed else None
+
+
+class _Session:
+    """Counterpart of cpydatalib.Session bound to one keyring of a LocalBackend."""
+
+    def __init__(self, backend: LocalBackend, userid: bytes, keyring: bytes) -> None:
+        self.__backend = backend
+        self.userid = userid
+        self.keyring = keyring
+
+    def getData(self, label: Optional[bytes] = None, **kwargs) -> dict:
+        return self.__backend.getData(self.userid, self.keyring, label, **kwargs)
+
+    def listKeyring(self, **kwargs):
+        return self.__backend.listKeyring(self.userid, self.keyring, **kwargs)
+
+    def dataPut(self, label: bytes, certificate, private_key, **kwargs):
+        return self.__backend.dataPut(
+            self.userid, self.keyring, label, certificate, private_key, **kwargs
+        )
+
+    def dataRemove(self, label: bytes):
+        return self.__backend.dataRemove(self.userid, self.keyring, label)
+
+    def touchKeyring(self, function_code: int = REFRESH):
+        return self.__backend.touchKeyring(self.userid, self.keyring, function_code)
+
+
+class _Listing:
+    """Counterpart of cpydatalib.Listing reading a keyring of a LocalBackend."""
+
+    def __init__(self, backend: LocalBackend, userid: bytes, keyring: bytes) -> None:
+        self.__backend = backend
+        self.userid = userid
+        self.keyring = keyring
+        self.position = 0
+        self.finished = False
+
+    def fetch(
+        self,
+        limit: int,
+        *,
+        codepage=None,
+        encoder: Optional[Callable] = None,
+        bodies: bool = True,
+        private_keys: bool = False,
+        interner: Optional[Callable] = None,
+    ):
+        if limit < 1:
+            raise ValueError("limit must be at least 1")
+        if self.finished:
+            return []
+        items = self.__backend._read(self.userid, self.keyring, self.position, limit)
+        if items is None or isinstance(items, dict):
+            self.finished = True
+            return items or _failure(GETCERT, _BAD_RING)
+        self.position += len(items)
+        if len(items) < limit:
+            self.finished = True
+        # Without bodies the digest still reflects the certificate, as R_datalib's does
+        return [
+            CertificateEntry(
+                label,
+                stored.owner,
+                stored.usage,
+                "TRUST",
+                stored.default,
+                _intern(interner, stored.certificate) if bodies else None,
+                codepage,
+                encoder,
+                private_key=stored.private_key if private_keys else None,
+                record_id=label,
+                digest=entry_digest(
+                    stored.certificate, stored.usage, "TRUST", stored.default
+                ),
+            )
+            for label, stored in items
+        ]
+
+    def skip(self, count: int):
+        items = self.__backend._read(self.userid, self.keyring, self.position, count)
+        if items is None or isinstance(items, dict):
+            self.finished = True
+            return items or _failure(GETNEXT, _BAD_RING)
+        self.position += len(items)
+        if len(items) < count:
+            self.finished = True
+        return len(items)
+
+    def seek(self, label: bytes):
+        while not self.finished:
+            items = self.__backend._read(self.userid, self.keyring, self.position, 64)
+            if items is None or isinstance(items, dict):
+                self.finished = True
+                return items or _failure(GETNEXT, _BAD_RING)
+            for index, (item_label, _) in enumerate(items):
+                if item_label == label:
+                    self.position += index + 1
+                    return True
+            self.position += len(items)
+            if len(items) < 64:
+                self.finished = True
+        return False
+
+    def abort(self) -> None:
+        self.finished = True
+
+
+def _intern(interner: Optional[Callable], certificate: bytes) -> bytes:
+    if interner is None:
+        return certificate
+    result = interner(memoryview(certificate))
+    if not isinstance(result, bytes):
+        raise TypeError("interner must return bytes")
+    return result
@@ -0,0 +1,258 @@
+"""Per-keyring serialization of writes, with refreshes merged across queued writers."""
+
+import concurrent.futures
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, TypeVar
+
+from .datalib_logger import logger
+
+T = TypeVar("T")
+
+
+class SchedulerStats(NamedTuple):
+    """Counters of a MutationScheduler. Waits are in seconds."""
+
+    mutations: int
+    refreshes: int
+    merged_refreshes: int
+    queue_depth: int
+    max_queue_depth: int
+    ring_wait: float
+    max_ring_wait: float
+    slot_wait: float
+
+
+class _Ring:
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.owner: Optional[int] = None
+        self.queued = 0
+        self.refresh: Optional[Callable[[], None]] = None
+        # Outcomes of the queued refresh for the refresh-only calls merged into it
+        self.waiters: List[concurrent.futures.Future] = []
+
+
+class _Counters:
+    def __init__(self) -> None:
+        self.mutations = 0
+        self.refreshes = 0
+        self.merged_refreshes = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.ring_wait = 0.0
+        self.max_ring_wait = 0.0
+        self.slot_wait = 0.0
+
+
+class MutationScheduler:
+    """
+    Serializes mutations of each (userid, keyring) and runs mutations of up to max_parallel
+    different keyrings at the same time. A mutation that needs a refresh leaves it to the
+    last writer queued on the same keyring, so a burst of writes is followed by one refresh.
+    A call that only refreshes returns once that refresh ran, raising its error, while a
+    failed refresh merged from other callers is logged rather than raised by the writer
+    that ran it. Deleting a keyring drops the refresh queued on it. A thread that already
+    holds a keyring runs nested mutations of it directly.
+    """
+
+    def __init__(self, max_parallel: int = 8) -> None:
+        self.__slots = threading.BoundedSemaphore(max_parallel)
+        self.__rings = {}
+        self.__mutex = threading.Lock()
+        # Guarded by the mutex
+        self.__counters = _Counters()
+
+    def run(
+        self,
+        userid: str,
+        keyring: str,
+        mutation: Optional[Callable[[], T]],
+        refresh: Optional[Callable[[], None]] = None,
+        deleted: Optional[Callable[[T], bool]] = None,
+    ) -> Optional[T]:
+        """
+        Runs mutation, if any, while holding the keyring. When refresh is given, the keyring
+        is refreshed with it before the last writer queued on the keyring returns. deleted
+        tells from the mutation's result whether it deleted the keyring.
+        """
+        key = (userid, keyring)
+        return self.run_many(
+            (key,),
+            mutation,
+            {key: refresh} if refresh is not None else None,
+            (lambda result: [key] if deleted(result) else []) if deleted else None,
+        )
+
+    def run_many(
+        self,
+        rings: Iterable[Tuple[str, str]],
+        mutation: Optional[Callable[[], T]],
+        refreshes: Optional[Dict[Tuple[str, str], Callable[[], None]]] = None,
+        deleted: Optional[Callable[[T], Iterable[Tuple[str, str]]]] = None,
+    ) -> Optional[T]:
+        """
+        Runs mutation, if any, while holding every (userid, keyring) in rings, as run()
+        does for one. The keyrings are taken in sorted order, so calls over overlapping
+        keyrings cannot deadlock, and together take one slot. refreshes maps keyrings to the
+        refresh queued on each, and deleted returns the keyrings the mutation's result
+        shows it deleted.
+        """
+        thread = threading.get_ident()
+        with self.__mutex:
+            entries = []
+            for key in sorted(set(rings)):
+                ring = self.__rings.get(key)
+                if ring is None:
+                    ring = self.__rings[key] = _Ring()
+                entries.append((key, ring, ring.owner == thread))
+            locked = [(key, ring) for key, ring, nested in entries if not nested]
+            for _, ring in locked:
+                ring.queued += 1
+            counters = self.__counters
+            counters.queued += len(locked)
+            counters.max_queued = max(counters.max_queued, counters.queued)
+        # A thread holding any of the keyrings already holds a slot
+        slotted = len(locked) == len(entries)
+        if not locked:
+            return self.__mutate(entries, mutation, refreshes, deleted, None)
+
+        start = time.monotonic()
+        for _, ring in locked:
+            ring.lock.acquire()
+        acquired = time.monotonic()
+        if slotted:
+            self.__slots.acquire()
+        for _, ring in locked:
+            ring.owner = thread
+        with self.__mutex:
+            counters.mutations += 1
+            counters.ring_wait += acquired - start
+            counters.max_ring_wait = max(counters.max_ring_wait, acquired - start)
+            counters.slot_wait += time.monotonic() - acquired
+        # A refresh-only call merged into a later writer waits for that writer's refresh
+        waiter = concurrent.futures.Future() if mutation is None and refreshes else None
+        failed = True
+        try:
+            result = self.__mutate(entries, mutation, refreshes, deleted, waiter)
+            failed = False
+        finally:
+            pending = self.__leave(locked, refreshes)
+            try:
+                # Only a writer that succeeded and asked for the refresh itself raises
+                _run_refreshes(pending, not failed and waiter is None)
+            finally:
+                for _, ring in locked:
+                    ring.owner = None
+                if slotted:
+                    self.__slots.release()
+                for _, ring in reversed(locked):
+                    ring.lock.release()
+                with self.__mutex:
+                    for key, ring in locked:
+                        if ring.queued == 0 and self.__rings.get(key) is ring:
+                            del self.__rings[key]
+        if waiter is not None:
+            waiter.result()
+        return result
+
+    def __leave(
+        self,
+        locked: list,
+        refreshes: Optional[Dict[Tuple[str, str], Callable[[], None]]],
+    ) -> list:
+        """
+        Takes the caller off the queues of the keyrings it holds and returns the refreshes
+        it has to run as the last writer, each with its waiters and whether it asked for it.
+        """
+        pending = []
+        with self.__mutex:
+            for key, ring in locked:
+                ring.queued -= 1
+                self.__counters.queued -= 1
+                if ring.refresh is None:
+                    continue
+                if ring.queued == 0:
+                    own = refreshes is not None and key in refreshes
+                    pending.append((ring.refresh, ring.waiters, own))
+                    ring.refresh = None
+                    ring.waiters = []
+                    self.__counters.refreshes += 1
+                else:
+                    self.__counters.merged_refreshes += 1
+        return pending
+
+    def __mutate(
+        self,
+        entries: list,
+        mutation: Optional[Callable[[], T]],
+        refreshes: Optional[Dict[Tuple[str, str], Callable[[], None]]],
+        deleted: Optional[Callable[[T], Iterable[Tuple[str, str]]]],
+        waiter: Optional[concurrent.futures.Future],
+    ) -> Optional[T]:
+        """
+        Runs mutation, drops the refreshes queued on keyrings it deleted and queues the
+        refreshes on keyrings held by the calling thread.
+        """
+        result = mutation() if mutation is not None else None
+        gone = set(deleted(result)) if deleted is not None else set()
+        for key, ring, _ in entries:
+            if key in gone and ring.refresh is not None:
+                # Nothing is left to refresh, so the refresh counts as merged into the delete
+                with self.__mutex:
+                    self.__counters.merged_refreshes += 1
+                _settle(ring.waiters, None)
+                ring.refresh = None
+                ring.waiters = []
+            if refreshes and key in refreshes:
+                ring.refresh = refreshes[key]
+                if waiter is not None:
+                    ring.waiters.append(waiter)
+        return result
+
+    def stats(self) -> SchedulerStats:
+        """Returns the scheduler's counters."""
+        with self.__mutex:
+            counters = self.__counters
+            return SchedulerStats(
+                counters.mutations,
+                counters.refreshes,
+                counters.merged_refreshes,
+                counters.queued,
+                counters.max_queued,
+                counters.ring_wait,
+                counters.max_ring_wait,
+                counters.slot_wait,
+            )
+
+
+def _settle(
+    waiters: List[concurrent.futures.Future], error: Optional[BaseException]
+) -> None:
+    for waiter in waiters:
+        if error is None:
+            waiter.set_result(None)
+        else:
+            waiter.set_exception(error)
+
+
+def _run_refreshes(pending: list, raising: bool) -> None:
+    """
+    Makes every refresh and hands its outcome to the calls waiting for it. When raising,
+    the first failure of a refresh the calling thread asked for itself is raised. Other
+    failures nobody waits for are logged.
+    """
+    error = None
+    for refresh, waiters, own in pending:
+        try:
+            refresh()
+        except BaseException as exc:  # pylint: disable=broad-exception-caught
+            _settle(waiters, exc)
+            if raising and own and error is None:
+                error = exc
+            elif not waiters:
+                logger.error("Refreshing a keyring after merged writes failed: %s", exc)
+        else:
+            _settle(waiters, None)
+    if error is not None:
+        raise error
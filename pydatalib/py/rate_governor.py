@@ -0,0 +1,171 @@
+"""Client-side rate limiting and priority scheduling for R_datalib calls."""
+
+import contextlib
+import contextvars
+import heapq
+import itertools
+import threading
+import time
+from typing import Dict, Iterator, NamedTuple, Optional, Tuple
+
+INTERACTIVE = 0
+NORMAL = 1
+BULK = 2
+
+READ = "read"
+WRITE = "write"
+REFRESH = "refresh"
+
+# Rate (calls per second) and burst size of each function class in a default governor
+DEFAULT_RATES = {READ: (50.0, 100.0), WRITE: (10.0, 20.0), REFRESH: (1.0, 2.0)}
+
+_REFRESH_CODE = 0x0B
+
+# Lane a call waits in when the caller did not choose one with call_priority()
+_DEFAULT_PRIORITIES = {"getData": INTERACTIVE, "listKeyring": BULK, "listPage": BULK}
+
+_priority: contextvars.ContextVar = contextvars.ContextVar(
+    "pydatalib_call_priority", default=None
+)
+_default_governor: Optional["RateGovernor"] = None
+
+
+class GovernorStats(NamedTuple):
+    """Counters for one function class of a RateGovernor."""
+
+    calls: int
+    delayed: int
+    total_wait: float
+    max_wait: float
+    queue_depth: int
+    max_queue_depth: int
+
+
+class _Bucket:
+    def __init__(self, rate: float, burst: float) -> None:
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.waiters = []
+        self.calls = 0
+        self.delayed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.max_queue_depth = 0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RateGovernor:
+    """
+    Token bucket per function class (reads, writes and refreshes) shared by every thread
+    that calls through it. Callers queue in priority lanes: when tokens run short, an
+    INTERACTIVE call is granted the next token ahead of waiting NORMAL and BULK calls.
+    Classes missing from rates are not limited.
+    """
+
+    def __init__(self, rates: Optional[Dict[str, Tuple[float, float]]] = None) -> None:
+        if rates is None:
+            rates = DEFAULT_RATES
+        self.__buckets = {
+            function_class: _Bucket(rate, burst)
+            for function_class, (rate, burst) in rates.items()
+        }
+        self.__sequence = itertools.count()
+        self.__condition = threading.Condition()
+
+    @staticmethod
+    def function_class(function: str, function_code: Optional[int] = None) -> str:
+        """Returns the class a cpydatalib function is limited under."""
+        if function == "touchKeyring":
+            return REFRESH if function_code == _REFRESH_CODE else WRITE
+        if function in ("dataPut", "dataRemove"):
+            return WRITE
+        return READ
+
+    def acquire(
+        self,
+        function: str,
+        function_code: Optional[int] = None,
+        priority: Optional[int] = None,
+    ) -> float:
+        """Blocks until a call may be made and returns the seconds spent waiting."""
+        bucket = self.__buckets.get(self.function_class(function, function_code))
+        if bucket is None:
+            return 0.0
+        if priority is None:
+            priority = _priority.get()
+        if priority is None:
+            priority = _DEFAULT_PRIORITIES.get(function, NORMAL)
+
+        start = time.monotonic()
+        delayed = False
+        ticket = (priority, next(self.__sequence))
+        with self.__condition:
+            heapq.heappush(bucket.waiters, ticket)
+            bucket.max_queue_depth = max(bucket.max_queue_depth, len(bucket.waiters))
+            try:
+                while True:
+                    now = time.monotonic()
+                    bucket.refill(now)
+                    if bucket.waiters[0] == ticket:
+                        if bucket.tokens >= 1:
+                            break
+                        self.__condition.wait((1 - bucket.tokens) / bucket.rate)
+                    else:
+                        self.__condition.wait()
+                    delayed = True
+                heapq.heappop(bucket.waiters)
+                bucket.tokens -= 1
+            except BaseException:
+                bucket.waiters.remove(ticket)
+                heapq.heapify(bucket.waiters)
+                raise
+            finally:
+                self.__condition.notify_all()
+            waited = time.monotonic() - start
+            bucket.calls += 1
+            if delayed:
+                bucket.delayed += 1
+            bucket.total_wait += waited
+            bucket.max_wait = max(bucket.max_wait, waited)
+        return waited
+
+    def stats(self) -> Dict[str, GovernorStats]:
+        """Returns the counters of every limited function class."""
+        with self.__condition:
+            return {
+                function_class: GovernorStats(
+                    bucket.calls,
+                    bucket.delayed,
+                    bucket.total_wait,
+                    bucket.max_wait,
+                    len(bucket.waiters),
+                    bucket.max_queue_depth,
+                )
+                for function_class, bucket in self.__buckets.items()
+            }
+
+
+@contextlib.contextmanager
+def call_priority(priority: int) -> Iterator[None]:
+    """Runs the calls made in the block, in this thread or task, in a priority lane."""
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+def set_default_governor(governor: Optional[RateGovernor]) -> None:
+    """Sets the governor used by every CertAdmin created without one of its own."""
+    global _default_governor
+    _default_governor = governor
+
+
+def get_default_governor() -> Optional[RateGovernor]:
+    """Returns the process-wide governor, or None when calls are not limited."""
+    return _default_governor
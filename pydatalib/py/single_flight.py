@@ -0,0 +1,110 @@
+"""Single-flight coalescing of identical concurrent calls, for threads and asyncio tasks."""
+
+import asyncio
+import concurrent.futures
+import threading
+from typing import Callable, Dict, Hashable, NamedTuple, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class FlightStats(NamedTuple):
+    """
+    Counters of a SingleFlight. calls counts the calls made, coalesced the callers that
+    shared another caller's call instead, and max_shared the most callers one call served.
+    """
+
+    calls: int
+    coalesced: int
+    in_flight: int
+    max_shared: int
+
+
+class _Flight:
+    def __init__(self) -> None:
+        self.future: concurrent.futures.Future = concurrent.futures.Future()
+        self.callers = 1
+
+
+class SingleFlight:
+    """
+    Runs one call at a time per key. Callers that ask for a key while its call is in flight
+    wait for that call and receive its result, or have its exception raised. A caller
+    arriving once the call has finished starts a new one. Threads and asyncio tasks share
+    the same calls: tasks await them without holding a thread.
+    """
+
+    def __init__(self) -> None:
+        self.__lock = threading.Lock()
+        self.__flights: Dict[Hashable, _Flight] = {}
+        self.__calls = 0
+        self.__coalesced = 0
+        self.__max_shared = 0
+
+    def call(self, key: Hashable, function: Callable[[], T]) -> T:
+        """Returns the result of function, or of the call already in flight for key."""
+        flight, leader = self.__join(key)
+        if leader:
+            self.__run(key, flight, function)
+        return flight.future.result()
+
+    async def call_async(
+        self,
+        key: Hashable,
+        function: Callable[[], T],
+        executor: Optional[concurrent.futures.Executor] = None,
+    ) -> T:
+        """
+        Same as call() for asyncio tasks. A new call runs on executor, the event loop's
+        default executor when None. Cancelling the task does not cancel the shared call.
+        """
+        flight, leader = self.__join(key)
+        if leader:
+            asyncio.get_running_loop().run_in_executor(
+                executor, self.__run, key, flight, function
+            )
+        return await asyncio.shield(asyncio.wrap_future(flight.future))
+
+    def forget(self, match: Callable[[Hashable], bool]) -> None:
+        """
+        Makes callers of the keys for which match returns True start new calls instead of
+        sharing the ones in flight, e.g. once those calls may return stale data.
+        """
+        with self.__lock:
+            for key in [key for key in self.__flights if match(key)]:
+                del self.__flights[key]
+
+    def stats(self) -> FlightStats:
+        """Returns the counters."""
+        with self.__lock:
+            return FlightStats(
+                self.__calls, self.__coalesced, len(self.__flights), self.__max_shared
+            )
+
+    def __join(self, key: Hashable):
+        """Returns the flight for key and whether the caller has to make the call."""
+        with self.__lock:
+            flight = self.__flights.get(key)
+            if flight is None:
+                flight = self.__flights[key] = _Flight()
+                self.__calls += 1
+                return flight, True
+            flight.callers += 1
+            self.__coalesced += 1
+            self.__max_shared = max(self.__max_shared, flight.callers)
+            return flight, False
+
+    def __run(self, key: Hashable, flight: _Flight, function: Callable[[], T]) -> None:
+        try:
+            result = function()
+        except BaseException as error:  # pylint: disable=broad-exception-caught
+            self.__land(key, flight)
+            flight.future.set_exception(error)
+        else:
+            self.__land(key, flight)
+            flight.future.set_result(result)
+
+    def __land(self, key: Hashable, flight: _Flight) -> None:
+        with self.__lock:
+            if self.__flights.get(key) is flight:
+                del self.__flights[key]
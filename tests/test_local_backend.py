@@ -0,0 +1,208 @@
+"""CertAdmin behaviour exercised against the in-memory LocalBackend, without z/OS."""
+
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+
+from pydatalib import AuditLog, CertAdmin, LocalBackend, Operation
+from pydatalib.py.datalib_service_error import DatalibServiceError
+
+USERID = "TESTUSER"
+KEYRING = "TestRing"
+
+
+def _admin(backend: LocalBackend, **options) -> CertAdmin:
+    admin = CertAdmin(backend=backend, **options)
+    admin.add_keyring(USERID, KEYRING)
+    return admin
+
+
+class PagerTest(unittest.TestCase):
+    """Cursors handed out by list_keyring()."""
+
+    def test_resume_after_cursor_entry_removed(self):
+        """A fresh listing resumes after the cursor's entry even once it was removed."""
+        backend = LocalBackend()
+        admin = _admin(backend)
+        for index in range(8):
+            admin.add_certificate(USERID, KEYRING, f"L{index}", b"der%d" % index, b"")
+        page = admin.list_keyring(USERID, KEYRING, limit=3)
+        self.assertEqual([entry.label for entry in page.entries], ["L0", "L1", "L2"])
+
+        admin.remove_certificate(USERID, KEYRING, "L2")
+        # Another instance holds no handle for the cursor, so it lists afresh and has to
+        # find its place without the removed entry
+        resumed = CertAdmin(backend=backend).list_keyring(
+            USERID, KEYRING, limit=3, cursor=page.cursor
+        )
+        self.assertEqual([entry.label for entry in resumed.entries], ["L3", "L4", "L5"])
+        self.assertIsNotNone(resumed.cursor)
+
+
+class SchedulerTest(unittest.TestCase):
+    """Mutations serialized by the MutationScheduler."""
+
+    def test_refresh_merged_into_a_writer_is_dropped_by_a_delete(self):
+        """Refreshes queued behind a write are merged, and a delete drops them."""
+        backend = LocalBackend(latency=0.2)
+        admin = _admin(backend)
+        outcomes = {}
+
+        def run(name, call):
+            try:
+                call()
+                outcomes[name] = "ok"
+            except Exception as error:  # pylint: disable=broad-exception-caught
+                outcomes[name] = repr(error)
+
+        calls = {
+            "add": lambda: admin.add_certificate(USERID, KEYRING, "L", b"der", b""),
+            "refresh": lambda: admin.refresh_keyring(USERID, KEYRING),
+            "delete": lambda: admin.delete_keyring(USERID, KEYRING),
+        }
+        threads = [
+            threading.Thread(target=run, args=(name, call))
+            for name, call in calls.items()
+        ]
+        # The refresh and the delete queue behind the add, in that order
+        for thread in threads:
+            thread.start()
+            time.sleep(0.05)
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(outcomes, {"add": "ok", "refresh": "ok", "delete": "ok"})
+        # Both refreshes were handed on to the delete, which dropped them
+        stats = admin.mutation_stats()
+        self.assertEqual(stats.refreshes, 0)
+        self.assertEqual(stats.merged_refreshes, 2)
+
+    def test_apply_stops_on_error(self):
+        """apply() skips the operations after a failure unless told to go on."""
+        operations = [
+            Operation.add_certificate(USERID, KEYRING, "A", b"der"),
+            Operation.remove_certificate(USERID, KEYRING, "MISSING"),
+            Operation.add_certificate(USERID, KEYRING, "B", b"der"),
+        ]
+        admin = _admin(LocalBackend())
+        results = admin.apply(operations)
+        self.assertEqual(
+            [(result.executed, result.ok) for result in results],
+            [(True, True), (True, False), (False, False)],
+        )
+        self.assertEqual(results[1].racf_reason_code, 44)
+        self.assertEqual(
+            [entry.label for entry in admin.list_keyring(USERID, KEYRING)], ["A"]
+        )
+
+        admin = _admin(LocalBackend())
+        results = admin.apply(operations, stop_on_error=False)
+        self.assertEqual(
+            [(result.executed, result.ok) for result in results],
+            [(True, True), (True, False), (True, True)],
+        )
+        self.assertEqual(
+            [entry.label for entry in admin.list_keyring(USERID, KEYRING)], ["A", "B"]
+        )
+
+
+class WatcherTest(unittest.TestCase):
+    """Background polling by watch_keyring()."""
+
+    def test_watcher_survives_a_failing_poll(self):
+        """A poll that raises is logged and the watch carries on."""
+        backend = LocalBackend()
+        admin = _admin(backend)
+        list_keyring = backend.listKeyring
+        failures = [1]
+
+        def flaky(*args, **kwargs):
+            if failures[0]:
+                failures[0] -= 1
+                raise ValueError("keyring is limited to 236 bytes")
+            return list_keyring(*args, **kwargs)
+
+        backend.listKeyring = flaky
+        added = threading.Event()
+        events = []
+
+        def seen(batch):
+            events.extend(batch)
+            added.set()
+
+        with self.assertLogs("pydatalib", "ERROR"):
+            admin.watch_keyring(USERID, KEYRING, interval=0.05, callback=seen)
+            # The baseline poll raises, the next one records the baseline
+            deadline = time.monotonic() + 5
+            while failures[0] and time.monotonic() < deadline:
+                time.sleep(0.01)
+        try:
+            time.sleep(0.3)
+            admin.add_certificate(USERID, KEYRING, "L", b"der", b"")
+            self.assertTrue(added.wait(5))
+            self.assertEqual(
+                [(event.kind, event.label) for event in events], [("added", "L")]
+            )
+        finally:
+            admin.stop_watching()
+
+
+class AuditLogTest(unittest.TestCase):
+    """Mutations recorded to an AuditLog."""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, "audit.jsonl")
+
+    def test_flush_writes_every_record(self):
+        """flush() returns once every mutation so far is on disk."""
+        with AuditLog(self.path, flush_interval=60.0) as audit_log:
+            admin = _admin(LocalBackend(), audit_log=audit_log)
+            admin.add_certificate(USERID, KEYRING, "L", b"der", b"")
+            with self.assertRaises(DatalibServiceError):
+                admin.remove_certificate(USERID, KEYRING, "MISSING")
+            self.assertTrue(audit_log.flush(5))
+            stats = audit_log.stats()
+            with open(self.path, encoding="utf-8") as file:
+                records = [json.loads(line) for line in file]
+
+        self.assertEqual(
+            [record["operation"] for record in records],
+            ["add_keyring", "add_certificate", "remove_certificate"],
+        )
+        self.assertEqual(records[1]["label"], "L")
+        self.assertIsNotNone(records[1]["fingerprint"])
+        self.assertEqual(records[2]["racfReasonCode"], 44)
+        self.assertEqual(stats.written, 3)
+        self.assertGreaterEqual(stats.fsyncs, 1)
+
+    def test_rotation_keeps_backup_count_files(self):
+        """Rotation keeps backup_count older files and drops the rest."""
+        with AuditLog(
+            self.path, batch_size=1, max_bytes=1, backup_count=2
+        ) as audit_log:
+            admin = _admin(LocalBackend(), audit_log=audit_log)
+            # Flushing after each record makes it a batch of its own, and every batch
+            # after the first one rotates the file
+            self.assertTrue(audit_log.flush(5))
+            for index in range(4):
+                admin.add_certificate(USERID, KEYRING, f"L{index}", b"der", b"")
+                self.assertTrue(audit_log.flush(5))
+            stats = audit_log.stats()
+
+        self.assertEqual((stats.written, stats.batches, stats.rotations), (5, 5, 4))
+        labels = []
+        for path in (f"{self.path}.2", f"{self.path}.1", self.path):
+            with open(path, encoding="utf-8") as file:
+                labels.extend(json.loads(line)["label"] for line in file)
+        self.assertEqual(labels, ["L1", "L2", "L3"])
+        self.assertFalse(os.path.exists(f"{self.path}.3"))
+
+
+if __name__ == "__main__":
+    unittest.main()